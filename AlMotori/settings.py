@@ -117,6 +117,58 @@ JAZZMIN_UI_TWEAKS = {
 #
 EDITOR_MAX_ADS = 200     # per staff/editor user
 EDITOR_MAX_IMAGES = 12  
+
+# Shared between gunicorn workers so signal-driven invalidation reaches all of them.
+# Holds rendered ad pages (per ad and language), QR targets (up to
+# QR_RESOLVER_MAX_ENTRIES), form schemas and facets. Set CACHE_REDIS_URL in
+# production; the file cache lists its directory on every write.
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+if CACHE_REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": BASE_DIR / "cache",
+            # default is 300 entries: the QR targets alone would keep it culling
+            "OPTIONS": {"MAX_ENTRIES": 150000},
+        }
+    }
+AD_PAGE_CACHE_TIMEOUT = 60 * 60 * 24   # rendered /ads/<code>/ pages (dropped on any ad change)
+FORM_SCHEMA_CACHE_TIMEOUT = 60 * 60 * 24  # compiled /api/ads/form schemas (dropped on field edits)
+FACETS_CACHE_TIMEOUT = 60 * 5             # /api/public/facets (also dropped when counts change)
+FACET_YEAR_BUCKET = 5                     # years per year-facet bucket (2015-2019, ...)
+FACET_PRICE_BUCKETS = [2000, 5000, 10000, 20000, 50000, 100000]  # price-facet edges
+CAR_FIELDS_SYNC_DEBOUNCE = 5.0  # seconds; bulk catalog edits -> one sync_car_fields()
+
+# QR scan logging (mainapp/helperUtilis/scan_ingestor.py)
+QR_SCAN_ASYNC = True            # False -> write each scan inside the request
+QR_SCAN_BATCH_SIZE = 200
+QR_SCAN_FLUSH_INTERVAL = 2.0    # seconds
+
+# /qr/<code>/ resolver (mainapp/helperUtilis/qr_resolver.py)
+QR_RESOLVER_MAX_ENTRIES = 50000  # per-process LRU
+QR_RESOLVER_LOCAL_TTL = 300      # seconds
+QR_RESOLVER_SHARED_CACHE = True  # also use CACHES["default"]
+QR_RESOLVER_WARM_SIZE = 5000     # most recently scanned codes loaded per process
+
+# QR PNG/PDF rendering for published ads (mainapp/helperUtilis/qr_jobs.py)
+QR_JOBS_ASYNC = True      # False -> render inside the request
+QR_JOBS_WORKERS = 2       # pool processes per web worker
+QR_JOBS_MAX_ATTEMPTS = 3  # run_qr_jobs gives up after this many
+
+# QR PDFs (qr/pdf/*.pdf and sticker sheets) draw modules as vector rects;
+# False -> embed the raster PNG render as before
+QR_PDF_VECTOR = True
+
+# admin sticker sheets (mainapp/views/stickerViews.py): QR matrices for big batches
+# are computed in a process pool; None -> os.cpu_count()
+STICKER_SHEET_WORKERS = None
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework.authentication.TokenAuthentication",   # simplest
@@ -219,6 +271,14 @@ FILE_UPLOAD_MAX_MEMORY_SIZE = 5 * 1024 * 1024      # 5 MB
 # Prevent malicious users from sending huge payloads
 DATA_UPLOAD_MAX_NUMBER_FIELDS = 2000
 
+# Ad media uploads are copied to storage in chunks (mainapp/helperUtilis/media_upload.py)
+MEDIA_UPLOAD_CHUNK_SIZE = 256 * 1024          # bytes held in memory per upload
+MEDIA_MAX_IMAGE_BYTES = 10 * 1024 * 1024      # 10 MB
+MEDIA_MAX_VIDEO_BYTES = 100 * 1024 * 1024     # 100 MB
+
+# thumb/medium/large WebP+JPEG copies of ad images (mainapp/helperUtilis/image_derivatives.py)
+IMAGE_DERIVATIVES_ASYNC = True  # False -> build inside the request (debugging)
+
 
 DATABASES = {
     "default": {
@@ -6,7 +6,9 @@ from .models import FieldType, AdCategory, FieldDefinition, Ad, AdFieldValue, Ad
 from django.utils.html import format_html
 from django.contrib import admin
 from django.contrib.auth.models import User, Group
-from .utils import  sync_car_fields
+from .utils import apply_car_make_change, apply_car_model_change, schedule_car_fields_sync
+from .helperUtilis.image_derivatives import rendition_url
+from .helperUtilis.admin_utils import AdTextSearchMixin
 # Hide these from the editor staff
 
 # Re-register with hidden admin
@@ -60,12 +62,12 @@ class AdMediaInline(admin.TabularInline):
         if obj.url:
             return format_html(
                 '<img src="{}" style="width:120px; height:auto; border-radius:6px;" />',
-                obj.url
+                rendition_url(obj.renditions, "thumb") or obj.url
             )
         return "-"
 
 @admin.register(Ad)
-class AdAdmin(admin.ModelAdmin):
+class AdAdmin(AdTextSearchMixin, admin.ModelAdmin):
     list_display = (
         "code", "title", "status", "owner",
         "category", "price", "city", "created_at",
@@ -83,7 +85,7 @@ class AdAdmin(admin.ModelAdmin):
             return "-"
         return format_html(
             '<img src="{}" style="width:80px; height:auto; border-radius:6px;" />',
-            media.url
+            rendition_url(media.renditions, "thumb") or media.url
         )
 
     @admin.display(description="QR Link")
@@ -106,13 +108,18 @@ from django.db.models import Q
 from django.utils.html import format_html
 
 from .models import QRCode
-from .helperUtilis.admin_utils import export_qr_excel_response
+from .helperUtilis.admin_utils import export_qr_csv_response, export_qr_excel_response
 
 @admin.action(description="Export Unassigned/Inactive QR codes to Excel")
 def export_unassigned_or_inactive(modeladmin, request, queryset):
     # Export ALL that match (ignore selection) – easiest for users
     qs = QRCode.objects.filter(Q(is_assigned=False) | Q(is_activated=False)).order_by("code")
     return export_qr_excel_response(qs, filename_prefix="qr-unassigned-or-inactive")
+@admin.action(description="Export Unassigned/Inactive QR codes to CSV")
+def export_unassigned_or_inactive_csv(modeladmin, request, queryset):
+    # streamed: fine for the full table
+    qs = QRCode.objects.filter(Q(is_assigned=False) | Q(is_activated=False)).order_by("code")
+    return export_qr_csv_response(qs, filename_prefix="qr-unassigned-or-inactive")
 @admin.action(description="Export Unassigned QR codes to Excel")
 def export_unassigned(modeladmin, request, queryset):
     # Strict version (no ad linked at all):
@@ -164,7 +171,7 @@ class QRCodeAdmin(admin.ModelAdmin):
     readonly_fields = ("public_link",)
 
     # Actions
-    actions = [create_and_export_qr_codes]
+    actions = [create_and_export_qr_codes, export_unassigned_or_inactive_csv]
     create_and_export_qr_codes.allowed_permissions = ('add',)
 
     actions_on_top = True
@@ -291,21 +298,9 @@ class NotificationAdmin(admin.ModelAdmin):
                 except Profile.DoesNotExist:
                     self.message_user(request, f"❌ No profile found for {obj.user.username}", level="error")
 
-import uuid
-from .models import QRCode
-
-# utils.py
-import uuid
 from datetime import datetime
 from .models import QRCode
-
-
-def generate_unique_qr_code():
-    """Generate unique, non-duplicated QR code."""
-    while True:
-        code = uuid.uuid4().hex[:10].upper()
-        if not QRCode.objects.filter(code=code).exists():
-            return code
+from .helperUtilis.qr_batch import HEX, allocate_qr_codes
 
 
 def create_qr_batch(count=100):
@@ -315,7 +310,7 @@ def create_qr_batch(count=100):
     month_id = datetime.now().strftime("%Y-%m")
 
     # 2. Count how many batches created in this month
-    existing_batches = QRCode.objects.filter(batch__startswith=month_id).values_list("batch", flat=True)
+    existing_batches = QRCode.objects.filter(batch__startswith=month_id).values_list("batch", flat=True).distinct()
 
     batch_number = 1
     if existing_batches:
@@ -332,20 +327,8 @@ def create_qr_batch(count=100):
 
     batch_name = f"{month_id}-BATCH{batch_number:02d}"
 
-    # 3. Create QR codes
-    qr_list = []
-
-    for _ in range(count):
-        qr_list.append(
-            QRCode(
-                code=generate_unique_qr_code(),
-                batch=batch_name,
-                is_assigned=False,
-                is_activated=False,
-            )
-        )
-
-    QRCode.objects.bulk_create(qr_list)
+    # 3. Create QR codes (10 hex chars, as before; collisions retried in bulk)
+    allocate_qr_codes(count, batch_name, length=10, alphabet=HEX)
 
     return QRCode.objects.filter(batch=batch_name).order_by("code")
 
@@ -364,9 +347,19 @@ class CarMakeAdmin(admin.ModelAdmin):
         }),
     )
 
+    # only this make's choices are patched; bulk deletes get one debounced rebuild
     def save_model(self, request, obj, form, change):
+        old_value = CarMakeS.objects.filter(pk=obj.pk).values_list("value", flat=True).first() if change else None
         super().save_model(request, obj, form, change)
-        sync_car_fields()
+        apply_car_make_change(obj, old_value=old_value)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        apply_car_make_change(obj, old_value=obj.value, deleted=True)
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        schedule_car_fields_sync()
 @admin.register(CarModelS)
 class CarModelAdmin(admin.ModelAdmin):
     list_display = ("name_en", "name_ar", "make", "is_active")
@@ -381,5 +374,17 @@ class CarModelAdmin(admin.ModelAdmin):
     )
 
     def save_model(self, request, obj, form, change):
+        old = (
+            CarModelS.objects.filter(pk=obj.pk).values_list("value", "make__value").first()
+            if change else None
+        )
         super().save_model(request, obj, form, change)
-        sync_car_fields()
+        apply_car_model_change(obj, *(old or ()))
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        apply_car_model_change(obj, deleted=True)
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        schedule_car_fields_sync()
@@ -17,7 +17,7 @@ from django.db.models import Q
 from django.utils.html import format_html
 
 from .models import QRCode
-from .helperUtilis.admin_utils import export_qr_excel_response
+from .helperUtilis.admin_utils import AdTextSearchMixin, export_qr_csv_response, export_qr_excel_response
 
 # ----------------------
 # Permissions
@@ -110,7 +110,7 @@ class ValuesInline(TabularInline):
 # ----------------------
 
 @admin.register(Ad, site=editor_site)
-class EditorAdAdmin(ModelAdmin):
+class EditorAdAdmin(AdTextSearchMixin, ModelAdmin):
     list_display = ("code", "title", "status", "owner", "category", "price", "city", "created_at")
     list_filter = (MineFilter, "status", "category", "city")
     search_fields = ("code", "title", "owner__username")
@@ -213,13 +213,18 @@ def export_unassigned_or_inactive_editor(modeladmin, request, queryset):
     qs = QRCode.objects.filter(Q(is_assigned=False) | Q(is_activated=False)).order_by("code")
     return export_qr_excel_response(qs, filename_prefix="qr-unassigned-or-inactive")
 
+@admin.action(description="Export Unassigned/Inactive QR codes to CSV")
+def export_unassigned_or_inactive_csv_editor(modeladmin, request, queryset):
+    qs = QRCode.objects.filter(Q(is_assigned=False) | Q(is_activated=False)).order_by("code")
+    return export_qr_csv_response(qs, filename_prefix="qr-unassigned-or-inactive")
+
 @admin.register(QRCode, site=editor_site)
 class EditorQRCodeAdmin(admin.ModelAdmin):
     list_display = ("code", "batch", "ad", "is_assigned", "is_activated", "scans_count", "last_scan_at", "public_link")
     list_filter  = ("batch", "is_assigned", "is_activated")
     search_fields = ("code", "batch", "ad__code")
     readonly_fields = ("public_link",)
-    actions = [export_unassigned_or_inactive_editor]
+    actions = [export_unassigned_or_inactive_editor, export_unassigned_or_inactive_csv_editor]
 
     @admin.display(description="Public URL")
     def public_link(self, obj):
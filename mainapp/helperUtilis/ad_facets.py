@@ -0,0 +1,189 @@
+import time
+from collections import Counter
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+
+# Facet counts for the public catalog, derived from AdSearchIndex rows
+# (one per published ad). Every index row write applies +new / -old deltas
+# to AdFacetCount, so publish/unpublish/edit/delete never GROUP BY the EAV
+# values. Cached per (category, make) under a generation stamp that any
+# count change bumps (same scheme as form_schema_cache).
+
+FACETS = ("make", "model", "city", "year", "price")
+FACETS_CACHE_PREFIX = "facets"
+_GENERATION_KEY = f"{FACETS_CACHE_PREFIX}:generation"
+
+
+def _timeout():
+    return getattr(settings, "FACETS_CACHE_TIMEOUT", 60 * 5)
+
+
+# ---------- buckets ----------
+
+def year_bucket(year):
+    if not year:
+        return ""
+    size = getattr(settings, "FACET_YEAR_BUCKET", 5)
+    start = year - year % size
+    return f"{start}-{start + size - 1}"
+
+
+def price_bucket(price):
+    if price is None:
+        return ""
+    edges = getattr(settings, "FACET_PRICE_BUCKETS", [2000, 5000, 10000, 20000, 50000, 100000])
+    low = 0
+    for edge in edges:
+        if price < Decimal(edge):
+            return f"{low}-{edge}"
+        low = edge
+    return f"{low}+"
+
+
+def contributions(row):
+    """(facet, parent, value) keys one AdSearchIndex row counts towards."""
+    keys = []
+    if row.make:
+        keys.append(("make", "", row.make))
+        if row.model:
+            keys.append(("model", row.make, row.model))
+    if row.city:
+        keys.append(("city", "", row.city))
+    for facet, value in (("year", year_bucket(row.year)), ("price", price_bucket(row.price))):
+        if value:
+            keys.append((facet, "", value))
+    return [(row.category_id,) + k for k in keys]
+
+
+# ---------- incremental updates ----------
+
+def row_deltas(old_rows, new_rows):
+    """Counter of (category_id, facet, parent, value) -> delta."""
+    deltas = Counter()
+    for row in new_rows:
+        deltas.update(contributions(row))
+    for row in old_rows:
+        deltas.subtract(contributions(row))
+    return deltas
+
+
+def apply_deltas(deltas):
+    from mainapp.models import AdFacetCount
+
+    deltas = sorted((k, n) for k, n in deltas.items() if n)  # fixed lock order
+    if not deltas:
+        return
+    for (category_id, facet, parent, value), n in deltas:
+        lookup = dict(category_id=category_id, facet=facet, parent=parent, value=value[:120])
+        updated = AdFacetCount.objects.filter(**lookup).update(count=F("count") + n)
+        if updated or n < 0:
+            continue
+        try:
+            with transaction.atomic():
+                AdFacetCount.objects.create(count=n, **lookup)
+        except IntegrityError:
+            # created concurrently
+            AdFacetCount.objects.filter(**lookup).update(count=F("count") + n)
+    invalidate_facets()
+
+
+# ---------- reading ----------
+
+def _generation():
+    gen = cache.get(_GENERATION_KEY)
+    if gen is None:
+        cache.add(_GENERATION_KEY, time.time_ns(), None)
+        gen = cache.get(_GENERATION_KEY)
+    return gen
+
+
+def invalidate_facets():
+    transaction.on_commit(lambda: cache.set(_GENERATION_KEY, time.time_ns(), None))
+
+
+def build_facets(category_id, make=""):
+    """{facet: [{"value", "count"}]}, biggest first; models only under `make` if given."""
+    from mainapp.models import AdFacetCount
+
+    out = {facet: [] for facet in FACETS}
+    qs = AdFacetCount.objects.filter(category_id=category_id, count__gt=0)
+    if make:
+        qs = qs.filter(~Q(facet="model") | Q(parent=make))
+    for facet, parent, value, count in qs.values_list("facet", "parent", "value", "count"):
+        item = {"value": value, "count": count}
+        if parent:
+            item["parent_value"] = parent
+        out.setdefault(facet, []).append(item)
+    for items in out.values():
+        items.sort(key=lambda i: (-i["count"], i["value"]))
+    return out
+
+
+def get_cached_facets(category, make=""):
+    key = f"{FACETS_CACHE_PREFIX}:{_generation()}:{category.id}:{make}"
+    data = cache.get(key)
+    if data is None:
+        data = build_facets(category.id, make)
+        cache.set(key, data, _timeout())
+    return data
+
+
+# ---------- reconciliation ----------
+
+def expected_counts():
+    """Counter of facet keys recomputed from AdSearchIndex (GROUP BY on the flat table)."""
+    from mainapp.models import AdSearchIndex
+
+    counts = Counter()
+    qs = AdSearchIndex.objects.order_by()
+    for category_id, make, model, n in (qs.exclude(make="")
+                                        .values_list("category_id", "make", "model")
+                                        .annotate(n=Count("ad_id"))):
+        counts[(category_id, "make", "", make)] += n
+        if model:
+            counts[(category_id, "model", make, model)] += n
+    for category_id, city, n in qs.exclude(city="").values_list("category_id", "city").annotate(n=Count("ad_id")):
+        counts[(category_id, "city", "", city)] += n
+    for category_id, year, n in (qs.filter(year__isnull=False)
+                                 .values_list("category_id", "year").annotate(n=Count("ad_id"))):
+        counts[(category_id, "year", "", year_bucket(year))] += n
+    for category_id, price, n in (qs.filter(price__isnull=False)
+                                  .values_list("category_id", "price").annotate(n=Count("ad_id"))):
+        counts[(category_id, "price", "", price_bucket(price))] += n
+    return counts
+
+
+def reconcile():
+    """Rewrite AdFacetCount from AdSearchIndex. Returns the number of rows fixed."""
+    from mainapp.models import AdFacetCount
+
+    with transaction.atomic():
+        expected = expected_counts()
+        stored = {
+            (r.category_id, r.facet, r.parent, r.value): r
+            for r in AdFacetCount.objects.select_for_update()
+        }
+        to_update, to_create, to_delete = [], [], []
+        for key, row in stored.items():
+            want = expected.get(key, 0)
+            if want == 0:
+                to_delete.append(row.pk)
+            elif row.count != want:
+                row.count = want
+                to_update.append(row)
+        for key, want in expected.items():
+            if key not in stored and want:
+                category_id, facet, parent, value = key
+                to_create.append(AdFacetCount(category_id=category_id, facet=facet, parent=parent,
+                                              value=value[:120], count=want))
+        AdFacetCount.objects.filter(pk__in=to_delete).delete()
+        AdFacetCount.objects.bulk_update(to_update, ["count"])
+        AdFacetCount.objects.bulk_create(to_create)
+        fixed = len(to_update) + len(to_create) + len(to_delete)
+        if fixed:
+            invalidate_facets()
+    return fixed
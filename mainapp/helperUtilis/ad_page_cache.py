@@ -0,0 +1,76 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# Rendered HTML of the public ad page, one entry per (ad code, lang).
+# Entries are dropped by signals (see mainapp/signals.py) whenever the ad,
+# its values or its media change, so the timeout is only a safety net.
+AD_PAGE_CACHE_PREFIX = "ad_page"
+# unix time of the ad's last invalidation; part of Last-Modified, so changes
+# without a timestamp column (media order, renditions, owner phone) count too
+AD_PAGE_CHANGED_PREFIX = "ad_page_changed"
+AD_PAGE_LANGS = ("en", "ar")
+
+
+def _timeout():
+    return getattr(settings, "AD_PAGE_CACHE_TIMEOUT", 60 * 60 * 24)
+
+
+def ad_page_cache_key(code: str, lang: str) -> str:
+    return f"{AD_PAGE_CACHE_PREFIX}:{code}:{lang}"
+
+
+def ad_page_changed_key(code: str) -> str:
+    return f"{AD_PAGE_CHANGED_PREFIX}:{code}"
+
+
+def ad_page_changed_at(code: str) -> float:
+    """
+    When the ad's page content last changed. An unknown (expired/evicted)
+    stamp starts at now: a spurious 200 is fine, a stale 304 is not.
+    """
+    key = ad_page_changed_key(code)
+    stamp = cache.get(key)
+    if stamp is None:
+        cache.add(key, time.time(), _timeout())
+        stamp = cache.get(key) or time.time()
+    return stamp
+
+
+def get_cached_ad_page(code: str, lang: str):
+    """
+    Returns {"html", "etag", "last_modified"} or None.
+    """
+    return cache.get(ad_page_cache_key(code, lang))
+
+
+def set_cached_ad_page(code: str, lang: str, html: str, last_modified):
+    """
+    Store a rendered page. `last_modified` is a unix timestamp.
+    Returns the stored entry.
+    """
+    entry = {
+        "html": html,
+        "etag": '"%s"' % hashlib.md5(html.encode("utf-8")).hexdigest(),
+        "last_modified": int(last_modified),
+    }
+    cache.set(ad_page_cache_key(code, lang), entry, _timeout())
+    return entry
+
+
+def invalidate_ad_page(code: str):
+    """
+    Drop every cached language of an ad page.
+    Runs after commit so a concurrent request can't re-cache the old rows.
+    """
+    if not code:
+        return
+    transaction.on_commit(lambda: _drop(code))
+
+
+def _drop(code):
+    cache.set(ad_page_changed_key(code), time.time(), _timeout())
+    cache.delete_many([ad_page_cache_key(code, lang) for lang in AD_PAGE_LANGS])
@@ -0,0 +1,141 @@
+import logging
+
+from django.db import transaction
+
+log = logging.getLogger(__name__)
+
+# FieldDefinition keys copied into AdSearchIndex columns
+MAKE_KEY, MODEL_KEY, YEAR_KEY = "make", "model", "year"
+INDEXED_KEYS = (MAKE_KEY, MODEL_KEY, YEAR_KEY)
+
+
+# ---------- normalizing ----------
+
+def normalize_city(city):
+    return (city or "").strip().casefold()
+
+
+def _plain(value):
+    """Select values arrive as "toyota", {"value": "toyota"} or {"en": "Toyota", "ar": ...}."""
+    if isinstance(value, dict):
+        value = value.get("value") or value.get("en") or ""
+    if isinstance(value, (list, tuple)):
+        value = value[0] if value else ""
+    return value
+
+
+def choice_key(value):
+    from mainapp.models import choice_value
+
+    value = _plain(value)
+    return choice_value(str(value)) if value not in (None, "") else ""
+
+
+def year_of(value):
+    try:
+        year = int(float(str(_plain(value)).strip()))
+    except (TypeError, ValueError):
+        return None
+    return year if 1800 <= year <= 9999 else None
+
+
+# ---------- building rows ----------
+
+def build_rows(ads):
+    """AdSearchIndex rows for published `ads` (make/model/year read in one query)."""
+    from mainapp.models import AdFieldValue, AdSearchIndex
+
+    ads = [ad for ad in ads if ad.status == "published"]
+    if not ads:
+        return []
+
+    dynamic = {}
+    for ad_id, key, value in (AdFieldValue.objects
+                              .filter(ad_id__in=[ad.id for ad in ads], field__key__in=INDEXED_KEYS)
+                              .order_by("locale")  # NULL/en before ar
+                              .values_list("ad_id", "field__key", "value")):
+        dynamic.setdefault(ad_id, {}).setdefault(key, value)
+
+    rows = []
+    for ad in ads:
+        values = dynamic.get(ad.id, {})
+        rows.append(AdSearchIndex(
+            ad_id=ad.id,
+            category_id=ad.category_id,
+            city=normalize_city(ad.city),
+            price=ad.price,
+            make=choice_key(values.get(MAKE_KEY))[:120],
+            model=choice_key(values.get(MODEL_KEY))[:120],
+            year=year_of(values.get(YEAR_KEY)),
+            published_at=ad.published_at,
+        ))
+    return rows
+
+
+INDEX_COLUMNS = ["category", "city", "price", "make", "model", "year", "published_at"]
+
+
+INDEX_AD_FIELDS = ("id", "status", "category_id", "title", "city", "price", "published_at")
+
+
+def write_rows(model, rows, columns, existing):
+    """bulk_create the rows whose ad_id isn't in `existing`, bulk_update the rest."""
+    model.objects.bulk_create([r for r in rows if r.ad_id not in existing])
+    model.objects.bulk_update([r for r in rows if r.ad_id in existing], columns)
+
+
+def refresh_ads(ad_ids):
+    """
+    Bring the index rows (AdSearchIndex, published only) and text documents
+    (AdSearchDocument, every ad) of `ad_ids` in line with the ads.
+    """
+    from mainapp.models import Ad, AdSearchDocument, AdSearchIndex
+    from mainapp.helperUtilis.ad_facets import apply_deltas, row_deltas
+    from mainapp.helperUtilis.text_search import build_documents
+
+    ad_ids = set(ad_ids)
+    if not ad_ids:
+        return
+    with transaction.atomic():
+        # lock the ads before reading anything: two refreshes of one ad then
+        # run in turn, and the second reads (and writes) the newer state
+        ads = list(Ad.objects.select_for_update().filter(id__in=ad_ids)
+                   .only(*INDEX_AD_FIELDS).order_by("id"))
+        rows = build_rows(ads)
+        docs = build_documents(ads)
+        indexed = {row.ad_id for row in rows}
+
+        # deleted rows take their facet counts with them (post_delete receiver)
+        AdSearchIndex.objects.filter(ad_id__in=ad_ids - indexed).delete()
+        old = list(AdSearchIndex.objects.select_for_update().filter(ad_id__in=indexed))
+        write_rows(AdSearchIndex, rows, INDEX_COLUMNS, {r.ad_id for r in old})
+        apply_deltas(row_deltas(old, rows))
+        write_rows(AdSearchDocument, docs, ["document"], set(
+            AdSearchDocument.objects.filter(ad_id__in=ad_ids).values_list("ad_id", flat=True)
+        ))
+
+
+def _refresh_safely(ad_id):
+    try:
+        refresh_ads([ad_id])
+    except Exception:
+        # a stale row is fixed by `manage.py rebuild_ad_search_index`; never fail the write
+        log.exception("Refreshing search index for ad %s failed", ad_id)
+
+
+def refresh_ads_with_field(field_id, chunk_size=500):
+    """Refresh every ad that has a value for one field (its visibility or type changed)."""
+    from mainapp.models import AdFieldValue
+
+    ad_ids = sorted(set(AdFieldValue.objects.filter(field_id=field_id).values_list("ad_id", flat=True)))
+    for i in range(0, len(ad_ids), chunk_size):
+        try:
+            refresh_ads(ad_ids[i:i + chunk_size])
+        except Exception:
+            log.exception("Refreshing search index for field %s failed", field_id)
+
+
+def schedule_refresh(ad_id):
+    """Refresh after the surrounding transaction commits (values are written after the Ad row)."""
+    if ad_id:
+        transaction.on_commit(lambda: _refresh_safely(ad_id))
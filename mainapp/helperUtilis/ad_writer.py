@@ -0,0 +1,255 @@
+import logging
+from collections import namedtuple
+
+from django.core.files.storage import default_storage
+from django.db import router, transaction
+from django.db.models.deletion import Collector
+from django.utils import timezone
+
+from mainapp.helperUtilis.media_upload import IMAGE, VIDEO, store_upload
+
+log = logging.getLogger(__name__)
+
+# Batched ad writes (AdFormView, UpdateAdView, AdMediaView, the serializers):
+# one bulk statement per table instead of a create()/delete() per row, media
+# diffed against the rows the ad already has, and the rows written returned
+# so a response can be serialized from memory (prime_relations).
+
+# An image/video to attach: uploaded (content_hash set) or a hosted URL
+NewMedia = namedtuple("NewMedia", "url content_hash", defaults=("",))
+
+
+# ---------- uploads ----------
+
+def store_uploads(image_files, video_file):
+    """
+    Copy the request's files to storage before any row is written, so a
+    too-large file fails the request without leaving a half-saved ad.
+    Returns ([NewMedia], NewMedia | None, [storage names]).
+    """
+    names, images, video = [], [], None
+    try:
+        for f in image_files:
+            up = store_upload(f, subdir="ads/images", kind=IMAGE)
+            names.append(up.name)
+            images.append(NewMedia(up.url, up.sha256))
+        if video_file:
+            up = store_upload(video_file, subdir="ads/videos", kind=VIDEO)
+            names.append(up.name)
+            video = NewMedia(up.url, up.sha256)
+    except Exception:
+        discard_uploads(names)
+        raise
+    return images, video, names
+
+
+def discard_uploads(names):
+    """Remove stored uploads whose rows were never committed."""
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except Exception:
+            log.warning("Could not remove orphaned upload %s", name, exc_info=True)
+
+
+# ---------- bulk helpers ----------
+
+def bulk_insert(model, rows, key):
+    """
+    bulk_create rows of one ad and make sure they carry their pks: backends
+    that don't return ids from a bulk insert (MySQL) get them read back in
+    one query, matched on the `key` columns.
+    """
+    if not rows:
+        return rows
+    model.objects.bulk_create(rows)
+    missing = [r for r in rows if r.pk is None]
+    if missing:
+        pks = {
+            tuple(k): pk
+            for pk, *k in model.objects.filter(ad_id=rows[0].ad_id).values_list("pk", *key)
+        }
+        for row in missing:
+            row.pk = pks.get(tuple(getattr(row, f) for f in key))
+    return rows
+
+
+def prime_relations(ad, **relations):
+    """
+    Seed ad's prefetch cache with rows already in memory, the way
+    prefetch_related() would, so the read serializers don't query them.
+    """
+    cache = ad.__dict__.setdefault("_prefetched_objects_cache", {})
+    for name, rows in relations.items():
+        cache.pop(name, None)
+        qs = getattr(ad, name).all()
+        qs._result_cache = list(rows)
+        qs._prefetch_done = True
+        cache[name] = qs
+
+
+# ---------- values ----------
+
+def write_values(ad, defs, values, existing=()):
+    """
+    Upsert submitted dynamic values (unknown keys skipped) with one bulk
+    insert and one bulk update. `defs` is category_field_defs(), `existing`
+    the ad's current rows. Returns all of the ad's value rows, field loaded.
+    """
+    from mainapp.models import AdFieldValue
+    from mainapp.helperUtilis.typed_values import sync_rows
+
+    by_id = {fd.id: fd for fd in defs.values()}
+    rows = list(existing)
+    current = {}
+    for row in rows:
+        row.field = by_id.get(row.field_id) or row.field
+        current[row.field.key.lower()] = row
+
+    now = timezone.now()
+    to_create, to_update = [], []
+    for key, val in (values or {}).items():
+        fd = defs.get(key.lower())
+        if not fd:
+            continue
+        row = current.get(key.lower())
+        if row is None:
+            row = current[key.lower()] = AdFieldValue(ad=ad, field=fd, value=val)
+            to_create.append(row)
+        else:
+            row.value = val
+            row.updated_at = now  # bulk_update skips auto_now
+            to_update.append(row)
+
+    bulk_insert(AdFieldValue, to_create, ("field_id", "locale"))
+    if to_update:
+        AdFieldValue.objects.bulk_update(to_update, ["value", "updated_at"])
+    # typed projection; rows inserted just now can't have a typed row yet
+    sync_rows(to_create + to_update, existing=None if to_update else set())
+    return rows + to_create
+
+
+# ---------- media ----------
+
+def _take(candidates, unused):
+    for m in candidates or ():
+        if m.pk in unused:
+            return unused.pop(m.pk)
+    return None
+
+
+def match_media(rows, items):
+    """
+    Pair submitted NewMedia with existing AdMedia rows: the same URL, or the
+    same content_hash (a file the ad already has, uploaded again).
+    Returns ([(item, row or None)], rows left unmatched).
+    """
+    unused = {m.pk: m for m in rows}
+    by_url, by_hash = {}, {}
+    for m in rows:
+        by_url.setdefault(m.url, []).append(m)
+        if m.content_hash:
+            by_hash.setdefault(m.content_hash, []).append(m)
+
+    pairs = []
+    for item in items:
+        row = _take(by_url.get(item.url), unused)
+        if row is None and item.content_hash:
+            row = _take(by_hash.get(item.content_hash), unused)
+        pairs.append((item, row))
+    return pairs, list(unused.values())
+
+
+def write_media(ad, existing=(), images=None, video=None, drop_video=False):
+    """
+    Bring the ad's images (when `images` is a list of NewMedia, in display
+    order) and/or its video (`video` NewMedia, or `drop_video`) in line with
+    what was submitted, diffed against the `existing` rows: matched rows are
+    kept (only a changed order_index is written, in one bulk_update), the
+    rest is one bulk insert and one delete. Re-uploaded copies of files the
+    ad already has are dropped from storage. Returns the ad's media rows.
+    """
+    from mainapp.models import AdMedia
+    from mainapp.helperUtilis.ad_page_cache import invalidate_ad_page
+    from mainapp.helperUtilis.image_derivatives import derivative_worker, storage_name
+
+    existing = sorted(existing, key=lambda m: (m.order_index, m.id or 0))
+    kept, gone, new, moved, duplicates = [], [], [], [], []
+
+    def diff(kind, rows, items):
+        pairs, unmatched = match_media(rows, items)
+        gone.extend(unmatched)
+        for i, (item, row) in enumerate(pairs):
+            if row is None:
+                new.append(AdMedia(ad=ad, kind=kind, url=item.url,
+                                   content_hash=item.content_hash, order_index=i))
+                continue
+            if item.url != row.url:
+                duplicates.append(item.url)
+            if row.order_index != i:
+                row.order_index = i
+                moved.append(row)
+            kept.append(row)
+
+    current_images = [m for m in existing if m.kind == AdMedia.IMAGE]
+    current_videos = [m for m in existing if m.kind == AdMedia.VIDEO]
+    if images is not None:
+        diff(AdMedia.IMAGE, current_images, images)
+    else:
+        kept.extend(current_images)
+    if video is not None or drop_video:
+        diff(AdMedia.VIDEO, current_videos, [video] if video is not None else [])
+    else:
+        kept.extend(current_videos)
+
+    if gone:
+        # delete the loaded rows (signals still fire) without selecting them again;
+        # the release_media_storage receiver removes their files after commit
+        collector = Collector(using=router.db_for_write(AdMedia))
+        collector.collect(gone)
+        collector.delete()
+    if moved:
+        AdMedia.objects.bulk_update(moved, ["order_index"])
+    bulk_insert(AdMedia, new, ("kind", "order_index"))
+
+    # bulk_create skips the queue_image_renditions receiver
+    for m in new:
+        if m.kind == AdMedia.IMAGE and m.pk:
+            derivative_worker.enqueue(m.pk)
+    if duplicates:
+        names = [n for n in map(storage_name, duplicates) if n]
+        transaction.on_commit(lambda: discard_uploads(names))
+    if gone or moved or new:
+        # bulk writes skip the page-cache receivers
+        invalidate_ad_page(ad.code)
+    return kept + new
+
+
+def _still_referenced(name):
+    """Whether any AdMedia row's URL resolves to storage `name` (any host/query)."""
+    from mainapp.models import AdMedia
+    from mainapp.helperUtilis.image_derivatives import storage_name
+
+    urls = AdMedia.objects.filter(url__contains=name).values_list("url", flat=True)
+    return any(storage_name(u) == name for u in urls)
+
+
+def release_media_files(url, content_hash, renditions):
+    """
+    Remove a deleted AdMedia's file and renditions from storage. Only files
+    this app stored for the row (uploads, which carry a content_hash) are
+    touched, never what a submitted URL happens to point at, and only when
+    no other row still resolves to the same file.
+    """
+    from mainapp.helperUtilis.image_derivatives import delete_renditions, storage_name
+
+    name = storage_name(url)
+    if not content_hash or not name:
+        return
+    if _still_referenced(name):
+        return
+    try:
+        default_storage.delete(name)
+        delete_renditions(renditions)
+    except Exception:
+        log.warning("Could not remove media files of %s", url, exc_info=True)
@@ -1,49 +1,130 @@
+import csv
+import tempfile
 from datetime import datetime
-from django.http import HttpResponse
+from django.db.models import Q
+from django.http import FileResponse, StreamingHttpResponse
 from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
 
-def autosize(ws):
-    for col in ws.columns:
-        max_len = 0
-        col_letter = col[0].column_letter
-        for cell in col:
-            try:
-                max_len = max(max_len, len(str(cell.value)))
-            except Exception:
-                pass
-        ws.column_dimensions[col_letter].width = min(max_len + 2, 60)
+from mainapp.models import QRCode, build_qr_public_url
+from mainapp.helperUtilis.text_search import match_ad_ids
 
+# ONLY the 4 fields you want
+QR_EXPORT_HEADERS = ["Code", "Public URL", "Batch", "Created At"]
+QR_EXPORT_CHUNK = 2000
 
-def export_qr_excel_response(qs, filename_prefix="qr"):
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "QR Codes"
-
-    # ONLY the 4 fields you want
-    ws.append([
-        "Code",
-        "Public URL",
-        "Batch",
-        "Created At",
-    ])
-
-    for q in qs:
-        ws.append([
-            q.code,
-            getattr(q, "public_url", f"/qr/{q.code}"),
-            q.batch or "",
-            q.created_at.strftime("%Y-%m-%d %H:%M") if q.created_at else "",
-        ])
-
-    autosize(ws)
-
-    # File name as: day-month-year-batch.xlsx
+
+def qr_export_widths():
+    """Column widths from the model's field lengths (no pass over the data)."""
+    code_len = QRCode._meta.get_field("code").max_length
+    batch_len = QRCode._meta.get_field("batch").max_length
+    lengths = [
+        code_len,
+        len(build_qr_public_url("")) + code_len,
+        batch_len,
+        len("YYYY-MM-DD HH:MM"),
+    ]
+    return [min(max(n, len(h)) + 2, 60) for n, h in zip(lengths, QR_EXPORT_HEADERS)]
+
+
+def iter_qr_code_values(qs):
+    """
+    (code, batch, created_at) in code order, read in keyset pages of
+    QR_EXPORT_CHUNK (WHERE code > last LIMIT n). Each page is its own small
+    query: MySQL drivers buffer a whole result set client-side, so a single
+    iterator() over the table would still hold every row in memory.
+    """
+    fields = ("code", "batch", "created_at")
+    if qs.query.is_sliced:
+        yield from qs.values_list(*fields)  # already bounded (e.g. "first 100")
+        return
+    rows = qs.order_by("code").values_list(*fields)
+    last = None
+    while True:
+        page = list((rows.filter(code__gt=last) if last is not None else rows)[:QR_EXPORT_CHUNK])
+        yield from page
+        if len(page) < QR_EXPORT_CHUNK:
+            return
+        last = page[-1][0]
+
+
+def iter_qr_export_rows(qs):
+    """Export rows straight from the DB: values_list, no model instances."""
+    for code, batch, created_at in iter_qr_code_values(qs):
+        yield [
+            code,
+            build_qr_public_url(code),
+            batch or "",
+            created_at.strftime("%Y-%m-%d %H:%M") if created_at else "",
+        ]
+
+
+def _export_filename(ext):
+    # File name as: day-month-year-batch.<ext>
     today = datetime.now().strftime("%d-%m-%Y")
-    filename = f"{today}-batch.xlsx"
+    return f"{today}-batch.{ext}"
+
+
+def export_qr_excel_response(qs, filename_prefix="qr"):
+    """
+    .xlsx of a QRCode queryset. Write-only workbook: rows are streamed into
+    a temp file as they're read, so memory stays flat however many codes
+    are exported.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("QR Codes")
+    for i, width in enumerate(qr_export_widths(), start=1):
+        ws.column_dimensions[get_column_letter(i)].width = width
 
-    resp = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    ws.append(QR_EXPORT_HEADERS)
+    for row in iter_qr_export_rows(qs):
+        ws.append(row)
+
+    tmp = tempfile.TemporaryFile()
+    wb.save(tmp)
+    tmp.seek(0)
+    return FileResponse(
+        tmp,
+        as_attachment=True,
+        filename=_export_filename("xlsx"),
+        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
     )
-    resp["Content-Disposition"] = f'attachment; filename="{filename}"'
-    wb.save(resp)
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def export_qr_csv_response(qs, filename_prefix="qr"):
+    """Same columns as the Excel export, streamed row by row as CSV."""
+    writer = csv.writer(_Echo())
+
+    def rows():
+        yield "\ufeff"  # BOM so Excel opens the UTF-8 file correctly
+        yield writer.writerow(QR_EXPORT_HEADERS)
+        for row in iter_qr_export_rows(qs):
+            yield writer.writerow(row)
+
+    resp = StreamingHttpResponse(rows(), content_type="text/csv; charset=utf-8")
+    resp["Content-Disposition"] = f'attachment; filename="{_export_filename("csv")}"'
     return resp
+
+
+class AdTextSearchMixin:
+    """
+    Admin search box for Ads backed by the full-text index: code prefix (the
+    unique code index serves it), exact owner username, or every word found
+    in the title/text values. Replaces the icontains scans over search_fields,
+    which are still used for terms without any word in them.
+    """
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        matches = match_ad_ids(term)
+        if matches is None:
+            return super().get_search_results(request, queryset, search_term)
+        q = Q(code__istartswith=term) | Q(owner__username=term) | Q(id__in=matches)
+        return queryset.filter(q), False
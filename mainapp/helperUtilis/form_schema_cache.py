@@ -0,0 +1,53 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# Compiled form schemas, one entry per (kind, category, locale).
+# Every key embeds a generation stamp; any FieldDefinition / FieldType /
+# AdCategory change (see mainapp/signals.py) bumps it, which orphans all
+# entries at once without having to know which categories exist.
+FORM_SCHEMA_PREFIX = "form_schema"
+_GENERATION_KEY = f"{FORM_SCHEMA_PREFIX}:generation"
+
+
+def _timeout():
+    return getattr(settings, "FORM_SCHEMA_CACHE_TIMEOUT", 60 * 60 * 24)
+
+
+def _generation():
+    gen = cache.get(_GENERATION_KEY)
+    if gen is None:
+        cache.add(_GENERATION_KEY, time.time_ns(), None)
+        gen = cache.get(_GENERATION_KEY)
+    return gen
+
+
+def schema_version(data) -> str:
+    """Content hash of a compiled schema (stable across processes)."""
+    raw = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def get_cached_schema(kind: str, category_key: str, locale: str, build):
+    """
+    Return {"data": ..., "version": ...} for the schema, compiling it with
+    `build()` on a miss. `build` returns None when the category doesn't exist
+    (nothing is cached then).
+    """
+    key = f"{FORM_SCHEMA_PREFIX}:{_generation()}:{kind}:{category_key}:{locale}"
+    entry = cache.get(key)
+    if entry is None:
+        data = build()
+        if data is None:
+            return None
+        entry = {"data": data, "version": schema_version(data)}
+        cache.set(key, entry, _timeout())
+    return entry
+
+
+def invalidate_form_schemas():
+    transaction.on_commit(lambda: cache.set(_GENERATION_KEY, time.time_ns(), None))
@@ -1,22 +1,65 @@
-import qrcode
+import os
+from functools import lru_cache
 from io import BytesIO
+
+import qrcode
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
+from reportlab.lib.utils import ImageReader
+from django.conf import settings
 from django.contrib.staticfiles import finders
 
 
-def generate_qr_image(data, code):
+# =========================
+# Prepared logo (process-level cache)
+# =========================
+_found_logo = []  # path of logo.png once found; a miss is looked up again next time
 
-    file_name = f"qr_{code}.png"
-    path = f"qr/images/{file_name}"
 
-    # ⚠️ IMPORTANT: disable this during testing if needed
-    if default_storage.exists(path):
-        return default_storage.url(path), None
+def _logo_path():
+    # 🔹 Get static file correctly (production-safe)
+    if not _found_logo:
+        path = finders.find("logo.png")
+        if not path:
+            return None
+        _found_logo.append(path)
+    return _found_logo[0]
+
+
+@lru_cache(maxsize=32)
+def _prepare_logo(logo_path, mtime, logo_size):
+    """
+    Resized logo on a white circle + its circular mask, ready to paste.
+    Keyed by (path, mtime, size): replacing logo.png invalidates it.
+    """
+    from PIL import Image, ImageDraw
+
+    logo = Image.open(logo_path).convert("RGBA")
+    logo = logo.resize((logo_size, logo_size))
+
+    # 🔹 Create circular mask
+    mask = Image.new("L", (logo_size, logo_size), 0)
+    draw = ImageDraw.Draw(mask)
+    draw.ellipse((0, 0, logo_size, logo_size), fill=255)
 
+    # 🔹 Add white background (improves scan reliability)
+    white_bg = Image.new("RGBA", (logo_size, logo_size), (255, 255, 255, 255))
+    white_bg.paste(logo, (0, 0), mask=logo)
+    return white_bg, mask
+
+
+def prepared_logo(logo_size):
+    logo_path = _logo_path()
+    if not logo_path:
+        raise Exception("Logo NOT FOUND in static files")
+    return _prepare_logo(logo_path, os.path.getmtime(logo_path), logo_size)
+
+
+def render_qr_image(data):
+    """QR (ERROR_CORRECT_H, box 20) with the round logo in the middle, as a PIL image."""
     qr = qrcode.QRCode(
         version=None,
         error_correction=qrcode.constants.ERROR_CORRECT_H,
@@ -33,30 +76,11 @@ def generate_qr_image(data, code):
     # ✅ Add center circular logo
     # =========================
     try:
-        from PIL import Image, ImageDraw
-
-        # 🔹 Get static file correctly (production-safe)
-        logo_path = finders.find("logo.png")
-
-        if not logo_path:
-            raise Exception("Logo NOT FOUND in static files")
-
-        logo = Image.open(logo_path).convert("RGBA")
-
         # 🔹 Resize logo (smaller for better scanning)
         qr_width, qr_height = img.size
         logo_size = int(qr_width * 0.18)   # reduced from 0.2
 
-        logo = logo.resize((logo_size, logo_size))
-
-        # 🔹 Create circular mask
-        mask = Image.new("L", (logo_size, logo_size), 0)
-        draw = ImageDraw.Draw(mask)
-        draw.ellipse((0, 0, logo_size, logo_size), fill=255)
-
-        # 🔹 Add white background (improves scan reliability)
-        white_bg = Image.new("RGBA", (logo_size, logo_size), (255, 255, 255, 255))
-        white_bg.paste(logo, (0, 0), mask=logo)
+        white_bg, mask = prepared_logo(logo_size)
 
         # 🔹 Center position
         pos = ((qr_width - logo_size) // 2, (qr_height - logo_size) // 2)
@@ -67,18 +91,59 @@ def generate_qr_image(data, code):
     except Exception as e:
         print("❌ Logo not added:", e)
 
+    return img
+
+
+def _save_png(img, path):
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    default_storage.save(path, ContentFile(buffer.getvalue()))
+    return default_storage.url(path)
+
+
+def generate_qr_image(data, code):
+
+    file_name = f"qr_{code}.png"
+    path = f"qr/images/{file_name}"
+
+    # ⚠️ IMPORTANT: disable this during testing if needed
+    if default_storage.exists(path):
+        return default_storage.url(path), None
+
+    img = render_qr_image(data)
+
     # =========================
     # Save QR
     # =========================
-    buffer = BytesIO()
-    img.save(buffer, format="PNG")
+    return _save_png(img, path), img
 
-    default_storage.save(path, ContentFile(buffer.getvalue()))
 
-    return default_storage.url(path), img
+def _draw_vector_qr(c, data, x, y, size):
+    """Same QR as render_qr_image(), as vector modules plus the round logo."""
+    from mainapp.helperUtilis.qr_matrix import draw_qr_vector, qr_matrix
+
+    modules_size, modules = qr_matrix(data, error_correction=qrcode.constants.ERROR_CORRECT_H, border=2)
+    draw_qr_vector(c, modules_size, modules, x, y, size)
 
+    # 🔹 Same round logo composite as the PNG, at 300 dpi for the printed size
+    logo_size = size * 0.18
+    try:
+        white_bg, mask = prepared_logo(round(logo_size / 72 * 300))
+    except Exception as e:
+        print("❌ Logo not added:", e)
+        return
 
-def generate_qr_pdf(qr_image, code):
+    logo = white_bg.convert("RGB")
+    logo.putalpha(mask)
+    c.drawImage(ImageReader(logo), x + (size - logo_size) / 2, y + (size - logo_size) / 2,
+                logo_size, logo_size, mask="auto")
+
+
+def generate_qr_pdf(qr_image, code, data=None):
+    """
+    A4 PDF with the QR. With `data` and QR_PDF_VECTOR the modules are drawn
+    as vector rectangles; otherwise `qr_image` (the PNG render) is embedded.
+    """
 
     file_name = f"qr_{code}.pdf"
     path = f"qr/pdf/{file_name}"
@@ -92,13 +157,16 @@ def generate_qr_pdf(qr_image, code):
 
     size = 120 * mm
 
-    c.drawInlineImage(
-        qr_image,
-        50 * mm,
-        120 * mm,
-        size,
-        size
-    )
+    if data and getattr(settings, "QR_PDF_VECTOR", True):
+        _draw_vector_qr(c, data, 50 * mm, 120 * mm, size)
+    else:
+        c.drawInlineImage(
+            qr_image,
+            50 * mm,
+            120 * mm,
+            size,
+            size
+        )
 
     # ✅ Branding text
     c.setFont("Helvetica-Bold", 14)
@@ -0,0 +1,171 @@
+import io
+import logging
+import os
+import queue
+import threading
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+
+log = logging.getLogger(__name__)
+
+# name -> longest edge in px. Each one is written as WebP and JPEG.
+RENDITIONS = (("thumb", 160), ("medium", 640), ("large", 1280))
+DERIVED_SUBDIR = "ads/derived"
+
+
+# ---------- reading ----------
+
+def storage_name(url):
+    """Storage name for a URL we served ourselves, else None (external image)."""
+    path = urlparse(url or "").path
+    media_url = urlparse(settings.MEDIA_URL).path
+    if not path.startswith(media_url):
+        return None
+    return path[len(media_url):]
+
+
+def rendition_url(renditions, name="thumb", fmt="jpeg"):
+    return ((renditions or {}).get(name) or {}).get(fmt)
+
+
+def srcset(renditions, fmt="jpeg"):
+    """'<url> 160w, <url> 640w, ...' for <img srcset> / <source srcset>."""
+    parts = []
+    for name, _ in RENDITIONS:
+        r = (renditions or {}).get(name)
+        if r and r.get(fmt):
+            parts.append(f"{r[fmt]} {r['width']}w")
+    return ", ".join(parts)
+
+
+# ---------- generation ----------
+
+def build_renditions(media):
+    """
+    Write thumb/medium/large WebP+JPEG copies of an AdMedia image and return
+    the renditions dict ({name: {"width", "webp", "jpeg"}}). Returns {} for
+    images that don't live in our storage.
+    """
+    from PIL import Image, ImageOps
+
+    name = storage_name(media.url)
+    if not name or not default_storage.exists(name):
+        return {}
+
+    stem = os.path.splitext(os.path.basename(name))[0]
+    with default_storage.open(name, "rb") as fh:
+        with Image.open(fh) as src:
+            src = ImageOps.exif_transpose(src)
+            if src.mode not in ("RGB", "L"):
+                src = src.convert("RGB")
+            src.load()
+
+    out = {}
+    for rendition, edge in RENDITIONS:
+        img = src.copy()
+        img.thumbnail((edge, edge), Image.LANCZOS)  # never upscales
+        entry = {"width": img.width}
+        for fmt, ext, opts in (("webp", "webp", {"quality": 80, "method": 4}),
+                               ("jpeg", "jpg", {"quality": 82, "optimize": True, "progressive": True})):
+            buf = io.BytesIO()
+            img.save(buf, fmt.upper(), **opts)
+            path = os.path.join(DERIVED_SUBDIR, f"{stem}_{rendition}.{ext}")
+            if default_storage.exists(path):
+                default_storage.delete(path)
+            saved = default_storage.save(path, ContentFile(buf.getvalue()))
+            entry[fmt] = default_storage.url(saved)
+        out[rendition] = entry
+    return out
+
+
+def delete_renditions(renditions):
+    for entry in (renditions or {}).values():
+        for fmt in ("webp", "jpeg"):
+            name = storage_name(entry.get(fmt))
+            if name:
+                default_storage.delete(name)
+
+
+def generate_for_media(media_id):
+    """Build and store renditions for one AdMedia row (no-op if it's gone)."""
+    from mainapp.models import AdMedia
+    from mainapp.helperUtilis.ad_page_cache import invalidate_ad_page
+
+    media = AdMedia.objects.select_related("ad").filter(pk=media_id, kind=AdMedia.IMAGE).first()
+    if media is None:
+        return None
+    renditions = build_renditions(media)
+    # update(): no post_save, so this doesn't re-queue itself
+    AdMedia.objects.filter(pk=media_id, url=media.url).update(renditions=renditions)
+    invalidate_ad_page(media.ad.code)
+    return renditions
+
+
+class DerivativeWorker:
+    """
+    Background thread that turns freshly uploaded images into renditions.
+
+    Producers call enqueue(media_id) (after commit); a daemon thread per
+    process drains the queue. Set IMAGE_DERIVATIVES_ASYNC = False to build
+    inline (management commands, debugging). Rows that never got renditions
+    (worker restarted, etc.) are picked up by `manage.py build_image_derivatives`.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=getattr(settings, "IMAGE_DERIVATIVES_MAX_QUEUE", 10000))
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def enqueue(self, media_id):
+        transaction.on_commit(lambda: self._submit(media_id))
+
+    def _submit(self, media_id):
+        if not getattr(settings, "IMAGE_DERIVATIVES_ASYNC", True):
+            self._process(media_id)
+            return
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(media_id)
+        except queue.Full:
+            log.warning("Image derivative queue full; media %s left for the backfill command", media_id)
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _worker_alive(self):
+        return self._thread is not None and self._thread.is_alive() and self._pid == os.getpid()
+
+    def _ensure_worker(self):
+        if self._worker_alive():
+            return
+        with self._start_lock:
+            if self._worker_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="image-derivatives", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            media_id = self._queue.get()
+            close_old_connections()
+            try:
+                self._process(media_id)
+            finally:
+                close_old_connections()
+                self._queue.task_done()
+
+    @staticmethod
+    def _process(media_id):
+        try:
+            generate_for_media(media_id)
+        except Exception:
+            log.exception("Building renditions for media %s failed", media_id)
+
+
+derivative_worker = DerivativeWorker()
@@ -0,0 +1,109 @@
+import hashlib
+import os
+import uuid
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+from rest_framework.exceptions import ValidationError
+
+# What an upload ends up as in storage. `peak_buffer` is the largest chunk
+# held in memory while copying (bounded by MEDIA_UPLOAD_CHUNK_SIZE).
+StoredUpload = namedtuple("StoredUpload", "url name size sha256 peak_buffer")
+
+IMAGE, VIDEO = "image", "video"
+
+
+def chunk_size():
+    return getattr(settings, "MEDIA_UPLOAD_CHUNK_SIZE", 256 * 1024)
+
+
+def max_upload_bytes(kind):
+    if kind == VIDEO:
+        return getattr(settings, "MEDIA_MAX_VIDEO_BYTES", 100 * 1024 * 1024)
+    return getattr(settings, "MEDIA_MAX_IMAGE_BYTES", 10 * 1024 * 1024)
+
+
+def _human(n):
+    return f"{n // (1024 * 1024)} MB" if n >= 1024 * 1024 else f"{n // 1024} KB"
+
+
+class UploadTooLarge(ValidationError):
+    def __init__(self, file_name, limit):
+        super().__init__(f"{file_name} is larger than {_human(limit)}")
+
+
+def check_upload_sizes(image_files=(), video_file=None):
+    """
+    Cheap pre-check on the sizes the upload handler reported, so a request is
+    rejected before anything is written. Returns an error message or None.
+    """
+    for f, kind in [(f, IMAGE) for f in image_files or ()] + [(video_file, VIDEO)]:
+        if f is None:
+            continue
+        limit = max_upload_bytes(kind)
+        if (getattr(f, "size", None) or 0) > limit:
+            return str(UploadTooLarge(f.name, limit).detail[0])
+    return None
+
+
+class _HashingReader(File):
+    """
+    Wraps an uploaded file for Storage.save(): yields fixed-size chunks,
+    hashes them and aborts as soon as more than `limit` bytes went through.
+    Deliberately hides temporary_file_path() so storage copies through
+    chunks() instead of moving the temp file unchecked.
+    """
+
+    def __init__(self, file_obj, limit, size):
+        super().__init__(file_obj, name=file_obj.name)
+        self.limit = limit
+        self.chunk = size
+        self.sha256 = hashlib.sha256()
+        self.copied = 0
+        self.peak_buffer = 0
+
+    def chunks(self, chunk_size=None):
+        if hasattr(self.file, "seek"):
+            self.file.seek(0)
+        while True:
+            data = self.file.read(self.chunk)
+            if not data:
+                break
+            self.copied += len(data)
+            if self.copied > self.limit:
+                raise UploadTooLarge(self.name, self.limit)
+            self.peak_buffer = max(self.peak_buffer, len(data))
+            self.sha256.update(data)
+            yield data
+
+    def multiple_chunks(self, chunk_size=None):
+        return True
+
+
+def store_upload(file_obj, subdir="ads", kind=IMAGE):
+    """
+    Copy an uploaded file to default_storage in MEDIA_UPLOAD_CHUNK_SIZE pieces.
+    Raises UploadTooLarge (a DRF ValidationError) mid-stream when the size
+    limit for `kind` is exceeded; the partial file is removed.
+    """
+    limit = max_upload_bytes(kind)
+    if (getattr(file_obj, "size", None) or 0) > limit:
+        raise UploadTooLarge(file_obj.name, limit)
+
+    _, ext = os.path.splitext(file_obj.name)
+    rel_path = os.path.join(subdir, f"{uuid.uuid4().hex[:12]}{ext}")
+    reader = _HashingReader(file_obj, limit, chunk_size())
+    try:
+        name = default_storage.save(rel_path, reader)
+    except UploadTooLarge:
+        default_storage.delete(rel_path)
+        raise
+    return StoredUpload(
+        url=default_storage.url(name),
+        name=name,
+        size=reader.copied,
+        sha256=reader.sha256.hexdigest(),
+        peak_buffer=reader.peak_buffer,
+    )
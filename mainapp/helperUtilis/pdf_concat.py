@@ -0,0 +1,77 @@
+from pypdf import PdfReader
+from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, StreamObject
+
+# Concatenating PDFs without holding the result: pypdf's PdfWriter keeps every
+# copied object until write(), which is what splitting a big sticker sheet
+# into parts was meant to avoid. Here each part's objects are renumbered and
+# written out as they're read; only the page list and xref offsets (ints)
+# grow with the document.
+
+CATALOG, PAGES = 1, 2
+
+
+def concat_pdfs(parts, out):
+    """Write the pages of the PDF files `parts`, in order, to `out` as one PDF."""
+    out.write(b"%PDF-1.4\n%\x93\x8c\x8b\x9e\n")
+    offsets = {}
+    kids = []
+    next_id = PAGES + 1
+
+    for part in parts:
+        reader = PdfReader(part)
+        numbers = {}  # (idnum, generation) in this part -> number in `out`
+        queue = []
+
+        def ref(indirect):
+            nonlocal next_id
+            key = (indirect.idnum, indirect.generation)
+            if key not in numbers:
+                numbers[key] = next_id
+                next_id += 1
+                queue.append(indirect)
+            return IndirectObject(numbers[key], 0, None)
+
+        def remap(value):
+            # copies: pypdf shares inherited dicts (/Resources) between pages
+            if isinstance(value, IndirectObject):
+                return ref(value)
+            if isinstance(value, DictionaryObject):
+                copy = value.__class__()
+                if isinstance(value, StreamObject):
+                    copy._data = value._data  # as read: still encoded
+                for key, item in dict.items(value):
+                    dict.__setitem__(copy, key, remap(item))
+                return copy
+            if isinstance(value, ArrayObject):
+                return ArrayObject(remap(item) for item in list.__iter__(value))
+            return value
+
+        for page in reader.pages:
+            kids.append(ref(page.indirect_reference).idnum)
+            while queue:
+                indirect = queue.pop()
+                number = numbers[(indirect.idnum, indirect.generation)]
+                obj = indirect.get_object()
+                is_page = isinstance(obj, DictionaryObject) and obj.get("/Type") == "/Page"
+                if is_page:  # re-parented below, the part's own page tree isn't copied
+                    obj = DictionaryObject((k, v) for k, v in dict.items(obj) if k != "/Parent")
+                obj = remap(obj)
+                if is_page:
+                    obj[NameObject("/Parent")] = IndirectObject(PAGES, 0, None)
+                offsets[number] = out.tell()
+                out.write(b"%d 0 obj\n" % number)
+                obj.write_to_stream(out)
+                out.write(b"\nendobj\n")
+
+    offsets[PAGES] = out.tell()
+    out.write(b"%d 0 obj\n<< /Type /Pages /Count %d /Kids [" % (PAGES, len(kids)))
+    out.write(b" ".join(b"%d 0 R" % kid for kid in kids))
+    out.write(b"] >>\nendobj\n")
+    offsets[CATALOG] = out.tell()
+    out.write(b"%d 0 obj\n<< /Type /Catalog /Pages %d 0 R >>\nendobj\n" % (CATALOG, PAGES))
+
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % next_id)
+    for number in range(1, next_id):
+        out.write(b"%010d 00000 n \n" % offsets[number])
+    out.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (next_id, CATALOG, xref))
@@ -0,0 +1,73 @@
+import random
+import string
+
+from django.db import transaction
+
+ALPHANUMERIC = string.ascii_uppercase + string.digits
+HEX = "0123456789ABCDEF"
+
+# codes per `code__in` query / INSERT statement (stays under SQLite's and
+# MySQL's placeholder/packet limits)
+CHUNK_SIZE = 2000
+
+_rng = random.SystemRandom()
+
+
+def random_codes(n, length, alphabet=ALPHANUMERIC):
+    """`n` distinct random codes (fewer only if the alphabet runs out)."""
+    codes = set()
+    while len(codes) < n:
+        missing = n - len(codes)
+        chars = "".join(_rng.choices(alphabet, k=missing * length))
+        codes.update(chars[i:i + length] for i in range(0, len(chars), length))
+    return codes
+
+
+def allocate_qr_codes(count, batch, length=8, alphabet=ALPHANUMERIC, max_rounds=10):
+    """
+    Insert `count` new QRCode rows for `batch` and return their codes.
+
+    Set-based: each round draws candidates for everything still missing,
+    drops those already taken with one `code__in` query per chunk, inserts
+    the rest with bulk_create(ignore_conflicts=True) and re-reads which of
+    them landed. Only the remainder (collisions, or rows a concurrent
+    allocator inserted first) goes to the next round.
+    """
+    from mainapp.models import QRCode
+
+    if count > len(alphabet) ** length // 2:
+        # past half the space every round is mostly collisions
+        raise RuntimeError(f"{count} codes is too many for length {length}; use longer codes.")
+
+    created = []
+    with transaction.atomic():
+        for _ in range(max_rounds):
+            missing = count - len(created)
+            if missing <= 0:
+                break
+            # oversample a little so a crowded code space still converges
+            candidates = list(random_codes(missing + missing // 4 + 8, length, alphabet) - set(created))
+            for start in range(0, len(candidates), CHUNK_SIZE):
+                missing = count - len(created)
+                if missing <= 0:
+                    break
+                chunk = candidates[start:start + CHUNK_SIZE]
+                taken = set(QRCode.objects.filter(code__in=chunk).values_list("code", flat=True))
+                fresh = [c for c in chunk if c not in taken][:missing]
+                if not fresh:
+                    continue
+                QRCode.objects.bulk_create(
+                    [QRCode(code=c, batch=batch, is_assigned=False, is_activated=False) for c in fresh],
+                    ignore_conflicts=True,
+                )
+                # ignore_conflicts doesn't report what was skipped
+                created.extend(
+                    QRCode.objects.filter(code__in=fresh, batch=batch).values_list("code", flat=True)
+                )
+        else:
+            if len(created) < count:
+                raise RuntimeError(
+                    f"Only {len(created)} of {count} unique QR codes after {max_rounds} rounds; "
+                    "use longer codes or a larger alphabet."
+                )
+    return created
@@ -0,0 +1,143 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+log = logging.getLogger(__name__)
+
+
+# ---------- pool side (no DB access) ----------
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def render_qr_artifacts(code, data):
+    """PNG + PDF for one QR code. Runs in a pool process; only touches storage."""
+    from PIL import Image
+    from django.core.files.storage import default_storage
+    from mainapp.helperUtilis.generate_qr_image import generate_qr_image, generate_qr_pdf
+
+    image_url, img = generate_qr_image(data=data, code=code)
+    if img is None and not getattr(settings, "QR_PDF_VECTOR", True):
+        # PNG left over from an earlier attempt; the PDF may still be missing
+        with default_storage.open(f"qr/images/qr_{code}.png", "rb") as fh:
+            img = Image.open(fh).convert("RGB")
+    pdf_url = generate_qr_pdf(img, code=code, data=data)
+    return image_url, pdf_url
+
+
+# ---------- job rows ----------
+
+def claim_job(job_id):
+    """Mark a pending/failed job running. Returns (code, data) or None if it isn't runnable."""
+    from mainapp.models import QRArtifactJob
+
+    claimed = (QRArtifactJob.objects
+               .filter(pk=job_id, status__in=[QRArtifactJob.PENDING, QRArtifactJob.FAILED])
+               .update(status=QRArtifactJob.RUNNING, attempts=F("attempts") + 1, updated_at=timezone.now()))
+    if not claimed:
+        return None
+    return QRArtifactJob.objects.filter(pk=job_id).values_list("qr__code", "data").first()
+
+
+def finish_job(job_id, error=None):
+    from mainapp.models import QRArtifactJob
+
+    QRArtifactJob.objects.filter(pk=job_id).update(
+        status=QRArtifactJob.FAILED if error else QRArtifactJob.DONE,
+        last_error=str(error)[:2000] if error else "",
+        updated_at=timezone.now(),
+    )
+
+
+def run_job(job_id):
+    """Claim, render and finish one job in the calling process."""
+    claimed = claim_job(job_id)
+    if claimed is None:
+        return False
+    try:
+        render_qr_artifacts(*claimed)
+    except Exception as e:
+        log.exception("QR artifacts for job %s failed", job_id)
+        finish_job(job_id, e)
+        return False
+    finish_job(job_id)
+    return True
+
+
+class QRJobRunner:
+    """
+    Per-process pool that renders QR PNG/PDF files off the request thread.
+
+    Jobs are QRArtifactJob rows, so nothing is lost if a worker dies: the row
+    stays pending/running and `manage.py run_qr_jobs` picks it up. The pool
+    uses spawned processes (no inherited DB connections or threads) and is
+    created on first use. Set QR_JOBS_ASYNC = False to render inline.
+    """
+
+    def __init__(self):
+        self.workers = getattr(settings, "QR_JOBS_WORKERS", 2)
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def enqueue(self, job):
+        transaction.on_commit(lambda: self._submit(job))
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+            return self._pool
+
+    def _reset(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, job):
+        job_id = job.pk
+        if not getattr(settings, "QR_JOBS_ASYNC", True):
+            job.status = job.DONE if run_job(job_id) else job.FAILED
+            return
+
+        claimed = claim_job(job_id)
+        if claimed is None:
+            return
+        try:
+            future = self._executor().submit(render_qr_artifacts, *claimed)
+        except (BrokenProcessPool, RuntimeError) as e:
+            self._reset()
+            finish_job(job_id, e)
+            return
+        future.add_done_callback(partial(self._finished, job_id))
+
+    def _finished(self, job_id, future):
+        # runs on the executor's management thread
+        try:
+            error = future.exception()
+            if error is not None:
+                log.error("QR artifacts for job %s failed: %s", job_id, error)
+                if isinstance(error, BrokenProcessPool):
+                    self._reset()
+            finish_job(job_id, error)
+        except Exception:
+            log.exception("Recording QR job %s failed", job_id)
+        finally:
+            close_old_connections()
+
+
+qr_jobs = QRJobRunner()
@@ -0,0 +1,108 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+
+import qrcode
+
+# Kept free of Django imports: pool processes are spawned and only import this module.
+
+
+def qr_matrix(data, error_correction=qrcode.constants.ERROR_CORRECT_M, border=4):
+    """
+    Module matrix for `data` (defaults match qrcode.make()), as (size, bytes):
+    one byte per module, row-major, 0 = dark, 255 = light. Cheap to pickle
+    across processes and loads straight into PIL with
+    Image.frombytes("L", (size, size), ...).
+    """
+    qr = qrcode.QRCode(error_correction=error_correction, border=border)
+    qr.add_data(data)
+    qr.make(fit=True)
+    matrix = qr.get_matrix()
+    return len(matrix), bytes(0 if dark else 255 for row in matrix for dark in row)
+
+
+def iter_qr_matrices(datas, workers=None, window=512, min_parallel=200):
+    """
+    Yield qr_matrix(d) for every d in `datas`, in order.
+
+    Inputs are read `window` at a time, so memory stays bounded whatever the
+    batch size. Once more than `min_parallel` items have been seen, windows
+    are fanned out to a process pool; small batches stay in-process (spawning
+    the pool costs more than it saves).
+    """
+    datas = iter(datas)
+    first = list(islice(datas, min_parallel + 1))
+    if len(first) <= min_parallel:
+        for d in first:
+            yield qr_matrix(d)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, window // (workers * 4))
+    pool = _pool(workers)
+    try:
+        # pool.map() submits eagerly: the next window is being computed
+        # while the caller consumes the current one (at most two in flight)
+        pending = pool.map(qr_matrix, first, chunksize=chunksize)
+        while pending is not None:
+            chunk = list(islice(datas, window))
+            upcoming = pool.map(qr_matrix, chunk, chunksize=chunksize) if chunk else None
+            yield from pending
+            pending = upcoming
+    except BrokenProcessPool:
+        _drop_pool(pool)
+        raise
+
+
+# One pool per process, started on the first big batch and reused by every
+# later one (spawning it per request cost more than the matrices).
+_pool_lock = threading.Lock()
+_shared = {"pool": None, "pid": None}
+
+
+def _pool(workers):
+    with _pool_lock:
+        if _shared["pool"] is None or _shared["pid"] != os.getpid():
+            _shared["pool"] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+            )
+            _shared["pid"] = os.getpid()
+        return _shared["pool"]
+
+
+def _drop_pool(pool):
+    with _pool_lock:
+        if _shared["pool"] is pool:
+            _shared["pool"] = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def draw_qr_vector(c, size, modules, x, y, width):
+    """
+    Draw a qr_matrix() result on a reportlab canvas as vector rectangles:
+    one rect per horizontal run of dark modules, all in a single filled path,
+    in module units (integer coordinates keep the content stream small).
+    """
+    unit = width / size
+    c.saveState()
+    c.translate(x, y)
+    c.scale(unit, unit)
+    p = c.beginPath()
+    for r in range(size):
+        row = modules[r * size:(r + 1) * size]
+        top = size - 1 - r  # matrix row 0 is the top edge
+        col = 0
+        while col < size:
+            if row[col]:
+                col += 1
+                continue
+            start = col
+            while col < size and not row[col]:
+                col += 1
+            p.rect(start, top, col - start, 1)
+    c.setFillColorRGB(0, 0, 0)
+    c.drawPath(p, stroke=0, fill=1)
+    c.restoreState()
@@ -0,0 +1,148 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+
+log = logging.getLogger(__name__)
+
+# What /qr/<code>/ needs to answer without touching QRCode / Ad rows.
+QRTarget = namedtuple("QRTarget", "qr_id ad_id ad_code is_assigned is_activated")
+
+SHARED_PREFIX = "qr_target"
+
+
+class QRResolver:
+    """
+    code -> QRTarget lookups for the public QR landing.
+
+    1. in-process LRU (bounded, short TTL; only activated stickers, which are final)
+    2. shared Django cache (all states; kept current by QRCode post_save)
+    3. one values_list() query joining the ad code
+
+    Each process warms its LRU in the background on first use with the most
+    recently scanned activated codes.
+    """
+
+    def __init__(self):
+        self.max_entries = getattr(settings, "QR_RESOLVER_MAX_ENTRIES", 50000)
+        self.local_ttl = getattr(settings, "QR_RESOLVER_LOCAL_TTL", 300)
+        self.shared_timeout = getattr(settings, "QR_RESOLVER_SHARED_TIMEOUT", 60 * 60 * 24)
+        self.use_shared = getattr(settings, "QR_RESOLVER_SHARED_CACHE", True)
+        self.warm_size = getattr(settings, "QR_RESOLVER_WARM_SIZE", 5000)
+        self._lru = OrderedDict()  # code -> (expires_at, QRTarget)
+        self._lock = threading.Lock()
+        self._warmed_pid = None
+
+    # ---------- lookups ----------
+    def resolve(self, code):
+        """Return a QRTarget, or None if the code does not exist."""
+        self._ensure_warm()
+
+        target = self._local_get(code)
+        if target is not None:
+            return target
+
+        if self.use_shared:
+            raw = cache.get(self._shared_key(code))
+            if raw is not None:
+                target = QRTarget(*raw)
+                self._local_set(code, target)
+                return target
+
+        target = self._load(code)
+        if target is not None:
+            self._store(code, target)
+        return target
+
+    def _load(self, code):
+        from mainapp.models import QRCode
+
+        row = (QRCode.objects
+               .filter(code=code)
+               .values_list("id", "ad_id", "ad__code", "is_assigned", "is_activated")
+               .first())
+        return QRTarget(*row) if row else None
+
+    # ---------- updates ----------
+    def remember(self, qr):
+        """Refresh the entry for a QRCode instance (after commit)."""
+        code = qr.code
+        ad_code = qr.ad.code if qr.ad_id else None
+        target = QRTarget(qr.id, qr.ad_id, ad_code, qr.is_assigned, qr.is_activated)
+        transaction.on_commit(lambda: self._store(code, target))
+
+    def forget(self, code):
+        with self._lock:
+            self._lru.pop(code, None)
+        if self.use_shared:
+            cache.delete(self._shared_key(code))
+
+    # ---------- internals ----------
+    @staticmethod
+    def _shared_key(code):
+        return f"{SHARED_PREFIX}:{code}"
+
+    def _store(self, code, target):
+        if self.use_shared:
+            cache.set(self._shared_key(code), tuple(target), self.shared_timeout)
+        if target.is_activated and target.ad_code:
+            self._local_set(code, target)
+        else:
+            with self._lock:
+                self._lru.pop(code, None)
+
+    def _local_get(self, code):
+        with self._lock:
+            hit = self._lru.get(code)
+            if hit is None:
+                return None
+            expires_at, target = hit
+            if expires_at < time.monotonic():
+                del self._lru[code]
+                return None
+            self._lru.move_to_end(code)
+            return target
+
+    def _local_set(self, code, target):
+        if not (target.is_activated and target.ad_code):
+            return
+        with self._lock:
+            self._lru[code] = (time.monotonic() + self.local_ttl, target)
+            self._lru.move_to_end(code)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    def _ensure_warm(self):
+        pid = os.getpid()
+        if self._warmed_pid == pid or not self.warm_size:
+            return
+        with self._lock:
+            if self._warmed_pid == pid:
+                return
+            self._warmed_pid = pid
+        threading.Thread(target=self._warm, name="qr-resolver-warm", daemon=True).start()
+
+    def _warm(self):
+        from mainapp.models import QRCode
+
+        close_old_connections()
+        try:
+            rows = (QRCode.objects
+                    .filter(is_activated=True, ad__isnull=False)
+                    .order_by("-last_scan_at")
+                    .values_list("code", "id", "ad_id", "ad__code", "is_assigned", "is_activated")
+                    [:self.warm_size])
+            for code, *rest in rows:
+                self._local_set(code, QRTarget(*rest))
+        except Exception:
+            log.exception("QR resolver warm-up failed")
+        finally:
+            close_old_connections()
+
+
+qr_resolver = QRResolver()
@@ -0,0 +1,167 @@
+import atexit
+import logging
+import os
+import threading
+from collections import deque, defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F, Value, DateTimeField
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+log = logging.getLogger(__name__)
+
+
+class ScanIngestor:
+    """
+    In-process buffer for QR scans.
+
+    Views call record() and return immediately; a daemon thread drains the
+    queue every `flush_interval` seconds (or as soon as `batch_size` events
+    are waiting) and writes the whole batch as:
+      - one bulk_create of QRScanLog rows
+      - one atomic F() update per scanned QRCode (no lost increments)
+    Scans pointing at a since-deleted ad are kept with ad=NULL.
+
+    Set QR_SCAN_ASYNC = False to write synchronously (management commands, debugging).
+    """
+
+    def __init__(self, batch_size=None, flush_interval=None, max_queue=None):
+        self.batch_size = batch_size or getattr(settings, "QR_SCAN_BATCH_SIZE", 200)
+        self.flush_interval = flush_interval or getattr(settings, "QR_SCAN_FLUSH_INTERVAL", 2.0)
+        # bounded: under a DB outage we drop the oldest scans instead of growing forever
+        self._events = deque(maxlen=max_queue or getattr(settings, "QR_SCAN_MAX_QUEUE", 50000))
+        self._wake = threading.Event()
+        self._start_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    # ---------- producer side ----------
+    def record(self, qr_id, ad_id=None, ip=None, user_agent=None, referrer=None):
+        self._events.append((qr_id, ad_id, timezone.now(), ip, user_agent, referrer))
+
+        if not getattr(settings, "QR_SCAN_ASYNC", True):
+            self.flush()
+            return
+
+        self._ensure_worker()
+        if len(self._events) >= self.batch_size:
+            self._wake.set()
+
+    def pending(self) -> int:
+        return len(self._events)
+
+    # ---------- consumer side ----------
+    def _worker_alive(self):
+        # a forked gunicorn worker inherits the object but not the thread
+        return self._thread is not None and self._thread.is_alive() and self._pid == os.getpid()
+
+    def _ensure_worker(self):
+        if self._worker_alive():
+            return
+        with self._start_lock:
+            if self._worker_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="qr-scan-ingestor", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                pass  # logged in flush(); keep the worker alive
+            finally:
+                close_old_connections()
+
+    def flush(self) -> int:
+        """
+        Write everything queued so far. Returns the number of scans written.
+        """
+        from mainapp.models import QRScanLog
+
+        with self._flush_lock:
+            batch = []
+            while self._events:
+                try:
+                    batch.append(self._events.popleft())
+                except IndexError:
+                    break
+            if not batch:
+                return 0
+
+            logs = [
+                QRScanLog(qr_id=qr_id, ad_id=ad_id, scanned_at=at, ip=ip, user_agent=ua, referrer=ref)
+                for qr_id, ad_id, at, ip, ua, ref in batch
+            ]
+            try:
+                try:
+                    self._write(logs)
+                except IntegrityError:
+                    # a code or ad deleted since the scan (e.g. a cached target of a
+                    # deleted ad): fix those rows up instead of losing the batch
+                    logs = self._without_dangling(logs)
+                    self._write(logs)
+            except Exception:
+                log.exception("Dropped %s QR scan event(s)", len(batch))
+                raise
+            return len(logs)
+
+    @staticmethod
+    def _write(logs):
+        """One bulk_create of the logs + one F() update per scanned QRCode."""
+        from mainapp.models import QRCode, QRScanLog
+
+        # qr_id -> [count, first_at, last_at]
+        counters = defaultdict(lambda: [0, None, None])
+        for row in logs:
+            c = counters[row.qr_id]
+            c[0] += 1
+            c[1] = c[1] or row.scanned_at
+            c[2] = row.scanned_at
+
+        with transaction.atomic():
+            QRScanLog.objects.bulk_create(logs, batch_size=500)
+            for qr_id, (n, first_at, last_at) in counters.items():
+                QRCode.objects.filter(pk=qr_id).update(
+                    scans_count=F("scans_count") + n,
+                    first_scan_at=Coalesce(
+                        "first_scan_at", Value(first_at, output_field=DateTimeField())
+                    ),
+                    last_scan_at=last_at,
+                )
+
+    @staticmethod
+    def _without_dangling(logs):
+        """What the FKs would have done had the rows existed: ad SET_NULL, qr CASCADE."""
+        from mainapp.models import Ad, QRCode
+
+        qr_ids = set(QRCode.objects.filter(pk__in={r.qr_id for r in logs}).values_list("pk", flat=True))
+        ad_ids = set(Ad.objects.filter(pk__in={r.ad_id for r in logs if r.ad_id})
+                     .values_list("pk", flat=True))
+        kept = [r for r in logs if r.qr_id in qr_ids]
+        for row in kept:
+            row.pk = None  # may have been set by the rolled-back insert
+            if row.ad_id not in ad_ids:
+                row.ad_id = None
+        if len(kept) < len(logs):
+            log.warning("Dropped %s scan(s) of deleted QR codes", len(logs) - len(kept))
+        return kept
+
+
+scan_ingestor = ScanIngestor()
+
+
+@atexit.register
+def _flush_on_exit():
+    if scan_ingestor.pending():
+        try:
+            scan_ingestor.flush()
+        except Exception:
+            pass  # already logged
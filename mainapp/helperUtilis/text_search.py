@@ -0,0 +1,134 @@
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+# Full-text search over ads (title + text AdFieldValues, en/ar). Only values
+# of public fields go in; hidden ones (vin, ...) must not be findable.
+#
+# Both the stored documents and the queries go through normalize_text(), so
+# the database only ever sees folded lowercase tokens. Backends:
+#   mysql  - FULLTEXT index on AdSearchDocument.document, MATCH ... AGAINST
+#   sqlite - FTS5 table kept in sync by triggers (migration 0012)
+#   other  - icontains per token over AdSearchDocument (dev only)
+
+DOC_TABLE = "mainapp_adsearchdocument"
+FTS_TABLE = "mainapp_adsearchdocument_fts"
+MAX_QUERY_TOKENS = 8
+MAX_DOCUMENT_CHARS = 20000
+# FieldType keys whose values are words (numbers, dates and flags are not)
+TEXT_FIELD_TYPES = ("text", "textarea", "select", "multiselect")
+
+# harakat, superscript alef, quranic marks, tatweel
+_AR_DIACRITICS = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]")
+_AR_FOLD = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",   # alef forms
+    "ى": "ي", "ئ": "ي",                       # alef maqsura / hamza on ya
+    "ؤ": "و",
+    "ة": "ه",                                  # ta marbuta
+    "٠": "0", "١": "1", "٢": "2", "٣": "3", "٤": "4",
+    "٥": "5", "٦": "6", "٧": "7", "٨": "8", "٩": "9",
+})
+_TOKEN = re.compile(r"\w+")
+
+
+def normalize_text(text):
+    """Casefolded, Arabic-folded, diacritic-free text (Latin accents dropped too)."""
+    text = unicodedata.normalize("NFKC", str(text or "")).casefold()
+    text = _AR_DIACRITICS.sub("", text).translate(_AR_FOLD)
+    # Latin accents: é -> e (Arabic letters have no combining marks left)
+    text = "".join(ch for ch in unicodedata.normalize("NFD", text) if not unicodedata.combining(ch))
+    return text.replace("_", " ")
+
+
+def tokens(text):
+    return _TOKEN.findall(normalize_text(text))
+
+
+# ---------- documents ----------
+
+def _strings(value):
+    """Every string inside a JSON value ({"en","ar"} dicts, lists, plain strings)."""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for v in value.values():
+            yield from _strings(v)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            yield from _strings(v)
+
+
+def build_document(title, values):
+    """Normalized search document for an ad title + its AdFieldValue values."""
+    parts = [title or ""]
+    for value in values:
+        parts.extend(_strings(value))
+    seen, words = set(), []
+    for token in tokens(" ".join(parts)):
+        if token not in seen:
+            seen.add(token)
+            words.append(token)
+    return " ".join(words)[:MAX_DOCUMENT_CHARS]
+
+
+def build_documents(ads):
+    """AdSearchDocument rows for `ads` (their public text values read in one query)."""
+    from mainapp.models import AdFieldValue, AdSearchDocument
+
+    values = {}
+    for ad_id, value in (AdFieldValue.objects
+                         .filter(ad_id__in=[ad.id for ad in ads],
+                                 field__visible_public=True, field__type__key__in=TEXT_FIELD_TYPES)
+                         .values_list("ad_id", "value")):
+        values.setdefault(ad_id, []).append(value)
+    return [
+        AdSearchDocument(ad_id=ad.id, document=build_document(ad.title, values.get(ad.id, ())))
+        for ad in ads
+    ]
+
+
+# ---------- querying ----------
+
+def _mysql_query(words):
+    # boolean mode: every word required, prefix match
+    return " ".join(f"+{w}*" for w in words)
+
+
+def _fts5_query(words):
+    return " ".join('"{}"*'.format(w.replace('"', "")) for w in words)
+
+
+def match_ad_ids(query):
+    """
+    Subquery of ad ids whose document matches every word of `query` (prefix
+    match), for `.filter(id__in=...)`. None when the query has no words.
+    """
+    from mainapp.models import AdSearchDocument
+
+    words = tokens(query)[:MAX_QUERY_TOKENS]
+    if not words:
+        return None
+
+    qs = AdSearchDocument.objects.all()
+    vendor = connection.vendor
+    if vendor == "mysql":
+        # InnoDB skips words under innodb_ft_min_token_size (3); those are
+        # matched with LIKE inside the FULLTEXT hits instead
+        indexed = [w for w in words if len(w) >= 3]
+        if indexed:
+            qs = qs.filter(ad_id__in=RawSQL(
+                f"SELECT ad_id FROM {DOC_TABLE} WHERE MATCH(document) AGAINST (%s IN BOOLEAN MODE)",
+                [_mysql_query(indexed)],
+            ))
+        words = [w for w in words if len(w) < 3]
+    elif vendor == "sqlite":
+        qs = qs.filter(ad_id__in=RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [_fts5_query(words)],
+        ))
+        words = []
+
+    for w in words:
+        qs = qs.filter(document__icontains=w)
+    return qs.values("ad_id")
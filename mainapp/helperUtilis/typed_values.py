@@ -0,0 +1,131 @@
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.utils.dateparse import parse_date
+
+# FieldType.key -> which AdFieldValueTyped columns it fills. Select/text values
+# also fill number/date when they parse as one (year is a select of "2018"...).
+NUMBER_TYPES = {"number", "currency"}
+DATE_TYPES = {"date"}
+TEXT_TYPES = {"select", "text"}
+BOOLEAN_TYPES = {"boolean"}
+
+TEXT_MAX = 120
+NUMBER_LIMIT = Decimal("1e16")  # DecimalField(max_digits=20, decimal_places=4)
+TYPED_COLUMNS = ["ad", "field", "number", "date", "text"]
+
+
+def _scalar(value):
+    """{"value": x} / {"en": x, ...} -> x; lists are never projected."""
+    if isinstance(value, dict):
+        value = value.get("value", value.get("en"))
+    return None if isinstance(value, (dict, list, tuple)) else value
+
+
+def as_number(value):
+    value = _scalar(value)
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        number = Decimal(str(value).strip().replace(",", ""))
+    except (InvalidOperation, ValueError):
+        return None
+    if not number.is_finite() or abs(number) >= NUMBER_LIMIT:
+        return None
+    return number.quantize(Decimal("0.0001"))
+
+
+def as_date(value):
+    value = _scalar(value)
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return parse_date(str(value).strip()[:10]) if value else None
+    except ValueError:
+        return None
+
+
+def as_text(value):
+    value = _scalar(value)
+    if value is None or isinstance(value, bool):
+        return ""
+    text = str(value).strip().casefold()
+    return text if len(text) <= TEXT_MAX else ""
+
+
+def as_bool(value):
+    value = _scalar(value)
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return bool(value)
+    text = str(value or "").strip().lower()
+    if text in ("true", "1", "yes", "on"):
+        return True
+    if text in ("false", "0", "no", "off"):
+        return False
+    return None
+
+
+def project(value_row, type_key):
+    """AdFieldValueTyped for an AdFieldValue (with pk), or None if nothing is indexable."""
+    from mainapp.models import AdFieldValueTyped
+
+    number, day, text = None, None, ""
+    if type_key in NUMBER_TYPES:
+        number = as_number(value_row.value)
+    elif type_key in DATE_TYPES:
+        day = as_date(value_row.value)
+    elif type_key in TEXT_TYPES:
+        text = as_text(value_row.value)
+        number, day = as_number(value_row.value), as_date(value_row.value)
+    elif type_key in BOOLEAN_TYPES:
+        flag = as_bool(value_row.value)
+        if flag is not None:
+            number, text = Decimal(int(flag)), str(flag).lower()
+
+    if number is None and day is None and not text:
+        return None
+    return AdFieldValueTyped(
+        value_id=value_row.pk, ad_id=value_row.ad_id, field_id=value_row.field_id,
+        number=number, date=day, text=text,
+    )
+
+
+def sync_rows(value_rows, existing=None):
+    """
+    Bring the typed rows of `value_rows` (AdFieldValues with pks, field__type
+    loaded) in line: insert, update, or drop the ones with nothing to index.
+    `existing` is the set of value pks known to have a typed row (read when None).
+    """
+    from mainapp.models import AdFieldValueTyped
+
+    value_rows = [v for v in value_rows if v.pk]
+    if not value_rows:
+        return
+    typed, empty = [], []
+    for v in value_rows:
+        row = project(v, v.field.type.key if v.field.type_id else "text")
+        if row is None:
+            empty.append(v.pk)
+        else:
+            typed.append(row)
+
+    if existing is None:
+        existing = set(AdFieldValueTyped.objects
+                       .filter(value_id__in=[v.pk for v in value_rows])
+                       .values_list("value_id", flat=True))
+    gone = [pk for pk in empty if pk in existing]
+    if gone:
+        AdFieldValueTyped.objects.filter(value_id__in=gone).delete()
+    AdFieldValueTyped.objects.bulk_create([r for r in typed if r.value_id not in existing])
+    AdFieldValueTyped.objects.bulk_update([r for r in typed if r.value_id in existing], TYPED_COLUMNS)
+
+
+def sync_ad(ad):
+    """Re-project every value of one ad (after the serializers' bulk writes)."""
+    from mainapp.models import AdFieldValue
+
+    sync_rows(AdFieldValue.objects.filter(ad=ad).select_related("field__type"))
@@ -0,0 +1,67 @@
+import secrets
+
+from django.db import IntegrityError, router, transaction
+
+# Public codes (Ad.code "AM-XXXXXXXC", publish-time QR codes "QRXXXXXXXXC"):
+# random Crockford base32 body + check symbol, claimed by inserting the row
+# and letting the unique index reject the rare duplicate. No SELECT before
+# the INSERT, and two concurrent saves can never end up with the same code.
+
+# Crockford base32: no I/L/O/U, so printed / typed codes can't be misread
+CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+ATTEMPTS = 5
+
+
+def check_symbol(body):
+    """
+    Luhn mod 32 over CROCKFORD: catches any single wrong symbol and every
+    adjacent swap except "0Z" <-> "Z0" (e.g. 1Z000 and 10Z00 share a check symbol).
+    """
+    n = len(CROCKFORD)
+    total, factor = 0, 2
+    for ch in reversed(body):
+        addend = factor * CROCKFORD.index(ch)
+        total += addend // n + addend % n
+        factor = 3 - factor
+    return CROCKFORD[-total % n]
+
+
+def has_valid_check(body_with_check):
+    body, check = body_with_check[:-1], body_with_check[-1:]
+    return bool(body) and all(ch in CROCKFORD for ch in body) and check == check_symbol(body)
+
+
+def random_code(prefix, length):
+    body = "".join(secrets.choice(CROCKFORD) for _ in range(length))
+    return f"{prefix}{body}{check_symbol(body)}"
+
+
+def _is_collision(error, instance, field):
+    # MySQL names the duplicate value, SQLite/PostgreSQL the table.column / column
+    message = str(error)
+    column = instance._meta.get_field(field).column
+    return (getattr(instance, field) in message
+            or f"{instance._meta.db_table}.{column}" in message
+            or f"({column})" in message)
+
+
+def insert_with_code(instance, make_code, insert, field="code", attempts=ATTEMPTS):
+    """
+    Give `instance` a fresh code from make_code() and run `insert` (the
+    actual save), drawing a new code when the unique index says it's taken.
+    Other integrity errors, and a collision on the last attempt, propagate.
+    """
+    using = router.db_for_write(type(instance), instance=instance)
+    # inside a transaction a rejected INSERT must not break it: savepoint;
+    # in autocommit the INSERT is its own transaction already
+    in_transaction = transaction.get_connection(using).in_atomic_block
+    for attempt in range(attempts):
+        setattr(instance, field, make_code())
+        try:
+            if not in_transaction:
+                return insert()
+            with transaction.atomic(using=using):
+                return insert()
+        except IntegrityError as e:
+            if attempt == attempts - 1 or not _is_collision(e, instance, field):
+                raise
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from mainapp.models import AdFieldValue
+from mainapp.helperUtilis.typed_values import sync_rows
+
+
+class Command(BaseCommand):
+    help = "Fill AdFieldValueTyped (typed/indexed copies of AdFieldValue) for existing values."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--category", help="Only values of this category key")
+        parser.add_argument("--type", action="append", dest="types",
+                            help="Only values of this field type key (repeatable), e.g. --type select --type text")
+
+    def handle(self, *args, **opts):
+        batch_size = opts["batch_size"]
+        started = time.perf_counter()
+
+        qs = AdFieldValue.objects.select_related("field__type").order_by("id")
+        if opts["category"]:
+            qs = qs.filter(field__category__key=opts["category"])
+        if opts["types"]:
+            qs = qs.filter(field__type__key__in=opts["types"])
+
+        done = 0
+        batch = []
+        for value in qs.iterator(chunk_size=batch_size):
+            batch.append(value)
+            if len(batch) >= batch_size:
+                done += self._flush(batch)
+                batch = []
+        if batch:
+            done += self._flush(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Projected {done} values in {time.perf_counter() - started:.2f}s"
+        ))
+
+    @staticmethod
+    def _flush(batch):
+        with transaction.atomic():
+            sync_rows(batch)
+        return len(batch)
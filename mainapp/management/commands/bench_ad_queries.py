@@ -0,0 +1,122 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from mainapp.models import Ad, AdCategory, AdFieldValue, AdMedia, FieldDefinition, FieldType
+from mainapp.views.coreViews import AdFormView, MyAdsByTokenView, MyAdsListView, PublicAdByCodeView
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Query counts and timings of the ad list/detail endpoints and the "
+        "AdFormView write path at growing ad counts. Seeds throw-away ads inside "
+        "a transaction that is rolled back. The budgets themselves are asserted "
+        "in mainapp/tests.py."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="1,50,500", help="Comma separated ad counts")
+
+    def handle(self, *args, **opts):
+        sizes = [int(x) for x in opts["sizes"].split(",") if x.strip()]
+        results = {}
+        try:
+            with transaction.atomic():
+                user, token, category, fields = self._seed_base()
+                seeded = 0
+                for n in sorted(sizes):
+                    self._seed_ads(user, category, fields, n - seeded)
+                    seeded = n
+                    results[n] = self._measure(token, category)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        header = f"{'ads':>6} | {'endpoint':<26} | {'queries':>7} | {'ms':>8}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for n in sizes:
+            for name, (count, ms) in results[n].items():
+                self.stdout.write(f"{n:>6} | {name:<26} | {count:>7} | {ms:>8.1f}")
+
+    # ---------- helpers ----------
+    def _seed_base(self):
+        user = User.objects.create(username=f"bench-{timezone.now().timestamp()}")
+        token = Token.objects.create(user=user)
+        category = AdCategory.objects.create(key=f"bench-{user.id}", name_en="Bench")
+        ftype, _ = FieldType.objects.get_or_create(key="text", defaults={"name": "Text"})
+        fields = [
+            FieldDefinition.objects.create(category=category, key=k, type=ftype, label_en=k)
+            for k in ("make", "model", "year", "color")
+        ]
+        return user, token, category, fields
+
+    @staticmethod
+    def _form_body(category, n):
+        return {
+            "category": category.key, "title": "Bench", "price": "1000", "city": "Amman",
+            "values": {"make": "toyota", "model": "camry", "year": str(2000 + n), "color": "white"},
+            "images": [f"https://example.com/{n}-{i}.jpg" for i in range(3)],
+            "video": f"https://example.com/{n}.mp4",
+        }
+
+    def _seed_ads(self, user, category, fields, count):
+        now = timezone.now()
+        for _ in range(count):
+            ad = Ad.objects.create(owner=user, category=category, title="Bench",
+                                   status="published", published_at=now)
+            AdFieldValue.objects.bulk_create([AdFieldValue(ad=ad, field=f, value="x") for f in fields])
+            AdMedia.objects.bulk_create(
+                [AdMedia(ad=ad, kind=AdMedia.IMAGE, url=f"https://example.com/{i}.jpg", order_index=i)
+                 for i in range(3)]
+                + [AdMedia(ad=ad, kind=AdMedia.VIDEO, url="https://example.com/v.mp4")]
+            )
+
+    def _measure(self, token, category):
+        rf = RequestFactory()
+        code = Ad.objects.filter(owner=token.user).values_list("code", flat=True).first()
+        auth = {"HTTP_AUTHORIZATION": f"Token {token.key}"}
+        created = {}
+
+        def form_create():
+            response = AdFormView.as_view()(rf.post(
+                "/api/ads/form", self._form_body(category, 1), content_type="application/json", **auth))
+            created["id"] = response.data["data"]["ad"]["id"]
+            return response
+
+        def form_edit():
+            body = {**self._form_body(category, 2), "ad_id": created["id"]}
+            return AdFormView.as_view()(rf.post(
+                "/api/ads/form", body, content_type="application/json", **auth))
+
+        calls = {
+            "POST /api/ads/mine": lambda: MyAdsListView.as_view()(
+                rf.post("/api/ads/mine", {"token": token.key}, content_type="application/json")),
+            "POST /api/ads/by-token": lambda: MyAdsByTokenView.as_view()(
+                rf.post("/api/ads/by-token", {"token": token.key}, content_type="application/json")),
+            "GET /api/public/ads/<c>": lambda: PublicAdByCodeView.as_view()(
+                rf.get(f"/api/public/ads/{code}"), code=code),
+            "POST /api/ads/form create": form_create,
+            "POST /api/ads/form edit": form_edit,
+        }
+        out = {}
+        for name, call in calls.items():
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = call()
+                response.render()
+                elapsed = (time.perf_counter() - started) * 1000
+            if response.status_code not in (200, 201):
+                raise CommandError(f"{name} returned {response.status_code}: {response.content[:200]}")
+            out[name] = (len(ctx), elapsed)
+        return out
@@ -0,0 +1,106 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connection, connections
+
+from mainapp.models import QRCode
+from mainapp.helperUtilis.unique_codes import insert_with_code, random_code
+
+BENCH_BATCH = "bench-codes"
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark single-row code allocation: the old probe-then-insert loop "
+        "against insert-and-retry on the unique index, optionally from several "
+        "threads at once. Writes QRCode rows tagged batch='bench-codes' and "
+        "deletes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=2000, help="Rows per strategy (split across threads)")
+        parser.add_argument("--threads", type=int, default=1)
+        parser.add_argument("--length", type=int, default=8,
+                            help="Code body length; small values (2-3) force collisions")
+
+    def handle(self, *args, **opts):
+        count, threads, length = opts["count"], max(1, opts["threads"]), opts["length"]
+        prefix = "BENCH"
+        space = 32 ** length
+        if count * 2 > space:
+            raise CommandError(f"--count {count} needs a code space of at least {count * 2}, "
+                               f"--length {length} gives {space}")
+
+        drawn_lock = threading.Lock()
+
+        def make_code():
+            with drawn_lock:
+                stats["drawn"] += 1
+            return random_code(prefix, length)
+
+        def probe_then_insert():
+            for _ in range(6):
+                code = make_code()
+                if not QRCode.objects.filter(code=code).exists():
+                    break
+            QRCode.objects.create(code=code, batch=BENCH_BATCH)
+
+        def insert_and_retry():
+            qr = QRCode(batch=BENCH_BATCH)
+            insert_with_code(qr, make_code, lambda: qr.save(force_insert=True))
+
+        self.stdout.write(f"{'strategy':<18} | {'rows':>6} | {'queries':>7} | {'retries':>7} | "
+                          f"{'errors':>6} | {'rows/s':>8}")
+        self.stdout.write("-" * 68)
+        QRCode.objects.filter(batch=BENCH_BATCH).delete()
+        try:
+            for name, allocate in (("probe + insert", probe_then_insert),
+                                   ("insert + retry", insert_and_retry)):
+                stats = {"drawn": 0, "errors": 0}
+                rows, queries, elapsed = self._run(allocate, count, threads, stats)
+                self.stdout.write(
+                    f"{name:<18} | {rows:>6} | {queries:>7} | {stats['drawn'] - rows - stats['errors']:>7} | "
+                    f"{stats['errors']:>6} | {rows / elapsed:>8.0f}"
+                )
+                QRCode.objects.filter(batch=BENCH_BATCH).delete()
+        finally:
+            QRCode.objects.filter(batch=BENCH_BATCH).delete()
+
+    @staticmethod
+    def _run(allocate, count, threads, stats):
+        """-> (rows written, statements issued, seconds)."""
+        lock = threading.Lock()
+        stats["queries"] = 0
+        per_thread = [count // threads + (1 if i < count % threads else 0) for i in range(threads)]
+
+        def count_query(execute, sql, params, many, context):
+            with lock:
+                stats["queries"] += 1
+            return execute(sql, params, many, context)
+
+        def worker(n):
+            try:
+                with connection.execute_wrapper(count_query):
+                    for _ in range(n):
+                        try:
+                            allocate()
+                        except IntegrityError:
+                            with lock:
+                                stats["errors"] += 1
+            finally:
+                if threads > 1:
+                    connections.close_all()
+
+        started = time.perf_counter()
+        if threads == 1:
+            worker(count)
+        else:
+            pool = [threading.Thread(target=worker, args=(n,)) for n in per_thread]
+            for t in pool:
+                t.start()
+            for t in pool:
+                t.join()
+        elapsed = time.perf_counter() - started
+        rows = QRCode.objects.filter(batch=BENCH_BATCH).count()
+        return rows, stats["queries"], elapsed
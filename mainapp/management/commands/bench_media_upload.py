@@ -0,0 +1,64 @@
+import os
+import tempfile
+import time
+import tracemalloc
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from mainapp.helperUtilis.media_upload import VIDEO, chunk_size, store_upload
+
+
+class Command(BaseCommand):
+    help = (
+        "Peak memory / time of saving one upload: the old ContentFile(read()) "
+        "path vs. the chunked store_upload(). Writes into a throw-away MEDIA_ROOT."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--mb", type=int, default=50, help="Upload size in MB")
+
+    def handle(self, *args, **opts):
+        size = opts["mb"] * 1024 * 1024
+        with tempfile.TemporaryDirectory() as media_root, \
+                override_settings(MEDIA_ROOT=media_root, MEDIA_MAX_VIDEO_BYTES=size):
+            rows = [
+                ("ContentFile(read())", self._measure(size, self._legacy)),
+                ("store_upload()", self._measure(size, lambda f: store_upload(f, "bench", kind=VIDEO))),
+            ]
+
+        header = f"{'path':<20} | {'peak MB':>8} | {'ms':>8}"
+        self.stdout.write(f"upload: {opts['mb']} MB, chunk: {chunk_size() // 1024} KB")
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for name, (peak, ms) in rows:
+            self.stdout.write(f"{name:<20} | {peak / (1024 * 1024):>8.2f} | {ms:>8.1f}")
+
+    @staticmethod
+    def _legacy(f):
+        name = default_storage.save(os.path.join("bench", f.name), ContentFile(f.read()))
+        return default_storage.url(name)
+
+    @staticmethod
+    def _measure(size, save):
+        f = TemporaryUploadedFile("bench.mp4", "video/mp4", size, None)
+        try:
+            block = os.urandom(1024 * 1024)
+            for _ in range(size // len(block)):
+                f.write(block)
+            f.seek(0)
+
+            tracemalloc.start()
+            started = time.perf_counter()
+            save(f)
+            elapsed = (time.perf_counter() - started) * 1000
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        except Exception as e:
+            raise CommandError(f"upload failed: {e}")
+        finally:
+            f.close()
+        return peak, elapsed
@@ -0,0 +1,40 @@
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from mainapp.helperUtilis import generate_qr_image as qr_images
+
+
+class Command(BaseCommand):
+    help = (
+        "Per-QR render time of generate_qr_image with the logo prepared for every "
+        "QR (old behaviour) vs. the cached logo composite. Writes into a throw-away MEDIA_ROOT."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=100, help="QRs per run")
+
+    def handle(self, *args, **opts):
+        count = opts["count"]
+        items = [(f"https://aimotoria.com/ads/BENCH{i:05d}", f"BENCH{i:05d}") for i in range(count)]
+
+        rows = []
+        for name, cold in (("logo per QR", True), ("cached logo", False)):
+            qr_images._prepare_logo.cache_clear()
+            with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+                started = time.perf_counter()
+                for data, code in items:
+                    if cold:
+                        qr_images._found_logo.clear()
+                        qr_images._prepare_logo.cache_clear()
+                    qr_images.generate_qr_image(data, code)
+                rows.append((name, (time.perf_counter() - started) * 1000 / count))
+
+        header = f"{'path':<12} | {'ms/QR':>7}"
+        self.stdout.write(f"{count} QRs (ERROR_CORRECT_H, box_size=20, PNG to storage)")
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for name, ms in rows:
+            self.stdout.write(f"{name:<12} | {ms:>7.2f}")
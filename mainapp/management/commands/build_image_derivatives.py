@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from mainapp.helperUtilis.image_derivatives import generate_for_media
+from mainapp.models import AdMedia
+
+
+class Command(BaseCommand):
+    help = (
+        "Build thumb/medium/large WebP+JPEG renditions for ad images that don't "
+        "have them yet (backfill, or images the background worker missed)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Rebuild every image, not only missing ones")
+        parser.add_argument("--ad", type=int, help="Only this ad id")
+
+    def handle(self, *args, **opts):
+        qs = AdMedia.objects.filter(kind=AdMedia.IMAGE)
+        if not opts["all"]:
+            qs = qs.filter(renditions={})
+        if opts["ad"]:
+            qs = qs.filter(ad_id=opts["ad"])
+
+        built = skipped = failed = 0
+        for media_id in qs.order_by("id").values_list("id", flat=True).iterator():
+            try:
+                renditions = generate_for_media(media_id)
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"media {media_id}: {e}")
+                continue
+            if renditions:
+                built += 1
+            else:
+                skipped += 1  # external URL / missing file
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Renditions built: {built}, skipped (not in storage): {skipped}, failed: {failed}"
+        ))
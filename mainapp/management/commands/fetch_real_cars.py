@@ -1,10 +1,16 @@
+import csv
+import json
+import time
+from collections import defaultdict
+
 import requests
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 
 from mainapp.models import (
     CarMakeS,
     CarModelS,
+    choice_value,
 )
 from mainapp.utils import sync_car_fields
 
@@ -17,76 +23,206 @@ REAL_MAKES = [
     "volvo"
 ]
 
+VPIC_BASE = "https://vpic.nhtsa.dot.gov/api/vehicles"
 
-class Command(BaseCommand):
-    help = "Seed CarMake and CarModel tables from VPIC (source of truth)"
-
-    @transaction.atomic
-    def handle(self, *args, **kwargs):
-        self.stdout.write("🔄 Fetching car makes from VPIC...")
 
-        url = "https://vpic.nhtsa.dot.gov/api/vehicles/getallmakes?format=json"
-        raw = requests.get(url, timeout=30).json().get("Results", [])
+class Command(BaseCommand):
+    help = (
+        "Seed CarMake and CarModel tables from VPIC (source of truth). "
+        "Reads the live API, a local stand-in server (--source) or a JSON/CSV file (--file), "
+        "diffs against the DB in memory and applies bulk inserts/updates."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--source", default=VPIC_BASE,
+                            help="VPIC-compatible base URL (e.g. a local mirror: http://127.0.0.1:8080/api/vehicles)")
+        parser.add_argument("--file", help="Offline input: VPIC JSON ({'Results': [...]}) or CSV with make,model columns")
+        parser.add_argument("--all-makes", action="store_true", help="Don't restrict to REAL_MAKES")
+        parser.add_argument("--deactivate-missing", action="store_true",
+                            help="Deactivate makes/models that are not in the input")
+        parser.add_argument("--dry-run", action="store_true", help="Report the diff without writing")
+
+    def handle(self, *args, **opts):
+        timings = {}
+        started = time.perf_counter()
 
         # -----------------------------
-        # 1) Filter real makes
+        # 1) Load source: {make name: {model names}}
         # -----------------------------
-        makes = set()
-        for item in raw:
-            name = item["Make_Name"].strip()
-            if name.lower() in REAL_MAKES:
-                makes.add(name)
+        t = time.perf_counter()
+        if opts["file"]:
+            self.stdout.write(f"🔄 Reading car catalog from {opts['file']}...")
+            catalog = self._read_file(opts["file"])
+        else:
+            self.stdout.write(f"🔄 Fetching car catalog from {opts['source']}...")
+            catalog = self._fetch_vpic(opts["source"], opts["all_makes"])
 
-        makes = sorted(makes)
+        if not opts["all_makes"]:
+            catalog = {m: models for m, models in catalog.items() if m.lower() in REAL_MAKES}
+        timings["load"] = time.perf_counter() - t
 
-        self.stdout.write(f"✅ Found {len(makes)} real makes")
+        self.stdout.write(f"✅ Found {len(catalog)} makes, {sum(len(v) for v in catalog.values())} models")
 
         # -----------------------------
-        # 2) Insert / Update CarMake
+        # 2) Diff + apply
         # -----------------------------
-        make_map = {}  # EN name -> CarMake instance
-
-        for name in makes:
-            make, created = CarMakeS.objects.get_or_create(
-                name_en=name,
-                defaults={
-                    "name_ar": name,  # لاحقًا ممكن تعريب حقيقي
-                    "is_active": True
-                }
-            )
-            make_map[name] = make
-
-        self.stdout.write("✅ CarMake table synced")
+        t = time.perf_counter()
+        try:
+            with transaction.atomic():
+                report = self._apply(catalog, opts["deactivate_missing"])
+                if opts["dry_run"]:
+                    raise _DryRun
+        except _DryRun:
+            self.stdout.write(self.style.WARNING("Dry run: changes rolled back"))
+        timings["apply"] = time.perf_counter() - t
 
         # -----------------------------
-        # 3) Fetch & Insert CarModel
+        # 3) Sync to FieldDefinition (once)
         # -----------------------------
-        total_models = 0
+        if not opts["dry_run"]:
+            t = time.perf_counter()
+            sync_car_fields()
+            timings["sync_fields"] = time.perf_counter() - t
 
-        for make_name, make_obj in make_map.items():
-            self.stdout.write(f"↳ Fetching models for {make_name}")
+        timings["total"] = time.perf_counter() - started
+        self._report(report, timings)
+        self.stdout.write(self.style.SUCCESS("🎉 Car schema seeded and synced successfully"))
 
-            url = f"https://vpic.nhtsa.dot.gov/api/vehicles/GetModelsForMake/{make_name}?format=json"
-            models = requests.get(url, timeout=30).json().get("Results", [])
+    # ---------- sources ----------
+    def _fetch_vpic(self, base, all_makes):
+        base = base.rstrip("/")
+        session = requests.Session()
+        raw = session.get(f"{base}/getallmakes?format=json", timeout=30).json().get("Results", [])
 
-            for m in models:
-                model_name = m["Model_Name"].strip()
+        makes = sorted({
+            item["Make_Name"].strip() for item in raw
+            if all_makes or item["Make_Name"].strip().lower() in REAL_MAKES
+        })
 
-                CarModelS.objects.get_or_create(
-                    make=make_obj,
-                    name_en=model_name,
-                    defaults={
-                        "name_ar": model_name,
-                        "is_active": True
-                    }
-                )
-                total_models += 1
+        catalog = {}
+        for make_name in makes:
+            self.stdout.write(f"↳ Fetching models for {make_name}")
+            results = session.get(
+                f"{base}/GetModelsForMake/{make_name}?format=json", timeout=30
+            ).json().get("Results", [])
+            catalog[make_name] = {m["Model_Name"].strip() for m in results if m.get("Model_Name")}
+        return catalog
+
+    def _read_file(self, path):
+        try:
+            if path.lower().endswith(".csv"):
+                with open(path, newline="", encoding="utf-8") as f:
+                    rows = [
+                        {"Make_Name": r.get("make") or r.get("Make_Name"),
+                         "Model_Name": r.get("model") or r.get("Model_Name")}
+                        for r in csv.DictReader(f)
+                    ]
+            else:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+                rows = data.get("Results", []) if isinstance(data, dict) else data
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Can't read {path}: {e}")
+
+        catalog = defaultdict(set)
+        for row in rows:
+            make = (row.get("Make_Name") or "").strip()
+            model = (row.get("Model_Name") or "").strip()
+            if not make:
+                continue
+            models = catalog[make]
+            if model:
+                models.add(model)
+        return dict(catalog)
+
+    # ---------- diff ----------
+    def _apply(self, catalog, deactivate_missing):
+        report = defaultdict(int)
+
+        # Makes: match case-insensitively, like CarMakeS.clean()
+        existing_makes = {m.name_en.strip().lower(): m for m in CarMakeS.objects.all()}
+        new_makes, touched_makes = [], []
+        for name in sorted(catalog):
+            make = existing_makes.get(name.lower())
+            if make is None:
+                new_makes.append(CarMakeS(
+                    name_en=name, name_ar=name,  # لاحقًا ممكن تعريب حقيقي
+                    value=choice_value(name), is_active=True,
+                ))
+            elif not make.is_active:
+                make.is_active = True
+                touched_makes.append(make)
+
+        missing_makes = []
+        if deactivate_missing:
+            wanted = {n.lower() for n in catalog}
+            missing_makes = [m for k, m in existing_makes.items() if k not in wanted and m.is_active]
+            for m in missing_makes:
+                m.is_active = False
+
+        CarMakeS.objects.bulk_create(new_makes, batch_size=500)
+        CarMakeS.objects.bulk_update(touched_makes + missing_makes, ["is_active"], batch_size=500)
+        report["makes_inserted"] = len(new_makes)
+        report["makes_updated"] = len(touched_makes)
+        report["makes_deactivated"] = len(missing_makes)
+
+        # ids for the freshly inserted makes (bulk_create only returns pks on some backends)
+        make_ids = {
+            name.strip().lower(): pk
+            for pk, name in CarMakeS.objects.values_list("id", "name_en")
+        }
+
+        # Models: one read of the current rows, keyed like CarModelS.clean()
+        existing_models = {
+            (m.make_id, m.name_en.strip().lower()): m
+            for m in CarModelS.objects.filter(make_id__in=[make_ids[n.lower()] for n in catalog])
+        }
+        new_models, touched_models = [], []
+        wanted_models = set()
+        for make_name, models in catalog.items():
+            make_id = make_ids[make_name.lower()]
+            for name in sorted(models):
+                key = (make_id, name.lower())
+                if key in wanted_models:
+                    continue  # same model listed twice with different casing
+                wanted_models.add(key)
+                model = existing_models.get(key)
+                if model is None:
+                    new_models.append(CarModelS(
+                        make_id=make_id, name_en=name, name_ar=name,
+                        value=choice_value(name), is_active=True,
+                    ))
+                elif not model.is_active:
+                    model.is_active = True
+                    touched_models.append(model)
+
+        missing_models = []
+        if deactivate_missing:
+            missing_models = [
+                m for k, m in existing_models.items() if k not in wanted_models and m.is_active
+            ]
+            for m in missing_models:
+                m.is_active = False
+
+        CarModelS.objects.bulk_create(new_models, batch_size=1000)
+        CarModelS.objects.bulk_update(touched_models + missing_models, ["is_active"], batch_size=1000)
+        report["models_inserted"] = len(new_models)
+        report["models_updated"] = len(touched_models)
+        report["models_deactivated"] = len(missing_models)
+        return report
+
+    def _report(self, report, timings):
+        self.stdout.write("")
+        self.stdout.write(f"{'':<8} {'inserted':>9} {'updated':>9} {'deactivated':>12}")
+        for kind in ("makes", "models"):
+            self.stdout.write(
+                f"{kind:<8} {report[kind + '_inserted']:>9} "
+                f"{report[kind + '_updated']:>9} {report[kind + '_deactivated']:>12}"
+            )
+        self.stdout.write("timing: " + ", ".join(f"{k}={v:.2f}s" for k, v in timings.items()))
 
-        self.stdout.write(f"✅ Inserted / Updated {total_models} models")
 
-        # -----------------------------
-        # 4) Sync to FieldDefinition
-        # -----------------------------
-        sync_car_fields()
-        self.stdout.write(self.style.SUCCESS("🎉 Car schema seeded and synced successfully"))
+class _DryRun(Exception):
+    pass
 #          python manage.py fetch_real_cars
+#          python manage.py fetch_real_cars --file vpic_models.json --deactivate-missing --dry-run
@@ -1,12 +1,8 @@
-import csv, secrets, string
+import csv
+import time
 from django.core.management.base import BaseCommand, CommandError
-from django.conf import settings
-from mainapp.models import QRCode
+from mainapp.helperUtilis.qr_batch import allocate_qr_codes
 
-def make_code(length=8):
-    # A-Z + 0-9 (no ambiguous chars if you want)
-    alphabet = string.ascii_uppercase + string.digits
-    return ''.join(secrets.choice(alphabet) for _ in range(length))
 
 class Command(BaseCommand):
     help = "Generate a batch of pre-printed QR codes and export as CSV."
@@ -14,6 +10,7 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument("--batch", required=True, help="Batch label, e.g. OCT-2025")
         parser.add_argument("--count", type=int, default=100, help="How many codes")
+        parser.add_argument("--length", type=int, default=8, help="Code length (A-Z + 0-9)")
         parser.add_argument("--outfile", default="qr_batch.csv", help="CSV output path")
         parser.add_argument("--domain", default="https://aimotoria.com", help="Public domain")
 
@@ -23,22 +20,20 @@ class Command(BaseCommand):
         outfile = opts["outfile"]
         domain = opts["domain"]
 
-        created = []
-        for _ in range(count):
-            # ensure uniqueness
-            for _attempt in range(10):
-                code = make_code(8)  # tweak length if you want
-                if not QRCode.objects.filter(code=code).exists():
-                    q = QRCode.objects.create(code=code, batch=batch)
-                    created.append(q)
-                    break
-            else:
-                raise CommandError("Failed to generate a unique code after many attempts.")
+        started = time.perf_counter()
+        try:
+            # candidates checked with one code__in query per chunk, inserted in bulk
+            codes = allocate_qr_codes(count, batch, length=opts["length"])
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
 
         with open(outfile, "w", newline="") as f:
             w = csv.writer(f)
             w.writerow(["code", "url"])
-            for q in created:
-                w.writerow([q.code, f"{domain}/qr/{q.code}"])
+            for code in sorted(codes):
+                w.writerow([code, f"{domain}/qr/{code}"])
 
-        self.stdout.write(self.style.SUCCESS(f"Generated {len(created)} QR codes → {outfile}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {len(codes)} QR codes in {elapsed:.2f}s → {outfile}"
+        ))
@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from mainapp.models import Ad, AdSearchDocument, AdSearchIndex
+from mainapp.helperUtilis.ad_search_index import INDEX_AD_FIELDS, INDEX_COLUMNS, build_rows, write_rows
+from mainapp.helperUtilis.text_search import build_documents
+from mainapp.helperUtilis.ad_facets import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the AdSearchIndex rows (published ads) and AdSearchDocument "
+        "full-text documents (all ads): backfill, or repair after bulk changes "
+        "that bypassed the save hooks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **opts):
+        batch_size = opts["batch_size"]
+        started = time.perf_counter()
+
+        indexed = set(AdSearchIndex.objects.values_list("ad_id", flat=True))
+        documented = set(AdSearchDocument.objects.values_list("ad_id", flat=True))
+        rows_kept = set()
+        docs = 0
+
+        ads = Ad.objects.only(*INDEX_AD_FIELDS).order_by("id")
+        batch = []
+        for ad in ads.iterator(chunk_size=batch_size):
+            batch.append(ad)
+            if len(batch) >= batch_size:
+                rows_kept |= self._write(batch, indexed, documented)
+                docs += len(batch)
+                batch = []
+        if batch:
+            rows_kept |= self._write(batch, indexed, documented)
+            docs += len(batch)
+
+        # rows of ads that are no longer published
+        stale = list(indexed - rows_kept)
+        for i in range(0, len(stale), batch_size):
+            AdSearchIndex.objects.filter(ad_id__in=stale[i:i + batch_size]).delete()
+        # bulk writes above bypass the facet deltas
+        facets_fixed = reconcile()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Search index: {len(rows_kept)} published rows, {len(stale)} removed, "
+            f"{docs} text documents, {facets_fixed} facet counts fixed "
+            f"in {time.perf_counter() - started:.2f}s"
+        ))
+
+    @staticmethod
+    def _write(ads, indexed, documented):
+        rows = build_rows(ads)
+        with transaction.atomic():
+            write_rows(AdSearchIndex, rows, INDEX_COLUMNS, indexed)
+            write_rows(AdSearchDocument, build_documents(ads), ["document"], documented)
+        return {r.ad_id for r in rows}
@@ -0,0 +1,53 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from mainapp.helperUtilis.qr_jobs import run_job
+from mainapp.models import QRArtifactJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Render QR PNG/PDF files for QRArtifactJob rows the web pool didn't finish "
+        "(pending, failed, or stuck in running after a worker restart)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stale-after", type=int, default=10,
+                            help="Minutes after which a running job is considered dead")
+        parser.add_argument("--loop", action="store_true", help="Keep polling instead of exiting")
+        parser.add_argument("--interval", type=float, default=5.0, help="Seconds between polls with --loop")
+
+    def handle(self, *args, **opts):
+        while True:
+            done, failed = self._drain(opts["stale_after"])
+            if done or failed or not opts["loop"]:
+                self.stdout.write(f"QR jobs done: {done}, failed: {failed}")
+            if not opts["loop"]:
+                return
+            time.sleep(opts["interval"])
+
+    def _drain(self, stale_after):
+        max_attempts = getattr(settings, "QR_JOBS_MAX_ATTEMPTS", 3)
+        stale = timezone.now() - timedelta(minutes=stale_after)
+
+        # a dead worker leaves "running" behind; put those back in the queue
+        QRArtifactJob.objects.filter(status=QRArtifactJob.RUNNING, updated_at__lt=stale) \
+            .update(status=QRArtifactJob.FAILED, last_error="worker lost", updated_at=timezone.now())
+
+        ids = (QRArtifactJob.objects
+               .filter(Q(status=QRArtifactJob.PENDING) |
+                       Q(status=QRArtifactJob.FAILED, attempts__lt=max_attempts))
+               .order_by("id")
+               .values_list("id", flat=True))
+        done = failed = 0
+        for job_id in list(ids):
+            if run_job(job_id):
+                done += 1
+            else:
+                failed += 1
+        return done, failed
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.25 on 2026-10-18 10:36
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0004_carmakes_carmodels_alter_carmodel_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='qrscanlog',
+            name='scanned_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.25 on 2026-10-18 10:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0005_qrscanlog_scanned_at_default'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ad',
+            index=models.Index(fields=['owner', 'created_at', 'id'], name='ad_owner_created_idx'),
+        ),
+    ]
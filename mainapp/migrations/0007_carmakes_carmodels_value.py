@@ -0,0 +1,37 @@
+# Generated by Django 4.2.25 on 2026-10-18 10:41
+
+from django.db import migrations, models
+
+
+def fill_values(apps, schema_editor):
+    for model_name in ("CarMakeS", "CarModelS"):
+        Model = apps.get_model("mainapp", model_name)
+        rows = list(Model.objects.only("id", "name_en"))
+        for row in rows:
+            row.value = row.name_en.lower().strip().replace(" ", "_")
+        Model.objects.bulk_update(rows, ["value"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0006_ad_owner_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carmakes',
+            name='value',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=120),
+        ),
+        migrations.AddField(
+            model_name='carmodels',
+            name='value',
+            field=models.CharField(blank=True, editable=False, max_length=120),
+        ),
+        migrations.RunPython(fill_values, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='carmodels',
+            index=models.Index(fields=['make', 'is_active', 'value'], name='carmodel_make_value_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-18 10:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0007_carmakes_carmodels_value'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='admedia',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+    ]
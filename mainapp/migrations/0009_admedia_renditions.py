@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-18 10:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0008_admedia_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='admedia',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
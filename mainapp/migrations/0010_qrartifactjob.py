@@ -0,0 +1,27 @@
+# Generated by Django 4.2.25 on 2026-10-18 10:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0009_admedia_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QRArtifactJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.CharField(max_length=500)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='pending', max_length=8)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('qr', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='artifact_job', to='mainapp.qrcode')),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.25 on 2026-10-18 11:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0010_qrartifactjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdSearchIndex',
+            fields=[
+                ('ad', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_row', serialize=False, to='mainapp.ad')),
+                ('city', models.CharField(blank=True, max_length=100)),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('make', models.CharField(blank=True, max_length=120)),
+                ('model', models.CharField(blank=True, max_length=120)),
+                ('year', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('published_at', models.DateTimeField(blank=True, null=True)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='mainapp.adcategory')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['category', 'published_at'], name='adsearch_cat_pub_idx'), models.Index(fields=['category', 'make', 'model', 'year'], name='adsearch_cat_make_idx'), models.Index(fields=['category', 'city', 'published_at'], name='adsearch_cat_city_idx'), models.Index(fields=['category', 'price'], name='adsearch_cat_price_idx'), models.Index(fields=['category', 'year'], name='adsearch_cat_year_idx')],
+            },
+        ),
+    ]
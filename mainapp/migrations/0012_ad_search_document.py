@@ -0,0 +1,66 @@
+# Generated by Django 4.2.25 on 2026-10-18 11:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+DOC = "mainapp_adsearchdocument"
+FTS = "mainapp_adsearchdocument_fts"
+
+# SQLite: external-content FTS5 table over the documents, kept in sync by triggers
+SQLITE_FORWARD = [
+    f"""CREATE VIRTUAL TABLE {FTS} USING fts5(
+        document, content='{DOC}', content_rowid='ad_id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER {FTS}_ai AFTER INSERT ON {DOC} BEGIN
+        INSERT INTO {FTS}(rowid, document) VALUES (new.ad_id, new.document);
+    END""",
+    f"""CREATE TRIGGER {FTS}_ad AFTER DELETE ON {DOC} BEGIN
+        INSERT INTO {FTS}({FTS}, rowid, document) VALUES ('delete', old.ad_id, old.document);
+    END""",
+    f"""CREATE TRIGGER {FTS}_au AFTER UPDATE ON {DOC} BEGIN
+        INSERT INTO {FTS}({FTS}, rowid, document) VALUES ('delete', old.ad_id, old.document);
+        INSERT INTO {FTS}(rowid, document) VALUES (new.ad_id, new.document);
+    END""",
+]
+SQLITE_BACKWARD = [
+    f"DROP TRIGGER IF EXISTS {FTS}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS}_au",
+    f"DROP TABLE IF EXISTS {FTS}",
+]
+
+
+def add_fulltext(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "mysql":
+        schema_editor.execute(f"ALTER TABLE {DOC} ADD FULLTEXT INDEX adsearchdoc_ft (document)")
+    elif vendor == "sqlite":
+        for sql in SQLITE_FORWARD:
+            schema_editor.execute(sql)
+
+
+def drop_fulltext(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "mysql":
+        schema_editor.execute(f"ALTER TABLE {DOC} DROP INDEX adsearchdoc_ft")
+    elif vendor == "sqlite":
+        for sql in SQLITE_BACKWARD:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0011_ad_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdSearchDocument',
+            fields=[
+                ('ad', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='mainapp.ad')),
+                ('document', models.TextField(blank=True, default='')),
+            ],
+        ),
+        migrations.RunPython(add_fulltext, drop_fulltext),
+    ]
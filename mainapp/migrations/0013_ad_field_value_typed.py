@@ -0,0 +1,28 @@
+# Generated by Django 4.2.25 on 2026-10-18 11:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0012_ad_search_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdFieldValueTyped',
+            fields=[
+                ('value', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='typed', serialize=False, to='mainapp.adfieldvalue')),
+                ('number', models.DecimalField(blank=True, decimal_places=4, max_digits=20, null=True)),
+                ('date', models.DateField(blank=True, null=True)),
+                ('text', models.CharField(blank=True, default='', max_length=120)),
+                ('ad', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='mainapp.ad')),
+                ('field', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='mainapp.fielddefinition')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['field', 'number', 'ad'], name='adtyped_field_number_idx'), models.Index(fields=['field', 'date', 'ad'], name='adtyped_field_date_idx'), models.Index(fields=['field', 'text', 'ad'], name='adtyped_field_text_idx')],
+            },
+        ),
+    ]
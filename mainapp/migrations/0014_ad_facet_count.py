@@ -0,0 +1,28 @@
+# Generated by Django 4.2.25 on 2026-10-18 11:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0013_ad_field_value_typed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdFacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(max_length=16)),
+                ('parent', models.CharField(blank=True, default='', max_length=120)),
+                ('value', models.CharField(max_length=120)),
+                ('count', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='mainapp.adcategory')),
+            ],
+            options={
+                'unique_together': {('category', 'facet', 'parent', 'value')},
+            },
+        ),
+    ]
@@ -25,6 +25,7 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.db.models import Q
 import secrets, string
+from .helperUtilis.unique_codes import insert_with_code, random_code
 
 # ---- Field types (UI/input kinds) ----
 class FieldType(models.Model):
@@ -40,20 +41,30 @@ class AdCategory(models.Model):
     name_ar = models.CharField(max_length=80, blank=True, null=True)
     def __str__(self): return self.key
 
+def choice_value(name: str) -> str:
+    """'Land Rover' -> 'land_rover' (the `value` used in make/model choices)."""
+    return name.lower().strip().replace(" ", "_")
+
+
 class CarMakeS(models.Model):
     name_en = models.CharField(max_length=120)
     name_ar = models.CharField(max_length=120)
     desc = models.CharField(max_length=120, blank=True, null=True)
     is_active = models.BooleanField(default=True)
+    # choice_value(name_en), stored so the options API can look makes up by index
+    value = models.CharField(max_length=120, blank=True, db_index=True, editable=False)
 
     def clean(self):
         self.name_en = self.name_en.strip()
+        self.value = choice_value(self.name_en)
         if CarMakeS.objects.exclude(pk=self.pk).filter(
             name_en__iexact=self.name_en
         ).exists():
             raise ValidationError("Make already exists.")
 
     def save(self, *args, **kwargs):
+        # set here too, so the options API never depends on clean() having run
+        self.value = choice_value(self.name_en)
         self.full_clean()
         super().save(*args, **kwargs)
 
@@ -75,12 +86,18 @@ class CarModelS(models.Model):
     desc = models.CharField(max_length=120, blank=True, null=True)
 
     is_active = models.BooleanField(default=True)
+    value = models.CharField(max_length=120, blank=True, editable=False)
 
     class Meta:
         unique_together = ("make", "name_en")
+        indexes = [
+            # /api/cars/models?make=<value>&q=<prefix>
+            models.Index(fields=["make", "is_active", "value"], name="carmodel_make_value_idx"),
+        ]
 
     def clean(self):
         self.name_en = self.name_en.strip()
+        self.value = choice_value(self.name_en)
         if CarModelS.objects.exclude(pk=self.pk).filter(
             make=self.make,
             name_en__iexact=self.name_en
@@ -88,6 +105,8 @@ class CarModelS(models.Model):
             raise ValidationError("Model already exists for this make.")
 
     def save(self, *args, **kwargs):
+        # set here too, so the options API never depends on clean() having run
+        self.value = choice_value(self.name_en)
         self.full_clean()
         super().save(*args, **kwargs)
 
@@ -116,8 +135,8 @@ class FieldDefinition(models.Model):
 
 # ---- Ads ----
 def _gen_code(prefix="AM"):
-    alphabet = string.ascii_uppercase + string.digits
-    return f"{prefix}-{''.join(secrets.choice(alphabet) for _ in range(6))}"
+    # "AM-" + 7 Crockford base32 + check symbol; legacy codes are "AM-" + 6 [A-Z0-9]
+    return random_code(f"{prefix}-", 7)
 
 class Ad(models.Model):
     STATUS = (("draft","Draft"),("published","Published"),("archived","Archived"))
@@ -134,14 +153,18 @@ class Ad(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     published_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # keyset pagination of "my ads" (owner, created_at desc, id desc)
+            models.Index(fields=["owner", "created_at", "id"], name="ad_owner_created_idx"),
+        ]
+
     def save(self, *args, **kwargs):
-        if not self.code:
-            for _ in range(6):
-                c = _gen_code("AM")
-                if not Ad.objects.filter(code=c).exists():
-                    self.code = c
-                    break
-        return super().save(*args, **kwargs)
+        if self.code:
+            return super().save(*args, **kwargs)
+        # no probe: the unique index rejects a taken code and a new one is drawn
+        return insert_with_code(self, lambda: _gen_code("AM"),
+                                lambda: super(Ad, self).save(*args, **kwargs))
     def __str__(self): return self.code
 
 # ---- Dynamic field values (one row per field per ad) ----
@@ -157,6 +180,32 @@ class AdFieldValue(models.Model):
         indexes = [models.Index(fields=['ad','field'])]
     def __str__(self): return f"{self.ad.code}:{self.field.key}={self.value}"
 
+
+class AdFieldValueTyped(models.Model):
+    """
+    Typed, indexable copy of an AdFieldValue, filled from FieldDefinition.type
+    by helperUtilis/typed_values.py: number/currency/boolean -> number,
+    date -> date, select/text/boolean -> text (short strings only); select/text
+    values that parse as a number or date fill those columns too.
+    Lets "year between 2015 and 2020" or "mileage < 100k" use an index
+    instead of JSON-extracting every value row.
+    """
+    value = models.OneToOneField(AdFieldValue, on_delete=models.CASCADE, primary_key=True, related_name="typed")
+    ad = models.ForeignKey(Ad, on_delete=models.CASCADE, related_name="+")
+    field = models.ForeignKey(FieldDefinition, on_delete=models.CASCADE, related_name="+")
+    number = models.DecimalField(max_digits=20, decimal_places=4, null=True, blank=True)
+    date = models.DateField(null=True, blank=True)
+    text = models.CharField(max_length=120, blank=True, default="")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["field", "number", "ad"], name="adtyped_field_number_idx"),
+            models.Index(fields=["field", "date", "ad"], name="adtyped_field_date_idx"),
+            models.Index(fields=["field", "text", "ad"], name="adtyped_field_text_idx"),
+        ]
+
+    def __str__(self): return f"{self.ad_id}:{self.field_id}={self.number or self.date or self.text}"
+
 # ---- Media (many images, max 1 video) ----
 class AdMedia(models.Model):
     IMAGE, VIDEO = "image", "video"
@@ -165,6 +214,8 @@ class AdMedia(models.Model):
     kind = models.CharField(max_length=5, choices=KIND_CHOICES, db_index=True)
     url  = models.URLField(max_length=500)
     order_index = models.PositiveIntegerField(default=0, db_index=True)
+    content_hash = models.CharField(max_length=64, blank=True, default="", editable=False)  # sha256 of uploaded files
+    renditions  = models.JSONField(default=dict, blank=True, editable=False)  # {thumb|medium|large: {width, webp, jpeg}}
     created_at  = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -175,8 +226,69 @@ class AdMedia(models.Model):
     def __str__(self): return f"{self.ad.code}:{self.kind}@{self.order_index}"
 
 
+# ---- Search index (one row per published ad) ----
+class AdSearchIndex(models.Model):
+    """
+    Flat copy of what the public search filters on: the Ad quick filters plus
+    the make/model/year AdFieldValues. Rebuilt by helperUtilis/ad_search_index.py
+    whenever the ad or its values change; only published ads have a row.
+    """
+    ad = models.OneToOneField(Ad, on_delete=models.CASCADE, primary_key=True, related_name="search_row")
+    category = models.ForeignKey(AdCategory, on_delete=models.CASCADE, related_name="+")
+    city = models.CharField(max_length=100, blank=True)
+    price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    make = models.CharField(max_length=120, blank=True)    # choice_value(), e.g. "land_rover"
+    model = models.CharField(max_length=120, blank=True)
+    year = models.PositiveSmallIntegerField(null=True, blank=True)
+    published_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["category", "published_at"], name="adsearch_cat_pub_idx"),
+            models.Index(fields=["category", "make", "model", "year"], name="adsearch_cat_make_idx"),
+            models.Index(fields=["category", "city", "published_at"], name="adsearch_cat_city_idx"),
+            models.Index(fields=["category", "price"], name="adsearch_cat_price_idx"),
+            models.Index(fields=["category", "year"], name="adsearch_cat_year_idx"),
+        ]
+
+    def __str__(self): return f"{self.ad_id}: {self.make} {self.model} {self.year or ''}".strip()
+
+
+class AdFacetCount(models.Model):
+    """
+    Published-ad count per facet value (make, model under its make, city,
+    year bucket, price bucket), kept in step with AdSearchIndex by
+    helperUtilis/ad_facets.py and reconciled by `manage.py reconcile_ad_facets`.
+    """
+    category = models.ForeignKey(AdCategory, on_delete=models.CASCADE, related_name="+")
+    facet = models.CharField(max_length=16)
+    parent = models.CharField(max_length=120, blank=True, default="")  # make, for the model facet
+    value = models.CharField(max_length=120)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ("category", "facet", "parent", "value")
+
+    def __str__(self): return f"{self.facet}:{self.parent + '/' if self.parent else ''}{self.value}={self.count}"
+
+
+class AdSearchDocument(models.Model):
+    """
+    Normalized words of an ad's title + text values (en/ar), for full-text
+    search (helperUtilis/text_search.py). One row per ad, drafts included so
+    the admin can search them too. FULLTEXT-indexed on MySQL, mirrored into
+    an FTS5 table on SQLite (migration 0012).
+    """
+    ad = models.OneToOneField(Ad, on_delete=models.CASCADE, primary_key=True, related_name="search_document")
+    document = models.TextField(blank=True, default="")
+
+    def __str__(self): return f"{self.ad_id}: {self.document[:60]}"
+
+
 
 from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.conf import settings
 from .models import Ad  # your existing Ad model
@@ -211,18 +323,21 @@ class QRCode(models.Model):
         return self.code
 
     def mark_scanned(self):
+        # atomic increment; high-traffic paths go through helperUtilis.scan_ingestor instead
         now = timezone.now()
-        if not self.first_scan_at:
-            self.first_scan_at = now
-        self.scans_count += 1
-        self.last_scan_at = now
-        self.save(update_fields=["first_scan_at", "scans_count", "last_scan_at"])
+        QRCode.objects.filter(pk=self.pk).update(
+            scans_count=F("scans_count") + 1,
+            first_scan_at=Coalesce("first_scan_at", Value(now, output_field=models.DateTimeField())),
+            last_scan_at=now,
+        )
+        self.refresh_from_db(fields=["first_scan_at", "scans_count", "last_scan_at"])
 
 
 class QRScanLog(models.Model):
     qr = models.ForeignKey(QRCode, on_delete=models.CASCADE, related_name="logs")
     ad = models.ForeignKey(Ad, on_delete=models.SET_NULL, null=True, blank=True, related_name="qr_logs")
-    scanned_at = models.DateTimeField(auto_now_add=True)
+    # set by the scan ingestor to the hit time (rows are written in batches later)
+    scanned_at = models.DateTimeField(default=timezone.now, editable=False)
 
     ip = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True, null=True)
@@ -231,6 +346,23 @@ class QRScanLog(models.Model):
     def __str__(self):
         return f"{self.qr.code} @ {self.scanned_at}"
 
+
+class QRArtifactJob(models.Model):
+    """PNG/PDF rendering for a QR code, run by the local job pool (helperUtilis/qr_jobs.py)."""
+    PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+    STATUS_CHOICES = [(PENDING, "Pending"), (RUNNING, "Running"), (DONE, "Done"), (FAILED, "Failed")]
+
+    qr = models.OneToOneField(QRCode, on_delete=models.CASCADE, related_name="artifact_job")
+    data = models.CharField(max_length=500)  # what the QR encodes
+    status = models.CharField(max_length=8, choices=STATUS_CHOICES, default=PENDING, db_index=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.qr.code}: {self.status}"
+
 # core/utils.py  (create this if you don’t have it)
 from django.conf import settings
 from django.urls import reverse, NoReverseMatch
@@ -1,10 +1,16 @@
 # mainapp/serializers/coreSerializers.py
 from __future__ import annotations
 
+from django.db import models
+from django.db.models import prefetch_related_objects
 from rest_framework import serializers
 from mainapp.models import (
     Ad, AdCategory, FieldType, FieldDefinition, AdFieldValue, AdMedia, QRCode
 )
+from mainapp.helperUtilis.ad_page_cache import invalidate_ad_page
+from mainapp.helperUtilis.ad_search_index import schedule_refresh
+from mainapp.helperUtilis.typed_values import sync_ad as sync_typed_values
+from mainapp.helperUtilis.ad_writer import NewMedia, write_media
 
 MAX_IMAGES = 12
 
@@ -53,6 +59,14 @@ class PublicFieldSerializer(serializers.ModelSerializer):
 
 # ---------- Create / Update ----------
 
+def category_field_defs(category):
+    """{lowercased key: FieldDefinition} with the type loaded (validation reads fd.type.key)."""
+    return {
+        f.key.lower(): f
+        for f in FieldDefinition.objects.filter(category=category).select_related("type")
+    }
+
+
 class AdCreateSerializer(serializers.Serializer):
     category = serializers.SlugRelatedField(slug_field="key", queryset=AdCategory.objects.all())
     title    = serializers.CharField(max_length=200, required=False, allow_blank=True)
@@ -74,7 +88,7 @@ class AdCreateSerializer(serializers.Serializer):
     def validate(self, data):
         # Dynamic fields validation
         category = data["category"]
-        defs = {f.key.lower(): f for f in FieldDefinition.objects.filter(category=category)}
+        defs = self.field_defs = category_field_defs(category)
         values = data.get("values") or {}
         values_lower = {k.lower(): v for k, v in values.items()}
 
@@ -133,8 +147,7 @@ class AdCreateSerializer(serializers.Serializer):
         # inside AdCreateSerializer
         values = validated.get("values") or {}
         if values:
-            defs = {f.key.lower(): f for f in FieldDefinition.objects.filter(category=category)}
-
+            defs = getattr(self, "field_defs", None) or category_field_defs(category)
 
             to_create = []
             for key, val in values.items():
@@ -148,20 +161,15 @@ class AdCreateSerializer(serializers.Serializer):
 
             if to_create:
                 AdFieldValue.objects.bulk_create(to_create)
+                # bulk_create skips signals; the Ad's own refresh may already have run
+                schedule_refresh(ad.id)
+                sync_typed_values(ad)
 
         # --- Media (URLs path) ---
-        images = validated.get("images") or []
-        if images:
-            AdMedia.objects.bulk_create([
-                AdMedia(ad=ad, kind=AdMedia.IMAGE, url=u, order_index=i)
-                for i, u in enumerate(images[:MAX_IMAGES])
-            ])
-
+        images = [NewMedia(u) for u in (validated.get("images") or [])[:MAX_IMAGES]]
         video = validated.get("video")
-        if video:
-            if AdMedia.objects.filter(ad=ad, kind=AdMedia.VIDEO).exists():
-                raise serializers.ValidationError({"video": "Only one video is allowed per ad"})
-            AdMedia.objects.create(ad=ad, kind=AdMedia.VIDEO, url=video, order_index=0)
+        if images or video:
+            write_media(ad, images=images or None, video=NewMedia(video) if video else None)
 
         return ad
 
@@ -200,76 +208,114 @@ class AdUpdateSerializer(serializers.Serializer):
                 AdFieldValue.objects.bulk_create(to_create)
             if to_update:
                 AdFieldValue.objects.bulk_update(to_update, ["value", "updated_at"])
+            # bulk writes skip model signals
+            invalidate_ad_page(ad.code)
+            schedule_refresh(ad.id)
+            sync_typed_values(ad)
 
-        # Images (URLs mode)
+        # Images / video (URLs mode), diffed against the current rows
+        images = None
         if "images" in validated:
-            images = validated.get("images") or []
+            images = [NewMedia(u) for u in validated.get("images") or []]
             if len(images) > MAX_IMAGES:
                 raise serializers.ValidationError({"images": f"Max {MAX_IMAGES} images allowed"})
-            ad.media.filter(kind=AdMedia.IMAGE).delete()
-            AdMedia.objects.bulk_create([
-                AdMedia(ad=ad, kind=AdMedia.IMAGE, url=u, order_index=i) for i, u in enumerate(images)
-            ])
-
-        # Video (URLs mode)
-        if "video" in validated:
-            v = validated.get("video")
-            ad.media.filter(kind=AdMedia.VIDEO).delete()
-            if v:
-                AdMedia.objects.create(ad=ad, kind=AdMedia.VIDEO, url=v, order_index=0)
+        video = validated.get("video") or None
+        if images is not None or "video" in validated:
+            write_media(ad, ad.media.all(), images=images,
+                        video=NewMedia(video) if video else None,
+                        drop_video="video" in validated and not video)
 
         return ad
 
 
 # ---------- Read serializers ----------
 
-class AdDetailSerializer(serializers.ModelSerializer):
+# Relations the read serializers touch. prefetch_related_objects() skips
+# whatever the view already prefetched, so this costs nothing when the
+# queryset was built right and one bulk query per relation when it wasn't.
+AD_READ_PREFETCH = ("category", "values__field", "media")
+
+
+def prefetch_ad_relations(ads):
+    ads = [ad for ad in ads if ad is not None]
+    if ads:
+        prefetch_related_objects(ads, *AD_READ_PREFETCH)
+    return ads
+
+
+class AdReadListSerializer(serializers.ListSerializer):
+    """many=True: load relations for the whole page at once, not per ad."""
+
+    def to_representation(self, data):
+        ads = data.all() if isinstance(data, models.manager.BaseManager) else data
+        return super().to_representation(prefetch_ad_relations(list(ads)))
+
+
+class AdReadSerializerMixin:
+    """Values/images/video read from the prefetch cache only."""
+
+    def to_representation(self, ad):
+        prefetch_ad_relations([ad])
+        return super().to_representation(ad)
+
+    def _values(self, ad, public_only=False):
+        return {
+            v.field.key: v.value
+            for v in ad.values.all()
+            if not public_only or v.field.visible_public
+        }
+
+    def _image_media(self, ad):
+        return sorted(
+            (m for m in ad.media.all() if m.kind == AdMedia.IMAGE),
+            key=lambda m: (m.order_index, m.id),
+        )
+
+    def get_images(self, ad):
+        return [m.url for m in self._image_media(ad)]
+
+    def get_image_renditions(self, ad):
+        # same order as `images`; {} until the background renditions are ready
+        return [m.renditions or {} for m in self._image_media(ad)]
+
+    def get_video(self, ad):
+        return next((m.url for m in ad.media.all() if m.kind == AdMedia.VIDEO), None)
+
+
+class AdDetailSerializer(AdReadSerializerMixin, serializers.ModelSerializer):
     category = serializers.SlugRelatedField(read_only=True, slug_field="key")
     values   = serializers.SerializerMethodField()
     images   = serializers.SerializerMethodField()
+    image_renditions = serializers.SerializerMethodField()
     video    = serializers.SerializerMethodField()
 
     class Meta:
         model = Ad
+        list_serializer_class = AdReadListSerializer
         fields = [
             "id", "code", "category", "title", "price", "city", "status",
-            "created_at", "published_at", "values", "images", "video",
+            "created_at", "published_at", "values", "images", "image_renditions", "video",
         ]
 
     def get_values(self, ad):
-        return {v.field.key: v.value for v in ad.values.select_related("field")}
+        return self._values(ad)
 
-    def get_images(self, ad):
-        return list(ad.media.filter(kind=AdMedia.IMAGE).order_by("order_index").values_list("url", flat=True))
 
-    def get_video(self, ad):
-        v = ad.media.filter(kind=AdMedia.VIDEO).first()
-        return v.url if v else None
-
-
-class PublicAdSerializer(serializers.ModelSerializer):
+class PublicAdSerializer(AdReadSerializerMixin, serializers.ModelSerializer):
     category = serializers.SlugRelatedField(read_only=True, slug_field="key")
     values   = serializers.SerializerMethodField()
     images   = serializers.SerializerMethodField()
+    image_renditions = serializers.SerializerMethodField()
     video    = serializers.SerializerMethodField()
 
     class Meta:
         model = Ad
-        fields = ["code", "category", "title", "price", "city", "published_at", "values", "images", "video"]
+        list_serializer_class = AdReadListSerializer
+        fields = ["code", "category", "title", "price", "city", "published_at", "values", "images",
+                  "image_renditions", "video"]
 
     def get_values(self, ad):
-        out = {}
-        for v in ad.values.select_related("field"):
-            if v.field.visible_public:
-                out[v.field.key] = v.value
-        return out
-
-    def get_images(self, ad):
-        return list(ad.media.filter(kind=AdMedia.IMAGE).order_by("order_index").values_list("url", flat=True))
-
-    def get_video(self, ad):
-        v = ad.media.filter(kind=AdMedia.VIDEO).first()
-        return v.url if v else None
+        return self._values(ad, public_only=True)
 
 
 # ---------- QR serializers ----------
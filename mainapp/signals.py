@@ -0,0 +1,159 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+
+from mainapp.models import (
+    Ad, AdCategory, AdFieldValue, AdMedia, AdSearchIndex, FieldDefinition, FieldType, Profile, QRCode,
+)
+from mainapp.helperUtilis.ad_facets import apply_deltas, row_deltas
+from mainapp.helperUtilis.ad_page_cache import invalidate_ad_page
+from mainapp.helperUtilis.ad_search_index import refresh_ads_with_field, schedule_refresh
+from mainapp.helperUtilis.ad_writer import release_media_files
+from mainapp.helperUtilis.typed_values import sync_rows as sync_typed_rows
+from mainapp.helperUtilis.form_schema_cache import invalidate_form_schemas
+from mainapp.helperUtilis.image_derivatives import derivative_worker
+from mainapp.helperUtilis.qr_resolver import qr_resolver
+
+
+def _ad_code(instance):
+    try:
+        return instance.ad.code
+    except Ad.DoesNotExist:
+        return None
+
+
+# ---- public ad page cache ----
+
+@receiver([post_save, post_delete], sender=Ad)
+def drop_ad_page_on_ad_change(sender, instance, **kwargs):
+    # covers edits, publish/unpublish and archive (all go through Ad.save)
+    invalidate_ad_page(instance.code)
+
+
+@receiver([post_save, post_delete], sender=AdFieldValue)
+@receiver([post_save, post_delete], sender=AdMedia)
+def drop_ad_page_on_child_change(sender, instance, **kwargs):
+    invalidate_ad_page(_ad_code(instance))
+
+
+@receiver(post_save, sender=Profile)
+def drop_ad_pages_on_phone_change(sender, instance, update_fields=None, **kwargs):
+    # the page shows the owner's phone; OTP / player_id saves name their fields
+    if update_fields is not None and "phone" not in update_fields:
+        return
+    for code in Ad.objects.filter(owner_id=instance.user_id, status="published").values_list("code", flat=True):
+        invalidate_ad_page(code)
+
+
+# ---- search index ----
+
+@receiver(post_save, sender=Ad)
+def reindex_ad(sender, instance, **kwargs):
+    # publish/unpublish/edits; the row itself goes with the ad on delete (CASCADE)
+    schedule_refresh(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=AdFieldValue)
+def reindex_ad_on_value_change(sender, instance, **kwargs):
+    # public text values are in the text document; bulk writes in the serializers
+    # call schedule_refresh() themselves
+    schedule_refresh(instance.ad_id)
+
+
+# what decides whether a field's values go in the text documents
+SEARCH_FIELD_STATE = ("visible_public", "type_id")
+
+
+@receiver(pre_save, sender=FieldDefinition)
+def remember_field_search_state(sender, instance, update_fields=None, **kwargs):
+    # sync_car_fields() saves only the choices; nothing to compare then
+    if instance.pk is None or (update_fields is not None and not {"visible_public", "type"} & set(update_fields)):
+        instance._search_state = None
+        return
+    instance._search_state = (FieldDefinition.objects.filter(pk=instance.pk)
+                              .values_list(*SEARCH_FIELD_STATE).first())
+
+
+@receiver(post_save, sender=FieldDefinition)
+def reindex_ads_on_field_change(sender, instance, created, **kwargs):
+    # a field turned hidden (or non-text) must leave the documents of its ads
+    before = getattr(instance, "_search_state", None)
+    if created or before is None or before == tuple(getattr(instance, f) for f in SEARCH_FIELD_STATE):
+        return
+    field_id = instance.pk
+    transaction.on_commit(lambda: refresh_ads_with_field(field_id))
+
+
+@receiver(pre_delete, sender=AdSearchIndex)
+def lock_facet_row(sender, instance, **kwargs):
+    # post_delete fires even when a concurrent delete (refresh_ads vs. an ad
+    # delete) already removed the row and ours hit 0 rows: lock it first and
+    # only count rows that are still there to be deleted by us
+    instance._facet_counted = bool(list(
+        AdSearchIndex.objects.select_for_update().filter(pk=instance.pk).values_list("pk", flat=True)
+    ))
+
+
+@receiver(post_delete, sender=AdSearchIndex)
+def drop_facet_counts(sender, instance, **kwargs):
+    # unpublish/archive (refresh_ads) and ad deletes (CASCADE) both land here
+    if getattr(instance, "_facet_counted", True):
+        apply_deltas(row_deltas([instance], []))
+
+
+@receiver(post_save, sender=AdFieldValue)
+def project_typed_value(sender, instance, **kwargs):
+    # admin inlines and other single saves; the typed row is deleted by CASCADE
+    sync_typed_rows([instance])
+
+
+# ---- image renditions ----
+
+@receiver(post_save, sender=AdMedia)
+def queue_image_renditions(sender, instance, created, **kwargs):
+    # uploads from every view land here; bulk_create (URL-only images) is
+    # covered by `manage.py build_image_derivatives`
+    if created and instance.kind == AdMedia.IMAGE and not instance.renditions:
+        derivative_worker.enqueue(instance.pk)
+
+
+# ---- media storage ----
+
+@receiver(post_delete, sender=AdMedia)
+def release_media_storage(sender, instance, **kwargs):
+    # replaced/removed media from every view and ad deletes (CASCADE);
+    # after commit, so a rolled-back delete keeps its files
+    url, content_hash, renditions = instance.url, instance.content_hash, instance.renditions
+    transaction.on_commit(lambda: release_media_files(url, content_hash, renditions))
+
+
+# ---- QR landing resolver ----
+
+@receiver(post_save, sender=QRCode)
+def refresh_qr_target(sender, instance, **kwargs):
+    # Claim / Activate / publish_ad_direct / admin edits all save the QRCode
+    qr_resolver.remember(instance)
+
+
+@receiver(post_delete, sender=QRCode)
+def drop_qr_target(sender, instance, **kwargs):
+    qr_resolver.forget(instance.code)
+
+
+@receiver(pre_delete, sender=Ad)
+def drop_qr_targets_of_ad(sender, instance, **kwargs):
+    # QRCode.ad is SET_NULL: the delete nulls it with an update(), so no
+    # QRCode post_save fires and the cached target would still redirect
+    codes = list(QRCode.objects.filter(ad_id=instance.pk).values_list("code", flat=True))
+    if codes:
+        transaction.on_commit(lambda: [qr_resolver.forget(code) for code in codes])
+
+
+# ---- form schema cache ----
+
+@receiver([post_save, post_delete], sender=FieldDefinition)
+@receiver([post_save, post_delete], sender=FieldType)
+@receiver([post_save, post_delete], sender=AdCategory)
+def drop_form_schemas(sender, **kwargs):
+    # admin edits and sync_car_fields() (which saves the make/model definitions)
+    invalidate_form_schemas()
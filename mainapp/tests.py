@@ -1,3 +1,208 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
 
-# Create your tests here.
+from mainapp.models import Ad, AdCategory, AdFieldValue, AdMedia, FieldDefinition, FieldType
+
+
+# Query budgets for the ad endpoints. Read counts must not grow with the
+# number of ads; writes cover the ad, values, media and QR code in one
+# transaction (a savepoint here) and include the savepoints around the Ad and
+# QR code inserts. After-commit work (search refresh, QR renders) isn't counted.
+LIST_QUERIES = 4      # token+user, page of ads, values, media
+DETAIL_QUERIES = 5    # ad, values, their fields, media, category
+FORM_CREATE_QUERIES = 16
+FORM_EDIT_QUERIES = 14
+
+
+def _bulk_readback(*inserts):
+    """Backends that can't return ids from a bulk insert (MySQL) read them back."""
+    return 0 if connection.features.can_return_rows_from_bulk_insert else len(inserts)
+
+
+class AdQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="0790000000")
+        cls.token = Token.objects.create(user=cls.user)
+        cls.category = AdCategory.objects.create(key="cars", name_en="Cars")
+        ftype = FieldType.objects.create(key="text", name="Text")
+        cls.fields = [
+            FieldDefinition.objects.create(category=cls.category, key=k, type=ftype, label_en=k)
+            for k in ("make", "model", "year", "color")
+        ]
+
+    def _seed_ads(self, count):
+        now = timezone.now()
+        for _ in range(count):
+            ad = Ad.objects.create(owner=self.user, category=self.category, title="Car",
+                                   status="published", published_at=now)
+            AdFieldValue.objects.bulk_create([AdFieldValue(ad=ad, field=f, value="x") for f in self.fields])
+            AdMedia.objects.bulk_create(
+                [AdMedia(ad=ad, kind=AdMedia.IMAGE, url=f"https://example.com/{i}.jpg", order_index=i)
+                 for i in range(3)]
+                + [AdMedia(ad=ad, kind=AdMedia.VIDEO, url="https://example.com/v.mp4")]
+            )
+
+    def _form_body(self, n, **extra):
+        return {
+            "category": self.category.key, "title": "Car", "price": "1000", "city": "Amman",
+            "values": {"make": "toyota", "model": "camry", "year": str(2000 + n), "color": "white"},
+            "images": [f"https://example.com/{n}-{i}.jpg" for i in range(3)],
+            "video": f"https://example.com/{n}.mp4",
+            **extra,
+        }
+
+    def _post(self, path, data, **headers):
+        return self.client.post(path, data, content_type="application/json", **headers)
+
+    # ---------- reads ----------
+    def test_my_ads_lists_are_constant_in_the_number_of_ads(self):
+        for total in (1, 30):
+            self._seed_ads(total - Ad.objects.count())
+            with self.subTest(ads=total), self.assertNumQueries(LIST_QUERIES):
+                response = self._post("/api/ads/mine", {"token": self.token.key})
+            self.assertEqual(response.status_code, 200)
+            with self.subTest(ads=total), self.assertNumQueries(LIST_QUERIES):
+                response = self._post("/api/ads/by-token", {"token": self.token.key})
+            self.assertEqual(response.status_code, 200)
+
+    def test_public_ad_detail(self):
+        self._seed_ads(1)
+        code = Ad.objects.values_list("code", flat=True).get()
+        with self.assertNumQueries(DETAIL_QUERIES):
+            response = self.client.get(f"/api/public/ads/{code}")
+        self.assertEqual(response.status_code, 200)
+
+    # ---------- writes ----------
+    def test_form_create_and_edit(self):
+        auth = {"HTTP_AUTHORIZATION": f"Token {self.token.key}"}
+        with self.assertNumQueries(FORM_CREATE_QUERIES + _bulk_readback("values", "media")):
+            response = self._post("/api/ads/form", self._form_body(1), **auth)
+        self.assertEqual(response.status_code, 201, response.content[:200])
+        ad_id = response.json()["data"]["ad"]["id"]
+
+        with self.assertNumQueries(FORM_EDIT_QUERIES + _bulk_readback("media")):
+            response = self._post("/api/ads/form", self._form_body(2, ad_id=ad_id), **auth)
+        self.assertEqual(response.status_code, 201, response.content[:200])
+        ad = Ad.objects.get(pk=ad_id)
+        self.assertEqual(ad.values.count(), 4)
+        self.assertEqual(
+            list(ad.media.order_by("kind", "order_index").values_list("url", flat=True)),
+            [f"https://example.com/2-{i}.jpg" for i in range(3)] + ["https://example.com/2.mp4"],
+        )
+
+
+class AdSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="0790000001")
+        cls.category = AdCategory.objects.create(key="cars", name_en="Cars")
+        select = FieldType.objects.create(key="select", name="Select")
+        text = FieldType.objects.create(key="text", name="Text")
+        number = FieldType.objects.create(key="number", name="Number")
+        cls.fields = {
+            "make": FieldDefinition.objects.create(category=cls.category, key="make", type=select, label_en="Make"),
+            "year": FieldDefinition.objects.create(category=cls.category, key="year", type=select, label_en="Year"),
+            "mileage_km": FieldDefinition.objects.create(category=cls.category, key="mileage_km", type=number,
+                                                         label_en="Mileage"),
+            "vin": FieldDefinition.objects.create(category=cls.category, key="vin", type=text, label_en="VIN",
+                                                  visible_public=False),
+        }
+
+    def setUp(self):
+        cache.clear()  # facet and form caches outlive each test's rollback
+
+    def _publish(self, title, city="", **values):
+        """A published ad with `values`, indexed the way a real commit would."""
+        with self.captureOnCommitCallbacks(execute=True):
+            ad = Ad.objects.create(owner=self.user, category=self.category, title=title, city=city,
+                                   status="published", published_at=timezone.now())
+            for key, value in values.items():
+                AdFieldValue.objects.create(ad=ad, field=self.fields[key], value=value)
+        return ad
+
+    def _search(self, query):
+        response = self.client.get(f"/api/public/ads?{query}")
+        self.assertEqual(response.status_code, 200, response.content[:200])
+        return sorted(ad["title"] for ad in response.json()["data"])
+
+    def _facets(self):
+        response = self.client.get("/api/public/facets?category=cars")
+        self.assertEqual(response.status_code, 200, response.content[:200])
+        return {facet: {item["value"]: item["count"] for item in items}
+                for facet, items in response.json()["data"].items() if items}
+
+    # ---------- typed f_* filters ----------
+    def test_range_on_a_number_field(self):
+        self._publish("low", mileage_km="30000")
+        self._publish("high", mileage_km="1,200,000")
+        self.assertEqual(self._search("f_mileage_km_max=100000"), ["low"])
+        self.assertEqual(self._search("f_mileage_km_min=100000"), ["high"])
+        self.assertEqual(self._search("f_mileage_km_min=20000&f_mileage_km_max=40000"), ["low"])
+        self.assertEqual(self.client.get("/api/public/ads?f_mileage_km_max=lots").status_code, 400)
+
+    def test_range_on_a_select_field(self):
+        self._publish("new", year="2018")
+        self._publish("old", year="2012")
+        self.assertEqual(self._search("f_year_min=2015&f_year_max=2020"), ["new"])
+        self.assertEqual(self._search("f_year_max=2015"), ["old"])
+        self.assertEqual(self._search("f_year=2012"), ["old"])
+
+    def test_hidden_fields_cannot_be_filtered(self):
+        self._publish("car", vin="SECRETVIN123")
+        response = self.client.get("/api/public/ads?f_vin=secretvin123")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get("/api/public/ads?f_nope=1")
+        self.assertEqual(response.status_code, 400)
+
+    # ---------- q ----------
+    def test_text_search_folds_case_accents_and_arabic_forms(self):
+        self._publish("Café racer")
+        self._publish("سيارة مستعملة للبيع", make="تويوتا")
+        self.assertEqual(self._search("q=CAFE"), ["Café racer"])
+        self.assertEqual(self._search("q=سياره مستعمل"), ["سيارة مستعملة للبيع"])
+        self.assertEqual(self._search("q=تويو"), ["سيارة مستعملة للبيع"])
+        self.assertEqual(self._search("q=cafe+مستعمل"), [])
+
+    def test_hidden_values_are_not_in_text_search(self):
+        self._publish("Camry", vin="SECRETVIN123")
+        self.assertEqual(self._search("q=camry"), ["Camry"])
+        self.assertEqual(self._search("q=SECRETVIN123"), [])
+
+        vin = self.fields["vin"]
+        with self.captureOnCommitCallbacks(execute=True):
+            vin.visible_public = True
+            vin.save()
+        self.assertEqual(self._search("q=SECRETVIN123"), ["Camry"])
+        with self.captureOnCommitCallbacks(execute=True):
+            vin.visible_public = False
+            vin.save()
+        self.assertEqual(self._search("q=SECRETVIN123"), [])
+
+    # ---------- facets ----------
+    def test_facet_counts_follow_create_edit_and_unpublish(self):
+        first = self._publish("one", city="Amman", make="Toyota", year="2018")
+        self._publish("two", city="amman ", make="Kia", year="2012")
+        facets = self._facets()
+        self.assertEqual(facets["make"], {"toyota": 1, "kia": 1})
+        self.assertEqual(facets["city"], {"amman": 2})
+        self.assertEqual(facets["year"], {"2015-2019": 1, "2010-2014": 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make = AdFieldValue.objects.get(ad=first, field=self.fields["make"])
+            make.value = "Kia"
+            make.save()
+        self.assertEqual(self._facets()["make"], {"kia": 2})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.status, first.published_at = "draft", None
+            first.save(update_fields=["status", "published_at"])
+        facets = self._facets()
+        self.assertEqual(facets["make"], {"kia": 1})
+        self.assertEqual(facets["city"], {"amman": 1})
+        self.assertEqual(facets["year"], {"2010-2014": 1})
+        self.assertEqual(self._search("category=cars"), ["two"])
@@ -3,6 +3,8 @@ from django.urls import path
 from mainapp.views.authViews import *
 from mainapp.views.coreViews import *  # 👈 avoid wildcard imports
 from mainapp.views.webViews import *  # 👈 avoid wildcard imports
+from mainapp.views.catalogViews import CarMakeOptionsView, CarModelOptionsView
+from mainapp.views.searchViews import PublicAdFacetsView, PublicAdSearchView
 
 app_name = "mainapp"
 
@@ -33,7 +35,13 @@ urlpatterns = [
     path("api/ads/form",       AdFormView.as_view(),      name="ads-form"),      # GET schema / POST save
     path("api/ads/delete", delete_ad, name="delete_ad"),
 
+    # Car catalog options (dependent make -> model dropdowns)
+    path("api/cars/makes",     CarMakeOptionsView.as_view(),  name="car-make-options"),
+    path("api/cars/models",    CarModelOptionsView.as_view(), name="car-model-options"),
+
     # Public ad API
+    path("api/public/ads", PublicAdSearchView.as_view(), name="public-ad-search"),
+    path("api/public/facets", PublicAdFacetsView.as_view(), name="public-ad-facets"),
     path("api/public/ads/<slug:code>", PublicAdByCodeView.as_view(), name="public-ad-by-code"),
 
     # Media management
@@ -105,9 +105,14 @@ def ok_list(message="OK", data=None, code="OK", http_status=http.HTTP_200_OK):
 
 
 
-from  .models import  AdCategory,FieldDefinition,CarModelS,CarMakeS
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from  .models import  AdCategory,FieldDefinition,CarModelS,CarMakeS, choice_value
 def normalize(value: str) -> str:
-    return value.lower().strip().replace(" ", "_")
+    return choice_value(value)
 
 
 def sync_car_fields():
@@ -176,3 +181,126 @@ def sync_car_fields():
 
     model_field.choices = model_choices
     model_field.save(update_fields=["choices"])
+
+
+
+# =========================
+# Incremental sync (admin edits)
+# =========================
+# sync_car_fields() above re-reads the whole catalog. Single admin edits only
+# patch the entries of the row that changed; bulk edits (delete_queryset)
+# schedule one debounced full rebuild instead of one per row.
+
+def _car_choice_fields():
+    """make/model FieldDefinitions, row-locked (call inside a transaction)."""
+    fields = {
+        f.key: f for f in FieldDefinition.objects
+        .select_for_update()
+        .filter(category__key="cars", key__in=("make", "model"))
+    }
+    if "make" not in fields or "model" not in fields:
+        raise FieldDefinition.DoesNotExist("cars.make / cars.model field definitions are missing")
+    return fields["make"], fields["model"]
+
+
+def _model_choice(model, parent_value):
+    return {
+        "value": normalize(model.name_en),
+        "label_en": model.name_en,
+        "label_ar": model.name_ar,
+        "parent_value": parent_value,
+    }
+
+
+def _save_choices(field, choices):
+    if choices != (field.choices or []):
+        field.choices = choices
+        field.save(update_fields=["choices"])
+
+
+@transaction.atomic
+def apply_car_make_change(make, old_value=None, deleted=False):
+    """
+    Patch the stored make/model choices for one CarMakeS row.
+    Touches only this make's entry and its models (renames re-parent them,
+    (de)activation drops/re-adds them). old_value = the make's value before the edit.
+    """
+    make_field, model_field = _car_choice_fields()
+    value = normalize(make.name_en)
+    active = make.is_active and not deleted
+    stale = {v for v in (old_value, value) if v and v != "other"}
+
+    make_choices = [c for c in (make_field.choices or []) if c.get("value") not in stale]
+    if active and value != "other":
+        make_choices.append({"value": value, "label_en": make.name_en, "label_ar": make.name_ar})
+
+    model_choices = [c for c in (model_field.choices or []) if c.get("parent_value") not in stale]
+    if active and value != "other":
+        seen = set()
+        for model in CarModelS.objects.filter(make_id=make.pk, is_active=True):
+            entry = _model_choice(model, value)
+            if entry["value"] not in seen:
+                seen.add(entry["value"])
+                model_choices.append(entry)
+
+    _save_choices(make_field, make_choices)
+    _save_choices(model_field, model_choices)
+
+
+@transaction.atomic
+def apply_car_model_change(model, old_value=None, old_parent=None, deleted=False):
+    """
+    Patch the stored model choices for one CarModelS row.
+    old_value / old_parent = the (value, make value) pair before the edit.
+    """
+    _, model_field = _car_choice_fields()
+    value = normalize(model.name_en)
+    parent = normalize(model.make.name_en)
+    stale = {(value, parent)}
+    if old_value and old_parent:
+        stale.add((old_value, old_parent))
+
+    choices = [
+        c for c in (model_field.choices or [])
+        if (c.get("value"), c.get("parent_value")) not in stale
+    ]
+    if model.is_active and model.make.is_active and not deleted:
+        choices.append(_model_choice(model, parent))
+
+    _save_choices(model_field, choices)
+
+
+_sync_timer = None
+_sync_lock = threading.Lock()
+
+
+def _run_scheduled_sync():
+    global _sync_timer
+    with _sync_lock:
+        _sync_timer = None
+    close_old_connections()
+    try:
+        sync_car_fields()
+    except Exception:
+        logging.getLogger(__name__).exception("Debounced sync_car_fields failed")
+    finally:
+        close_old_connections()
+
+
+def schedule_car_fields_sync(delay=None):
+    """
+    Mark the car choices dirty: one sync_car_fields() runs `delay` seconds
+    after the last call, however many rows were edited in between.
+    """
+    delay = getattr(settings, "CAR_FIELDS_SYNC_DEBOUNCE", 5.0) if delay is None else delay
+
+    def _schedule():
+        global _sync_timer
+        with _sync_lock:
+            if _sync_timer is not None:
+                _sync_timer.cancel()
+            _sync_timer = threading.Timer(delay, _run_scheduled_sync)
+            _sync_timer.daemon = True
+            _sync_timer.start()
+
+    transaction.on_commit(_schedule)
@@ -0,0 +1,111 @@
+# mainapp/views/catalogViews.py
+from django.db.models import Q
+from rest_framework import permissions
+from rest_framework.views import APIView
+
+from mainapp.models import CarMakeS, CarModelS, choice_value
+from .coreViews import ok, fail
+
+# Dependent dropdown options, served from the CarMakeS / CarModelS tables
+# instead of being inlined in FieldDefinition.choices of the form schema.
+
+OPTIONS_PAGE_SIZE = 50
+OPTIONS_MAX_PAGE_SIZE = 200
+
+OTHER_OPTION = {"value": "other", "label_en": "other", "label_ar": "اخرى"}
+
+
+def _paging_params(request):
+    try:
+        limit = int(request.query_params.get("limit") or OPTIONS_PAGE_SIZE)
+        offset = int(request.query_params.get("offset") or 0)
+    except (TypeError, ValueError):
+        raise ValueError("limit/offset must be integers")
+    return min(max(limit, 1), OPTIONS_MAX_PAGE_SIZE), max(offset, 0)
+
+
+def _locale(request):
+    return "ar" if (request.query_params.get("locale") or "").lower() == "ar" else "en"
+
+
+def _prefix_filter(qs, q):
+    """Prefix search on the normalized value (indexed) or the Arabic name."""
+    if not q:
+        return qs
+    return qs.filter(Q(value__startswith=choice_value(q)) | Q(name_ar__startswith=q.strip()))
+
+
+def _page(request, qs, build, parent_value=None):
+    try:
+        limit, offset = _paging_params(request)
+    except ValueError as e:
+        return fail(str(e))
+
+    q = (request.query_params.get("q") or "").strip()
+    locale = _locale(request)
+
+    rows = list(_prefix_filter(qs, q)[offset:offset + limit + 1])
+    has_more = len(rows) > limit
+    items = [build(r) for r in rows[:limit]]
+
+    # keep the "other" escape hatch the inline choices always had
+    if offset == 0 and "other".startswith(choice_value(q) if q else ""):
+        other = dict(OTHER_OPTION)
+        if parent_value is not None:
+            other["parent_value"] = "other"
+        items.insert(0, other)
+
+    for item in items:
+        item["label"] = item["label_ar"] if locale == "ar" else item["label_en"]
+
+    response = ok("Options fetched", data=items)
+    response.data["paging"] = {"limit": limit, "offset": offset, "has_more": has_more}
+    return response
+
+
+class CarMakeOptionsView(APIView):
+    """
+    GET /api/cars/makes?q=<prefix>&limit=50&offset=0&locale=en|ar
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        qs = (CarMakeS.objects
+              .filter(is_active=True)
+              .exclude(value="other")
+              .order_by("value")
+              .only("value", "name_en", "name_ar"))
+        return _page(request, qs, lambda m: {
+            "value": m.value, "label_en": m.name_en, "label_ar": m.name_ar,
+        })
+
+
+class CarModelOptionsView(APIView):
+    """
+    GET /api/cars/models?make=<make value>&q=<prefix>&limit=50&offset=0&locale=en|ar
+    Items have the same shape as the old inline `model` choices
+    ({value, label_en, label_ar, parent_value}) plus a localized `label`.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        make_value = choice_value(request.query_params.get("make") or "")
+        if not make_value:
+            return fail("make is required")
+
+        make_id = (CarMakeS.objects
+                   .filter(value=make_value, is_active=True)
+                   .values_list("id", flat=True)
+                   .first())
+        if make_id is None:
+            qs = CarModelS.objects.none()
+        else:
+            qs = (CarModelS.objects
+                  .filter(make_id=make_id, is_active=True)
+                  .order_by("value")
+                  .only("value", "name_en", "name_ar"))
+
+        return _page(request, qs, lambda m: {
+            "value": m.value, "label_en": m.name_en, "label_ar": m.name_ar,
+            "parent_value": make_value,
+        }, parent_value=make_value)
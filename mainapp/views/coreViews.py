@@ -5,7 +5,8 @@ from django.http import HttpResponse
 from mainapp.serializers.coreSerializers import (
     CategorySchemaSerializer,
     AdCreateSerializer, AdUpdateSerializer,
-    AdDetailSerializer, PublicAdSerializer,AdDetailSerializer,PublicFieldSerializer,ClaimQRSerializer,ActivateQRSerializer
+    AdDetailSerializer, PublicAdSerializer,AdDetailSerializer,PublicFieldSerializer,ClaimQRSerializer,ActivateQRSerializer,
+    category_field_defs,
 )
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
@@ -14,7 +15,7 @@ from rest_framework import permissions, status, views
 from rest_framework.response import Response
 
 from mainapp.models import Ad
-from mainapp.models import QRCode, QRScanLog
+from mainapp.models import QRArtifactJob, QRCode, QRScanLog
 
 PUBLIC_BASE = "https://aimotoria.com"  # edit to your domain
 
@@ -32,7 +33,8 @@ from rest_framework.views import APIView
 from rest_framework import permissions
 from rest_framework.authtoken.models import Token
 from mainapp.models import Ad
-import json, os, uuid
+import base64, json, os, uuid
+from datetime import datetime
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
@@ -59,7 +61,18 @@ from rest_framework.exceptions import ValidationError
 # from .utils import _auth_user_from_request, _save_upload  # your helpers
 
 
-from  mainapp.helperUtilis.generate_qr_image import generate_qr_image,generate_qr_pdf
+from mainapp.helperUtilis.qr_jobs import qr_jobs
+from mainapp.helperUtilis.form_schema_cache import get_cached_schema
+from mainapp.helperUtilis.token_resolver import user_for_token
+from mainapp.helperUtilis.media_upload import check_upload_sizes, store_upload
+from mainapp.helperUtilis.unique_codes import insert_with_code, random_code
+from mainapp.helperUtilis.ad_page_cache import invalidate_ad_page
+from mainapp.helperUtilis.ad_writer import (
+    NewMedia, discard_uploads, prime_relations, store_uploads, write_media, write_values,
+)
+from mainapp.helperUtilis.image_derivatives import rendition_url, srcset
+from django.http import Http404
+from django.utils.cache import get_conditional_response
 
 
 def home(request):
@@ -67,12 +80,9 @@ def home(request):
 
 
 
-def _save_upload(file_obj, subdir="ads"):
-    name, ext = os.path.splitext(file_obj.name)
-    safe_name = f"{uuid.uuid4().hex[:12]}{ext}"
-    rel_path = os.path.join(subdir, safe_name)
-    default_storage.save(rel_path, ContentFile(file_obj.read()))
-    return default_storage.url(rel_path)
+def _save_upload(file_obj, subdir="ads", kind=AdMedia.IMAGE):
+    """Stream an upload to storage (chunked, hashed, size-capped) -> StoredUpload."""
+    return store_upload(file_obj, subdir=subdir, kind=kind)
 
 
 
@@ -89,11 +99,24 @@ def _save_upload(file_obj, subdir="ads"):
 
 MAX_IMAGES = 12
 
+def _compile_category_schema(category_key):
+    cat = AdCategory.objects.filter(key=category_key).first()
+    return CategorySchemaSerializer(cat).data if cat else None
+
+
 class CategorySchemaView(APIView):
     permission_classes = [permissions.AllowAny]
     def get(self, request, category_key):
-        cat = get_object_or_404(AdCategory, key=category_key)
-        return Response(CategorySchemaSerializer(cat).data)
+        entry = get_cached_schema(
+            "category", category_key, "all",
+            lambda: _compile_category_schema(category_key),
+        )
+        if entry is None:
+            raise Http404("No AdCategory matches the given query.")
+        etag = f'"{entry["version"]}"'
+        response = get_conditional_response(request, etag=etag) or Response(entry["data"])
+        response["ETag"] = etag
+        return response
 
 # coreViews.py
 
@@ -102,39 +125,31 @@ class CategorySchemaView(APIView):
 
 
 def _gen_code(prefix="QR"):
-    return f"{prefix}{uuid.uuid4().hex[:8].upper()}"
-
-def publish_ad_direct(ad, request):
-    # Check if QR exists
-    qr = QRCode.objects.filter(ad=ad).first()
+    # "QR" + 8 Crockford base32 + check symbol; legacy codes are "QR" + 8 hex
+    return random_code(prefix, 8)
 
+def _attach_qr(ad, qr):
+    """Create the ad's QR (`qr` None) or make sure the existing one is live."""
     # Create QR if needed
     if not qr:
-        qr = QRCode.objects.create(
-            code=_gen_code("QR"),
-            ad=ad,
-            is_assigned=True,
-            is_activated=True
-        )
+        qr = QRCode(ad=ad, is_assigned=True, is_activated=True)
+        insert_with_code(qr, lambda: _gen_code("QR"), lambda: qr.save(force_insert=True))
 
-        # ✅ Generate files ONLY once
-        public_url = f"{PUBLIC_BASE}/ads/{ad.code}"
+        # ✅ Generate files ONLY once — rendered by the QR job pool after commit
+        job = QRArtifactJob.objects.create(qr=qr, data=f"{PUBLIC_BASE}/ads/{ad.code}")
+        qr_jobs.enqueue(job)
 
-        qr_image_url, qr_img = generate_qr_image(
-            data=public_url,
-            code=qr.code
-        )
-
-        generate_qr_pdf(
-            qr_img,
-            code=qr.code
-        )
-
-    else:
+    elif not (qr.is_assigned and qr.is_activated):
         # Ensure flags
         qr.is_assigned = True
         qr.is_activated = True
         qr.save(update_fields=["is_assigned", "is_activated"])
+    return qr
+
+
+def publish_ad_direct(ad, request):
+    # Check if QR exists
+    _attach_qr(ad, QRCode.objects.filter(ad=ad).first())
 
     # Publish ad
     ad.status = "published"
@@ -194,39 +209,34 @@ class CreateAdView(APIView):
             readable = ", ".join(missing)
             return error_response(f"The following required fields are missing or empty: {readable}")
 
+        too_large = check_upload_sizes(image_files, video_file)
+        if too_large:
+            return error_response(too_large)
+
         # --- Clean file-related keys ---
         if image_files or video_file:
             payload.pop("images", None)
             payload.pop("video", None)
 
-        # --- Validate and Save Ad ---
+        # --- Media limits (before anything is written) ---
+        MAX_IMAGES = 12
+        if len(image_files) > MAX_IMAGES:
+            return error_response(f"Max {MAX_IMAGES} images allowed")
+
+        # --- Validate and Save Ad (URL images/video are written by the serializer) ---
         serializer = AdCreateSerializer(data=payload, context={"request": request})
         serializer.is_valid(raise_exception=True)
         ad = serializer.save()
 
-        # --- Media Handling ---
-        MAX_IMAGES = 12
-        if image_files:
-            if len(image_files) > MAX_IMAGES:
-                return error_response(f"Max {MAX_IMAGES} images allowed")
-
-            for idx, f in enumerate(image_files[:MAX_IMAGES]):
-                url = _save_upload(f, subdir="ads/images")
-                AdMedia.objects.create(ad=ad, kind=AdMedia.IMAGE, url=url, order_index=idx)
-
-        if video_file:
-            ad.media.filter(kind=AdMedia.VIDEO).delete()
-            url = _save_upload(video_file, subdir="ads/videos")
-            AdMedia.objects.create(ad=ad, kind=AdMedia.VIDEO, url=url, order_index=0)
-
-        # Case: URLs instead of uploads
-        if not image_files and isinstance(payload.get("images"), list):
-            for idx, u in enumerate(payload["images"][:MAX_IMAGES]):
-                AdMedia.objects.create(ad=ad, kind=AdMedia.IMAGE, url=u, order_index=idx)
-
-        if not video_file and isinstance(payload.get("video"), str) and payload["video"]:
-            ad.media.filter(kind=AdMedia.VIDEO).delete()
-            AdMedia.objects.create(ad=ad, kind=AdMedia.VIDEO, url=payload["video"], order_index=0)
+        # --- Uploaded files ---
+        if image_files or video_file:
+            images, video, stored = store_uploads(image_files, video_file)
+            try:
+                with transaction.atomic():
+                    write_media(ad, ad.media.all(), images=images if image_files else None, video=video)
+            except Exception:
+                discard_uploads(stored)
+                raise
         is_direct = True
 
         if is_direct:
@@ -288,11 +298,17 @@ class UpdateAdView(APIView):
             except json.JSONDecodeError:
                 return fail("Invalid JSON in 'values'")
 
+        too_large = check_upload_sizes(image_files, video_file)
+        if too_large:
+            return fail(too_large)
+
         if image_files or video_file:
             payload.pop("images", None)
             payload.pop("video", None)
+        if len(image_files) > MAX_IMAGES:
+            return fail(f"Max {MAX_IMAGES} images allowed")
 
-        # 4) validate + save core/dynamic
+        # 4) validate + save core/dynamic (URL images/video are diffed by the serializer)
         try:
             s = AdUpdateSerializer(data=payload)
             s.is_valid(raise_exception=True)
@@ -300,39 +316,91 @@ class UpdateAdView(APIView):
         except Exception as e:
             return fail("Validation failed", errors={"detail": str(e)})
 
-        # 5) media mutations
-        if image_files:
-            if len(image_files) > MAX_IMAGES:
-                return fail(f"Max {MAX_IMAGES} images allowed")
-            ad.media.filter(kind=AdMedia.IMAGE).delete()
-            for idx, f in enumerate(image_files[:MAX_IMAGES]):
-                url = _save_upload(f, subdir="ads/images")
-                AdMedia.objects.create(ad=ad, kind=AdMedia.IMAGE, url=url, order_index=idx)
-        elif "images" in payload:
-            images_urls = payload.get("images") or []
-            if not isinstance(images_urls, list):
-                return fail("'images' must be an array of URLs")
-            if len(images_urls) > MAX_IMAGES:
-                return fail(f"Max {MAX_IMAGES} images allowed")
-            ad.media.filter(kind=AdMedia.IMAGE).delete()
-            for idx, u in enumerate(images_urls):
-                AdMedia.objects.create(ad=ad, kind=AdMedia.IMAGE, url=u, order_index=idx)
-
-        if video_file:
-            ad.media.filter(kind=AdMedia.VIDEO).delete()
-            url = _save_upload(video_file, subdir="ads/videos")
-            AdMedia.objects.create(ad=ad, kind=AdMedia.VIDEO, url=url, order_index=0)
-        elif "video" in payload:
-            v = payload.get("video")
-            if v in ("", None):
-                ad.media.filter(kind=AdMedia.VIDEO).delete()
-            elif isinstance(v, str):
-                ad.media.filter(kind=AdMedia.VIDEO).delete()
-                AdMedia.objects.create(ad=ad, kind=AdMedia.VIDEO, url=v, order_index=0)
+        # 5) uploaded files, diffed against the current media
+        if image_files or video_file:
+            images, video, stored = store_uploads(image_files, video_file)
+            try:
+                with transaction.atomic():
+                    write_media(ad, ad.media.all(), images=images if image_files else None, video=video)
+            except Exception:
+                discard_uploads(stored)
+                raise
 
         return ok("Ad updated successfully")
 
+def _my_ads_queryset(user):
+    """
+    Owner's non-archived ads, newest first, with everything the list
+    serializers read loaded up front (category + QR joined, values/media prefetched).
+    """
+    return (
+        Ad.objects
+        .filter(owner=user)
+        .exclude(status="archived")
+        .select_related("category", "qr_code", "qr_code__artifact_job")
+        .prefetch_related(
+            Prefetch("values", queryset=AdFieldValue.objects.select_related("field")),
+            Prefetch("media", queryset=AdMedia.objects.order_by("order_index", "id")),
+        )
+        .order_by("-created_at", "-id")
+    )
+
+
+MY_ADS_PAGE_SIZE = 20
+MY_ADS_MAX_PAGE_SIZE = 100
+
+
+def _encode_cursor(ad):
+    raw = f"{ad.created_at.isoformat()}|{ad.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor):
+    """Return (created_at, id) or raise ValueError."""
+    try:
+        created_at, ad_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), int(ad_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _keyset_page(request, qs):
+    """
+    Keyset pagination on (created_at, id), both descending.
+    Opt-in: returns (ads, paging) when the body has `limit` or `cursor`,
+    else (qs, None) so old clients keep getting the full list.
+    """
+    cursor = request.data.get("cursor")
+    limit = request.data.get("limit")
+    if cursor in (None, "") and limit in (None, ""):
+        return qs, None
+
+    try:
+        limit = min(max(int(limit or MY_ADS_PAGE_SIZE), 1), MY_ADS_MAX_PAGE_SIZE)
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+
+    if cursor:
+        created_at, ad_id = _decode_cursor(cursor)
+        qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=ad_id))
+
+    ads = list(qs[:limit + 1])
+    has_more = len(ads) > limit
+    ads = ads[:limit]
+    paging = {
+        "limit": limit,
+        "has_more": has_more,
+        "next_cursor": _encode_cursor(ads[-1]) if has_more else None,
+    }
+    return ads, paging
+
+
 class MyAdsListView(APIView):
+    """
+    POST /api/ads/mine   { token, [limit], [cursor] }
+    Without limit/cursor returns every ad (legacy); with them returns one page
+    and a top-level `paging` block ({limit, has_more, next_cursor}).
+    """
     permission_classes = [permissions.AllowAny]
 
     def post(self, request):
@@ -342,25 +410,19 @@ class MyAdsListView(APIView):
         if not token_key:
             return error_response("Token is required")
 
-        try:
-            token = Token.objects.get(key=token_key)
-            user = token.user
-        except Token.DoesNotExist:
+        user = user_for_token(token_key)
+        if user is None:
             return error_response("Invalid or expired token")
 
-        ads = (
-            Ad.objects
-            .filter(owner=user)
-            .exclude(status="archived")
-            .order_by("-created_at")
-            .prefetch_related("values__field", "media")
-        )
-
-        data = []
+        try:
+            ads, paging = _keyset_page(request, _my_ads_queryset(user))
+        except ValueError as e:
+            return error_response(str(e))
 
-        for ad in ads:
-            ad_data = AdDetailSerializer(ad).data
+        ads = list(ads)
+        data = AdDetailSerializer(ads, many=True).data
 
+        for ad, ad_data in zip(ads, data):
             publish_data = {}
 
             if ad.status == "published":
@@ -368,12 +430,15 @@ class MyAdsListView(APIView):
 
             ad_data["publish"] = publish_data
 
-            data.append(ad_data)
-        return success_responseArray("Ads fetched", data=data)
+        response = success_responseArray("Ads fetched", data=data)
+        if paging is not None:
+            response.data["paging"] = paging
+        return response
 
 def get_publish_links(ad):
 
-    qr = QRCode.objects.filter(ad=ad).first()
+    # reverse one-to-ones: free when the caller select_related("qr_code__artifact_job")
+    qr = getattr(ad, "qr_code", None)
 
     if not qr:
         return {}
@@ -384,34 +449,43 @@ def get_publish_links(ad):
     qr_image_url = f"{PUBLIC_BASE}/media/qr/images/qr_{qr.code}.png"
     pdf_url = f"{PUBLIC_BASE}/media/qr/pdf/qr_{qr.code}.pdf"
 
+    # no job row: QR from before the job pool, files were rendered inline
+    job = getattr(qr, "artifact_job", None)
+    qr_status = job.status if job else QRArtifactJob.DONE
+
     return {
         "public_url": public_url,
         "qr_url": qr_url,
         "qr_code": qr.code,
         "qr_image": qr_image_url,
-        "qr_pdf": pdf_url
+        "qr_pdf": pdf_url,
+        "qr_status": qr_status,
+        "qr_ready": qr_status == QRArtifactJob.DONE,
     }
 
 class MyAdsByTokenView(APIView):
+    """
+    POST /api/ads/by-token   { token, [limit], [cursor] }  (same paging as /api/ads/mine)
+    """
     permission_classes = [permissions.AllowAny]
     def post(self, request):
         token_str = request.data.get("token")
         if not token_str:
             return fail("token is required")
-        try:
-            token = Token.objects.get(key=token_str)
-        except Token.DoesNotExist:
+        user = user_for_token(token_str)
+        if user is None:
             return fail("invalid token", status_code=http_status.HTTP_401_UNAUTHORIZED)
 
-        user = token.user
-        qs = (Ad.objects
-              .filter(owner=user)
-              .exclude(status="archived")  # ✅ هنا
-              .order_by("-created_at")
-              .prefetch_related("values__field", "media"))
+        try:
+            ads, paging = _keyset_page(request, _my_ads_queryset(user))
+        except ValueError as e:
+            return fail(str(e))
 
-        data = AdDetailSerializer(qs, many=True).data
-        return ok("Ads fetched", data=data)
+        data = AdDetailSerializer(ads, many=True).data
+        response = ok("Ads fetched", data=data)
+        if paging is not None:
+            response.data["paging"] = paging
+        return response
 def require_body_id(request, field="ad_id"):
     ad_id = request.data.get(field)
     if not ad_id:
@@ -489,12 +563,7 @@ def _auth_user_from_request(request):
         token_key = auth.split(" ", 1)[1].strip()
     if not token_key:
         token_key = request.query_params.get("token") or request.data.get("token")
-    if not token_key:
-        return None
-    try:
-        return Token.objects.get(key=token_key).user
-    except Token.DoesNotExist:
-        return None
+    return user_for_token(token_key)
 
 def _localize(item, locale, en_key, ar_key):
     if locale == "ar":
@@ -553,11 +622,77 @@ def _as_bool(v):
     # fallback: anything non-empty is True
     return True
 
+# Fields whose options come from an options endpoint instead of inline
+# `choices` (the full model list is thousands of rows).
+REMOTE_OPTION_FIELDS = {
+    ("cars", "model"): {"url": "/api/cars/models", "depends_on": "make", "param": "make"},
+}
+
+
+def _compile_form_schema(category_key, locale, remote_options=False):
+    """
+    Localized create-mode schema for AdFormView (cached by get_cached_schema).
+    Returns None if the category doesn't exist.
+    With remote_options, REMOTE_OPTION_FIELDS ship an `options_source` and no choices.
+    """
+    cat = AdCategory.objects.filter(key=category_key).first()
+    if cat is None:
+        return None
+
+    # Dynamic fields
+    fqs = (FieldDefinition.objects
+           .filter(category=cat, visible_public=True)  # ✅ add this filter
+           .select_related("type")
+           .order_by("order_index", "key"))
+    dynamic = PublicFieldSerializer(fqs, many=True).data
+    for item in dynamic:
+        item["label"] = _localize(item, locale, "label_en", "label_ar")
+        item["placeholder"] = _localize(item, locale, "placeholder_en", "placeholder_ar")
+        source = REMOTE_OPTION_FIELDS.get((cat.key, item["key"]))
+        if source and remote_options:
+            item["choices"] = []
+            item["options_source"] = source
+
+    # Base core fields (no isPublick here)
+    core_fields = [
+        {
+            "key": "title",
+            "type": "text",
+            "label": "عنوان الاعلان" if locale == "ar" else "Ads Title",
+            "required": True,
+            "placeholder": "اكتب عنوان الإعلان" if locale == "ar" else "Write the ad title",
+        },
+        {
+            "key": "price",
+            "type": "currency",
+            "label": "السعر" if locale == "ar" else "Price",
+            "required": False,
+            "placeholder": "دينار" if locale == "ar" else "JOD",
+            "validation": {"minimum": 1}
+        },
+        {
+            "key": "city",
+            "type": "text",
+            "label": "المدينة" if locale == "ar" else "city",
+            "required": False,
+            "placeholder": "المدينة" if locale == "ar" else "city",
+        }
+    ]
+
+    return {
+        "category": {"key": cat.key, "name_en": cat.name_en, "name_ar": cat.name_ar},
+        "core_fields": core_fields,
+        "dynamic_fields": [dict(item) for item in dynamic],
+    }
+
+
 class AdFormView(APIView):
     """
-    GET  /api/ads/form?category=<key>&locale=<en|ar>&token=[opt]&ad_id=[opt]
+    GET  /api/ads/form?category=<key>&locale=<en|ar>&token=[opt]&ad_id=[opt]&choices=[remote]
       - If token + ad_id are present and user owns the ad -> returns prefilled 'value' per field (edit mode)
-      - Else returns blank schema (create mode)
+      - Else returns blank schema (create mode, ETag / If-None-Match)
+      - choices=remote: car models are not inlined, the field carries
+        options_source -> /api/cars/models (opt-in so existing app builds keep the inline list)
 
     POST /api/ads/form    (JSON or multipart)
       - Body must include token (header or body/query)
@@ -580,52 +715,35 @@ class AdFormView(APIView):
             locale = "en"
         #
         ad_id = request.query_params.get("ad_id")
-        user = _auth_user_from_request(request)
+        # opt-in: ?choices=remote leaves the car model list to /api/cars/models
+        remote_options = (request.query_params.get("choices") or "").lower() == "remote"
 
-        cat = get_object_or_404(AdCategory, key=category_key)
-
-        # Dynamic fields
-        fqs = (FieldDefinition.objects
-               .filter(category=cat, visible_public=True)  # ✅ add this filter
-               .select_related("type")
-               .order_by("order_index", "key"))
-        dynamic = PublicFieldSerializer(fqs, many=True).data
-        for item in dynamic:
-            item["label"] = _localize(item, locale, "label_en", "label_ar")
-            item["placeholder"] = _localize(item, locale, "placeholder_en", "placeholder_ar")
-
-        # Base core fields (no isPublick here)
-        core_fields = [
-            {
-                "key": "title",
-                "type": "text",
-                "label": "عنوان الاعلان" if locale == "ar" else "Ads Title",
-                "required": True,
-                "placeholder": "اكتب عنوان الإعلان" if locale == "ar" else "Write the ad title",
-            },
-            {
-                "key": "price",
-                "type": "currency",
-                "label": "السعر" if locale == "ar" else "Price",
-                "required": False,
-                "placeholder": "دينار" if locale == "ar" else "JOD",
-                "validation": {"minimum": 1}
-            },
-            {
-                "key": "city",
-                "type": "text",
-                "label": "المدينة" if locale == "ar" else "city",
-                "required": False,
-                "placeholder": "المدينة" if locale == "ar" else "city",
-            }
-        ]
+        # Compiled (category, locale) schema; rebuilt only after field/type/category edits
+        entry = get_cached_schema(
+            "form-remote" if remote_options else "form", category_key, locale,
+            lambda: _compile_form_schema(category_key, locale, remote_options),
+        )
+        if entry is None:
+            raise Http404("No AdCategory matches the given query.")
+        schema = entry["data"]
+        etag = f'"{entry["version"]}"'
 
         mode = "create"
         ad_hint = {}
         submit = {"method": "POST", "url": "/api/ads/form"}
 
+        if not ad_id:
+            # create mode is a pure function of the schema -> conditional GET
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                not_modified["ETag"] = etag
+                return not_modified
+            core_fields = schema["core_fields"]
+            dynamic = schema["dynamic_fields"]
+
         # --- Edit mode only if ad_id present and owned by user ---
-        if ad_id:
+        else:
+            user = _auth_user_from_request(request)
             if not user:
                 return Response({"status": False, "message": "Authentication required for edit"}, status=401)
 
@@ -633,7 +751,7 @@ class AdFormView(APIView):
                 Ad.objects.prefetch_related(
                     Prefetch("values", queryset=AdFieldValue.objects.select_related("field"))
                 ),
-                id=ad_id, owner=user, category=cat
+                id=ad_id, owner=user, category__key=category_key
             )
 
             # Append isPublick ONLY in edit mode
@@ -645,15 +763,14 @@ class AdFormView(APIView):
             #     "placeholder": "",
             # })
 
-            # Prefill core values
+            # Prefill core values (shallow copies: the cached schema is shared)
             core_map = {
                 "title": ad.title,
                 "price": ad.price,
                 "city": ad.city,
                 "isPublick": (ad.status == "published"),
             }
-            for cf in core_fields:
-                cf["value"] = core_map.get(cf["key"])
+            core_fields = [{**cf, "value": core_map.get(cf["key"])} for cf in schema["core_fields"]]
 
             # Prefill dynamic values
             best = {}
@@ -663,8 +780,7 @@ class AdFormView(APIView):
                     best[k] = v.value
                 elif k not in best:
                     best[k] = v.value
-            for item in dynamic:
-                item["value"] = best.get(item["key"])
+            dynamic = [{**item, "value": best.get(item["key"])} for item in schema["dynamic_fields"]]
 
             mode = "edit"
             ad_hint = {"ad_id": ad.id, "code": ad.code}
@@ -674,15 +790,19 @@ class AdFormView(APIView):
             "message": "Form schema",
             "data": {
                 "mode": mode,
-                "category": {"key": cat.key, "name_en": cat.name_en, "name_ar": cat.name_ar},
+                "category": schema["category"],
                 "locale": locale,
+                "schema_version": entry["version"],
                 "core_fields": core_fields,
                 "dynamic_fields": dynamic,
                 "submit": submit,
                 "ad": ad_hint  # present only for edit
             }
         }
-        return Response(payload, status=200)
+        response = Response(payload, status=200)
+        if mode == "create":
+            response["ETag"] = etag
+        return response
 
     # ---------- POST: create or edit (same body shape) ----------
     def post(self, request):
@@ -695,6 +815,9 @@ class AdFormView(APIView):
 
         # Extract files (multipart) before building serializer payload
         image_files, video_file = _extract_files(request)
+        too_large = check_upload_sizes(image_files, video_file)
+        if too_large:
+            return Response({"status": False, "message": too_large}, status=400)
 
         # Build payload: keep known fields; 'values' may need parsing
         payload = {}
@@ -713,99 +836,77 @@ class AdFormView(APIView):
             payload.pop("images", None)
             payload.pop("video", None)
 
-        # ------------- create or edit -------------
-        if not ad_id:
+        # ------------- validate (nothing is written before this passes) -------------
+        MAX_IMAGES = 12
+        created = not ad_id
+        if created:
             if not payload.get("category"):
                 return Response({"status": False, "message": "category is required"}, status=400)
-            try:
-                s = AdCreateSerializer(data=payload, context={"request": request})
-                s.is_valid(raise_exception=True)
-            except ValidationError as e:
-                return Response({"status": False, "message": first_error_message(e.detail)}, status=400)
-
-            ad = s.save()
-            if not ad.owner_id:
-                ad.owner = user
-                ad.save(update_fields=["owner"])
+            s = AdCreateSerializer(data=payload, context={"request": request})
         else:
-            ad = get_object_or_404(Ad, id=ad_id, owner=user)
-            try:
-                s = AdUpdateSerializer(data=payload, context={"ad": ad})
-                s.is_valid(raise_exception=True)
-                s.update(ad, s.validated_data)
-            except ValidationError as e:
-                return Response({"status": False, "message": first_error_message(e.detail)}, status=400)
-
-        # ------------- media handling -------------
-        MAX_IMAGES = 12
-
-        # Files (multipart)
-        if image_files:
-            if len(image_files) > MAX_IMAGES:
-                return Response({"status": False, "message": f"Max {MAX_IMAGES} images allowed"}, status=400)
-            ad.media.filter(kind=AdMedia.IMAGE).delete()
-            for idx, f in enumerate(image_files[:MAX_IMAGES]):
-                url = _save_upload(f, subdir="ads/images")
-                AdMedia.objects.create(ad=ad, kind=AdMedia.IMAGE, url=url, order_index=idx)
-
-        if video_file:
-            ad.media.filter(kind=AdMedia.VIDEO).delete()
-            url = _save_upload(video_file, subdir="ads/videos")
-            AdMedia.objects.create(ad=ad, kind=AdMedia.VIDEO, url=url, order_index=0)
-
-        # JSON URLs (when not uploading files)
-        if not image_files and isinstance(data.get("images"), list):
-            images_urls = data.get("images") or []
-            if len(images_urls) > MAX_IMAGES:
-                return Response({"status": False, "message": f"Max {MAX_IMAGES} images allowed"}, status=400)
-            ad.media.filter(kind=AdMedia.IMAGE).delete()
-            for idx, u in enumerate(images_urls):
-                AdMedia.objects.create(ad=ad, kind=AdMedia.IMAGE, url=u, order_index=idx)
-
-        if not video_file and isinstance(data.get("video"), str):
-            v = data.get("video")
-            ad.media.filter(kind=AdMedia.VIDEO).delete()
-            if v:
-                AdMedia.objects.create(ad=ad, kind=AdMedia.VIDEO, url=v, order_index=0)
-
-        # ------------- NEW: publish/draft via isPublick -------------
-        is_publick = _as_bool(data.get("isPublick"))
-        if is_publick is True:
-            # publish
-            if ad.status != "published":
-                ad.status = "published"
-                ad.published_at = timezone.now()
-                ad.save(update_fields=["status", "published_at"])
-        elif is_publick is False:
-            # draft
-            if ad.status != "draft" or ad.published_at is not None:
-                ad.status = "draft"
-                ad.published_at = None
-                ad.save(update_fields=["status", "published_at"])
-        # If None -> user did not touch it; keep current status
-
-        is_direct = True
+            # QR + render job ride along for the publish links
+            ad = get_object_or_404(
+                Ad.objects.select_related("category", "qr_code__artifact_job"), id=ad_id, owner=user
+            )
+            s = AdUpdateSerializer(data=payload, context={"ad": ad})
+        try:
+            s.is_valid(raise_exception=True)
+        except ValidationError as e:
+            return Response({"status": False, "message": first_error_message(e.detail)}, status=400)
+        validated = s.validated_data
+
+        # ------------- media: files (multipart) or JSON URLs -------------
+        images = [NewMedia(u) for u in validated["images"]] if "images" in validated else None
+        video, drop_video = None, False
+        if "video" in validated:
+            video = NewMedia(validated["video"]) if validated["video"] else None
+            drop_video = video is None
+        if len(image_files) > MAX_IMAGES or len(images or ()) > MAX_IMAGES:
+            return Response({"status": False, "message": f"Max {MAX_IMAGES} images allowed"}, status=400)
+
+        stored = []
+        if image_files or video_file:
+            uploaded_images, uploaded_video, stored = store_uploads(image_files, video_file)
+            if image_files:
+                images = uploaded_images
+            if video_file:
+                video, drop_video = uploaded_video, False
 
-        if is_direct:
-            publish_data = publish_ad_direct(ad, request)
+        # ------------- write: one Ad save, bulk values/media, QR -------------
+        if created:
+            ad = Ad(owner=user, category=validated["category"])
+            defs = s.field_defs
+        else:
+            defs = category_field_defs(ad.category)
+        for f in ("title", "price", "city"):
+            if f in validated:
+                setattr(ad, f, validated[f])
+        # isPublick is not consulted: every save through this endpoint publishes
+        ad.status = "published"
+        ad.published_at = timezone.now()
 
-            return Response({
-                "status": True,
-                "message": "Ad created and published",
-                "data": {
-                    "ad": AdDetailSerializer(ad).data,
-                    **publish_data
-                }
-            }, status=201)
+        try:
+            with transaction.atomic():
+                ad.save()
+                values = write_values(ad, defs, validated.get("values"),
+                                      existing=() if created else ad.values.all())
+                media = write_media(ad, existing=() if created else ad.media.all(),
+                                    images=images, video=video, drop_video=drop_video)
+                _attach_qr(ad, None if created else getattr(ad, "qr_code", None))
+        except Exception:
+            discard_uploads(stored)
+            raise
 
+        # serialized from the rows written above, nothing is read back
+        prime_relations(ad, values=values, media=media)
         return Response({
             "status": True,
-            "message": "Saved",
+            "message": "Ad created and published",
             "data": {
-                **AdDetailSerializer(ad).data,
-                "isPublick": (ad.status == "published")
+                "ad": AdDetailSerializer(ad).data,
+                **get_publish_links(ad)
             }
-        }, status=200)
+        }, status=201)
 
 
 
@@ -868,13 +969,8 @@ class AdMediaView(APIView):
             return Response({"status": False, "message": "ad_id is required"}, status=400)
 
         ad = get_object_or_404(Ad.objects.filter(owner=user), id=ad_id)
-        media_qs = ad.media.order_by("kind", "order_index", "id").values("id", "kind", "url", "order_index")
-        data = {
-            "ad_id": ad.id,
-            "images": [m for m in media_qs if m["kind"] == AdMedia.IMAGE],
-            "video": next((m for m in media_qs if m["kind"] == AdMedia.VIDEO), None)
-        }
-        return Response({"status": True, "message": "Media list", "data": data}, status=200)
+        return Response({"status": True, "message": "Media list",
+                         "data": self._media_data(ad, ad.media.all())}, status=200)
 
     # ---------- POST: upload / append media ----------
     @transaction.atomic
@@ -898,9 +994,15 @@ class AdMediaView(APIView):
 
         replace_video = str(data.get("replace_video", "false")).lower() in ("1", "true", "yes")
 
-        # current counts
-        current_images = ad.media.filter(kind=AdMedia.IMAGE).count()
-        current_videos = ad.media.filter(kind=AdMedia.VIDEO).count()
+        too_large = check_upload_sizes(image_files, video_file)
+        if too_large:
+            return Response({"status": False, "message": too_large}, status=400)
+
+        # current media, read once
+        existing = list(ad.media.all())
+        current = sorted((m for m in existing if m.kind == AdMedia.IMAGE), key=lambda m: (m.order_index, m.id))
+        current_images = len(current)
+        current_videos = len(existing) - current_images
 
         # ---- enforce image limit
         new_image_count = len(image_files) if image_files else len(images_urls)
@@ -917,39 +1019,23 @@ class AdMediaView(APIView):
             if current_videos >= self.MAX_VIDEO and not replace_video:
                 return Response({"status": False, "message": "A video already exists. Set replace_video=true to overwrite."}, status=400)
 
-        # save images
-        if new_image_count:
-            start_index = ad.media.filter(kind=AdMedia.IMAGE).aggregate(c=Count("id"))["c"] or 0
-            if image_files:  # multipart files
-                for idx, f in enumerate(image_files):
-                    url = _save_upload(f, subdir=self.IMAGE_SUBDIR)
-                    AdMedia.objects.create(ad=ad, kind=AdMedia.IMAGE, url=url, order_index=start_index + idx)
-            else:  # urls
-                for idx, u in enumerate(images_urls):
-                    AdMedia.objects.create(ad=ad, kind=AdMedia.IMAGE, url=u, order_index=start_index + idx)
-
-        # save/replace video
-        if wants_video:
-            if replace_video:
-                ad.media.filter(kind=AdMedia.VIDEO).delete()
-            elif current_videos >= self.MAX_VIDEO:
-                # defensive (should already be caught)
-                return Response({"status": False, "message": "Video already exists"}, status=400)
+        # appended after the current images; the diff leaves those rows untouched
+        uploaded, video, stored = store_uploads(image_files, video_file)
+        added = uploaded if image_files else [NewMedia(u) for u in images_urls]
+        if not video_file and video_url:
+            video = NewMedia(video_url)
+        try:
+            media = write_media(
+                ad, existing,
+                images=[NewMedia(m.url, m.content_hash) for m in current] + added if added else None,
+                video=video,
+            )
+        except Exception:
+            discard_uploads(stored)
+            raise
 
-            if video_file:
-                v_url = _save_upload(video_file, subdir=self.VIDEO_SUBDIR)
-            else:
-                v_url = video_url
-            AdMedia.objects.create(ad=ad, kind=AdMedia.VIDEO, url=v_url, order_index=0)
-
-        # return fresh list
-        media_qs = ad.media.order_by("kind", "order_index", "id").values("id", "kind", "url", "order_index")
-        data_out = {
-            "ad_id": ad.id,
-            "images": [m for m in media_qs if m["kind"] == AdMedia.IMAGE],
-            "video": next((m for m in media_qs if m["kind"] == AdMedia.VIDEO), None)
-        }
-        return Response({"status": True, "message": "Media updated", "data": data_out}, status=200)
+        return Response({"status": True, "message": "Media updated",
+                         "data": self._media_data(ad, media)}, status=200)
 
     # ---------- DELETE: remove media ----------
     @transaction.atomic
@@ -967,6 +1053,7 @@ class AdMediaView(APIView):
         media_id = request.query_params.get("media_id") or request.data.get("media_id")
         kind = (request.query_params.get("kind") or request.data.get("kind") or "").lower()
 
+        # storage files go with the rows (release_media_storage receiver)
         if media_id:
             deleted, _ = ad.media.filter(id=media_id).delete()
             if not deleted:
@@ -977,13 +1064,8 @@ class AdMediaView(APIView):
             ad.media.filter(kind=AdMedia.IMAGE if kind == "image" else AdMedia.VIDEO).delete()
 
         # re-pack list
-        media_qs = ad.media.order_by("kind", "order_index", "id").values("id", "kind", "url", "order_index")
-        data_out = {
-            "ad_id": ad.id,
-            "images": [m for m in media_qs if m["kind"] == AdMedia.IMAGE],
-            "video": next((m for m in media_qs if m["kind"] == AdMedia.VIDEO), None)
-        }
-        return Response({"status": True, "message": "Media deleted", "data": data_out}, status=200)
+        return Response({"status": True, "message": "Media deleted",
+                         "data": self._media_data(ad, ad.media.all())}, status=200)
 
     # ---------- PUT: reorder images ----------
     @transaction.atomic
@@ -1003,27 +1085,38 @@ class AdMediaView(APIView):
 
         ad = get_object_or_404(Ad.objects.filter(owner=user), id=ad_id)
 
-        images_qs = ad.media.filter(kind=AdMedia.IMAGE)
-        valid_ids = set(images_qs.values_list("id", flat=True))
-        if not set(order).issubset(valid_ids):
+        media = list(ad.media.all())
+        images = {m.id: m for m in media if m.kind == AdMedia.IMAGE}
+        if not set(order).issubset(images):
             return Response({"status": False, "message": "order contains invalid media_ids"}, status=400)
 
-        # apply order_index = index in list
+        # order_index = index in list; only rows that actually move are written
         id_to_idx = {mid: i for i, mid in enumerate(order)}
-        for m in images_qs:
-            if m.id in id_to_idx:
-                m.order_index = id_to_idx[m.id]
-                m.save(update_fields=["order_index"])
+        moved = []
+        for mid, idx in id_to_idx.items():
+            if images[mid].order_index != idx:
+                images[mid].order_index = idx
+                moved.append(images[mid])
+        if moved:
+            AdMedia.objects.bulk_update(moved, ["order_index"])
+            invalidate_ad_page(ad.code)  # bulk_update skips the receivers
+
+        return Response({"status": True, "message": "Images reordered",
+                         "data": self._media_data(ad, media)}, status=200)
 
-        media_qs = ad.media.order_by("kind", "order_index", "id").values("id", "kind", "url", "order_index")
-        data_out = {
+    # ---------- helpers ----------
+    @staticmethod
+    def _media_data(ad, media):
+        rows = [
+            {"id": m.id, "kind": m.kind, "url": m.url, "order_index": m.order_index}
+            for m in sorted(media, key=lambda m: (m.kind, m.order_index, m.id))
+        ]
+        return {
             "ad_id": ad.id,
-            "images": [m for m in media_qs if m["kind"] == AdMedia.IMAGE],
-            "video": next((m for m in media_qs if m["kind"] == AdMedia.VIDEO), None)
+            "images": [m for m in rows if m["kind"] == AdMedia.IMAGE],
+            "video": next((m for m in rows if m["kind"] == AdMedia.VIDEO), None)
         }
-        return Response({"status": True, "message": "Images reordered", "data": data_out}, status=200)
 
-    # ---------- helpers ----------
     def _extract_files(self, request):
         """Return (image_files, video_file) from multipart."""
         image_files = []
@@ -1047,6 +1140,10 @@ class AdMediaView(APIView):
 from django.shortcuts import render, get_object_or_404
 from django.db.models import Prefetch
 from mainapp.models import Ad, AdMedia, AdFieldValue, FieldDefinition
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from mainapp.helperUtilis.ad_page_cache import ad_page_changed_at, get_cached_ad_page, set_cached_ad_page
 
 def _lang(request):
     """Decide language from ?lang=ar|en, header, or default."""
@@ -1098,10 +1195,33 @@ def _format_value(fd, val, lang=None):
     return str(val)
 
 
+def _ad_page_response(request, entry):
+    """
+    Serve a cached page entry, answering 304 when the client's
+    If-None-Match / If-Modified-Since still matches.
+    """
+    response = get_conditional_response(
+        request, etag=entry["etag"], last_modified=entry["last_modified"]
+    )
+    if response is None:
+        response = HttpResponse(entry["html"])
+    response["ETag"] = entry["etag"]
+    response["Last-Modified"] = http_date(entry["last_modified"])
+    patch_vary_headers(response, ["Accept-Language"])
+    return response
+
+
 # coreViews.py
 def ad_public_page_by_code(request, code: str):
     lang = _lang(request)
 
+    entry = get_cached_ad_page(code, lang)
+    if entry is None:
+        entry = _render_ad_page(request, code, lang)
+    return _ad_page_response(request, entry)
+
+
+def _render_ad_page(request, code: str, lang: str):
     ad = get_object_or_404(
         Ad.objects
             .filter(status="published")
@@ -1187,6 +1307,17 @@ def ad_public_page_by_code(request, code: str):
     # Media
     # ---------------------------------
     images = [m.url for m in ad.media.all() if m.kind == AdMedia.IMAGE]
+    gallery = [
+        {
+            "url": m.url,
+            "src": rendition_url(m.renditions, "large") or m.url,
+            "thumb": rendition_url(m.renditions, "thumb") or m.url,
+            "thumb_webp": rendition_url(m.renditions, "thumb", "webp"),
+            "srcset": srcset(m.renditions),
+            "srcset_webp": srcset(m.renditions, "webp"),
+        }
+        for m in ad.media.all() if m.kind == AdMedia.IMAGE
+    ]
     video = next(
         (m.url for m in ad.media.all() if m.kind == AdMedia.VIDEO),
         None
@@ -1196,8 +1327,21 @@ def ad_public_page_by_code(request, code: str):
     # Phone number
     # ---------------------------------
     phone_number = None
+    profile = None
     if hasattr(ad, "owner") and hasattr(ad.owner, "profile"):
-        phone_number = getattr(ad.owner.profile, "phone", None)
+        profile = ad.owner.profile
+        phone_number = getattr(profile, "phone", None)
+
+    # Newest write that can show on the page (drives Last-Modified); edits
+    # without a timestamp (title/price, media order, renditions) are covered
+    # by the stamp invalidate_ad_page() leaves behind
+    stamps = [ad.published_at, ad.created_at, getattr(profile, "updated_at", None)]
+    stamps += [v.updated_at for v in ad.values.all()]
+    stamps += [m.created_at for m in ad.media.all()]
+    last_modified = max(
+        max(s for s in stamps if s).timestamp(),
+        ad_page_changed_at(ad.code),
+    )
 
     # ---------------------------------
     # Context
@@ -1212,6 +1356,7 @@ def ad_public_page_by_code(request, code: str):
         "core": core,
         "dynamic": dynamic,
         "images": images,
+        "gallery": gallery,
         "video": video,
         "meta": {
             "title": ad.title or (
@@ -1219,13 +1364,15 @@ def ad_public_page_by_code(request, code: str):
                 else ad.category.name_en
             ),
             "description": f"{city_value} • {ad.price or ''}",
-            "image": images[0] if images else None,
-            "url": request.build_absolute_uri(),
+            "image": gallery[0]["src"] if gallery else None,
+            # canonical URL (not the request URI) so the rendered page is cacheable
+            "url": f"{PUBLIC_BASE}/ads/{ad.code}/" + ("?lang=ar" if lang == "ar" else ""),
         },
         "phone": phone_number,
     }
 
-    return render(request, "ads/ad_detail.html", context)
+    html = render_to_string("ads/ad_detail.html", context, request=request)
+    return set_cached_ad_page(ad.code, lang, html, last_modified)
 
 
 def ad_public_page_by_id(request, ad_id: int):
@@ -1340,35 +1487,39 @@ class ActivateQRView(views.APIView):
         # Save QR (won't violate unique now)
         qr.save(update_fields=["ad", "is_assigned", "is_activated"])
 
-        # Log (optional – keep simple to avoid other IntegrityErrors)
-        QRScanLog.objects.create(
-            qr=qr, ad=ad,
+        # Log (queued; written in batches after commit)
+        scan_args = dict(
+            qr_id=qr.id, ad_id=ad.id,
             ip=_client_ip(request),
             user_agent=request.META.get("HTTP_USER_AGENT"),
             referrer=request.META.get("HTTP_REFERER"),
         )
-        qr.mark_scanned()
+        transaction.on_commit(lambda: scan_ingestor.record(**scan_args))
 
         public_url = f"{PUBLIC_BASE}/ads/{ad.code}"
         return Response({"status": True, "message": "Ad published via QR.", "public_url": public_url}, status=status.HTTP_200_OK)
 
 
 
-from django.http import HttpResponse, HttpResponseNotFound, HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseNotFound, HttpResponseRedirect, Http404
 from django.shortcuts import get_object_or_404
 from mainapp.models import QRCode, QRScanLog
+from mainapp.helperUtilis.scan_ingestor import scan_ingestor
+from mainapp.helperUtilis.qr_resolver import qr_resolver
 
 def qr_landing(request, code):
-    qr = get_object_or_404(QRCode, code=code)
-
-    # log every hit
-    QRScanLog.objects.create(
-        qr=qr, ad=qr.ad,
+    # cached code -> (qr id, ad id, ad code, flags); activated stickers need no query
+    qr = qr_resolver.resolve(code)
+    if qr is None:
+        raise Http404("QR not found")
+
+    # log every hit (buffered, flushed off the request thread)
+    scan_ingestor.record(
+        qr.qr_id, qr.ad_id,
         ip=request.META.get("REMOTE_ADDR"),
         user_agent=request.META.get("HTTP_USER_AGENT"),
         referrer=request.META.get("HTTP_REFERER"),
     )
-    qr.mark_scanned()
 
     if not qr.ad_id:
         # unassigned sticker
@@ -1379,7 +1530,7 @@ def qr_landing(request, code):
         return HttpResponse("<h2>This ad is not activated yet.</h2>", status=403)
 
     # activated → redirect to the public ad page
-    return HttpResponseRedirect(f"/ads/{qr.ad.code}")
+    return HttpResponseRedirect(f"/ads/{qr.ad_code}")
 # views/ads_delete.py (or inside your existing views file)
 
 from django.db import transaction
@@ -0,0 +1,210 @@
+# mainapp/views/searchViews.py
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import F, Prefetch, Q
+from rest_framework import permissions, status
+from rest_framework.views import APIView
+
+from mainapp.models import Ad, AdCategory, AdFieldValue, AdFieldValueTyped, AdMedia, AdSearchIndex, FieldDefinition
+from mainapp.serializers.coreSerializers import PublicAdSerializer
+from mainapp.helperUtilis.ad_facets import get_cached_facets
+from mainapp.helperUtilis.ad_search_index import choice_key, normalize_city
+from mainapp.helperUtilis.text_search import match_ad_ids
+from mainapp.helperUtilis.typed_values import as_date, as_number, as_text
+from .coreViews import ok, fail
+
+# Public browse/search over published ads. Filters run against the flat
+# AdSearchIndex table (one row per published ad), never the EAV values.
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+
+# f_<field key>=<value> / f_<field key>_min= / f_<field key>_max= on any
+# public dynamic field, answered from the typed AdFieldValue projection
+TYPED_PARAM = re.compile(r"^f_(?P<key>[-\w]+?)(?:_(?P<op>min|max))?$")
+ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+MAX_TYPED_FILTERS = 6
+
+SORTS = {
+    "newest": ("-published_at", "-ad_id"),
+    "oldest": ("published_at", "ad_id"),
+    # ads without a price/year go last either way
+    "price_asc": (F("price").asc(nulls_last=True), "-published_at", "-ad_id"),
+    "price_desc": (F("price").desc(nulls_last=True), "-published_at", "-ad_id"),
+    "year_desc": (F("year").desc(nulls_last=True), "-published_at", "-ad_id"),
+    "year_asc": (F("year").asc(nulls_last=True), "-published_at", "-ad_id"),
+}
+
+
+def _number(params, name, cast):
+    raw = (params.get(name) or "").strip()
+    if not raw:
+        return None
+    try:
+        return cast(raw)
+    except (TypeError, ValueError, InvalidOperation):
+        raise ValueError(f"{name} must be a number")
+
+
+def _typed_condition(name, op, raw):
+    if op is None:
+        number = as_number(raw)
+        q = Q(text=as_text(raw))
+        return q | Q(number=number) if number is not None else q
+
+    if ISO_DATE.match(raw):
+        bound, column = as_date(raw), "date"
+    else:
+        bound, column = as_number(raw), "number"
+    if bound is None:
+        raise ValueError(f"{name} must be a number or YYYY-MM-DD date")
+    return Q(**{f"{column}__{'gte' if op == 'min' else 'lte'}": bound})
+
+
+def typed_filters(qs, params):
+    """
+    Apply the f_* params; each one is an indexed (field, typed value) lookup.
+    Only public fields can be filtered on, anything else is "unknown".
+    """
+    filters = []
+    for name in sorted(params):
+        m = TYPED_PARAM.match(name)
+        raw = (params.get(name) or "").strip()
+        if m and raw:
+            filters.append((name, m.group("key"), m.group("op"), raw))
+    if not filters:
+        return qs
+    if len(filters) > MAX_TYPED_FILTERS:
+        raise ValueError(f"At most {MAX_TYPED_FILTERS} field filters")
+
+    public = set(FieldDefinition.objects
+                 .filter(key__in={key for _, key, _, _ in filters}, visible_public=True)
+                 .values_list("key", flat=True))
+    for name, key, op, raw in filters:
+        if key not in public:
+            raise ValueError(f"Unknown field filter: {name}")
+        cond = _typed_condition(name, op, raw)
+        qs = qs.filter(ad_id__in=AdFieldValueTyped.objects
+                       .filter(cond, field__key=key, field__visible_public=True)
+                       .values("ad_id"))
+    return qs
+
+
+def search_index_queryset(params):
+    """AdSearchIndex rows matching the query params (raises ValueError on bad input)."""
+    qs = AdSearchIndex.objects.all()
+
+    # full-text over title + text values (Arabic/English, prefix match)
+    matches = match_ad_ids(params.get("q"))
+    if matches is not None:
+        qs = qs.filter(ad_id__in=matches)
+
+    category = (params.get("category") or "").strip()
+    if category:
+        qs = qs.filter(category__key=category)
+
+    city = normalize_city(params.get("city"))
+    if city:
+        qs = qs.filter(city=city)
+
+    make = choice_key(params.get("make"))
+    if make:
+        qs = qs.filter(make=make)
+    model = choice_key(params.get("model"))
+    if model:
+        qs = qs.filter(model=model)
+
+    min_price = _number(params, "min_price", Decimal)
+    max_price = _number(params, "max_price", Decimal)
+    if min_price is not None:
+        qs = qs.filter(price__gte=min_price)
+    if max_price is not None:
+        qs = qs.filter(price__lte=max_price)
+
+    year = _number(params, "year", int)
+    year_min = _number(params, "year_min", int)
+    year_max = _number(params, "year_max", int)
+    if year is not None:
+        qs = qs.filter(year=year)
+    if year_min is not None:
+        qs = qs.filter(year__gte=year_min)
+    if year_max is not None:
+        qs = qs.filter(year__lte=year_max)
+
+    return typed_filters(qs, params)
+
+
+def public_ads_page(ad_ids):
+    """Published ads for `ad_ids`, in that order, with what PublicAdSerializer reads."""
+    ads = (Ad.objects
+           .filter(id__in=ad_ids, status="published")
+           .select_related("category")
+           .prefetch_related(
+               Prefetch("values", queryset=AdFieldValue.objects.select_related("field")),
+               Prefetch("media", queryset=AdMedia.objects.order_by("order_index", "id")),
+           ))
+    by_id = {ad.id: ad for ad in ads}
+    return [by_id[i] for i in ad_ids if i in by_id]
+
+
+def _paging(params):
+    try:
+        limit = int(params.get("limit") or SEARCH_PAGE_SIZE)
+        offset = int(params.get("offset") or 0)
+    except (TypeError, ValueError):
+        raise ValueError("limit/offset must be integers")
+    return min(max(limit, 1), SEARCH_MAX_PAGE_SIZE), max(offset, 0)
+
+
+class PublicAdSearchView(APIView):
+    """
+    GET /api/public/ads?q=&category=cars&city=&make=&model=&year=&year_min=&year_max=
+                       &min_price=&max_price=&sort=newest&limit=20&offset=0
+    q is full-text (every word must match, prefixes allowed). Any public dynamic
+    field filters as f_<key>=<value>, f_<key>_min=, f_<key>_max= (numbers or
+    YYYY-MM-DD), e.g. f_mileage_km_max=100000. make/model take the choice values of /api/cars/makes|models. sort is one of
+    newest, oldest, price_asc, price_desc, year_desc, year_asc.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            qs = search_index_queryset(params)
+            limit, offset = _paging(params)
+        except ValueError as e:
+            return fail(str(e))
+
+        sort = params.get("sort") or "newest"
+        if sort not in SORTS:
+            return fail(f"sort must be one of: {', '.join(SORTS)}")
+
+        ids = list(qs.order_by(*SORTS[sort]).values_list("ad_id", flat=True)[offset:offset + limit + 1])
+        has_more = len(ids) > limit
+        ads = public_ads_page(ids[:limit])
+
+        response = ok("Ads fetched", data=PublicAdSerializer(ads, many=True).data)
+        response.data["paging"] = {"limit": limit, "offset": offset, "has_more": has_more}
+        return response
+
+
+class PublicAdFacetsView(APIView):
+    """
+    GET /api/public/facets?category=cars[&make=<make value>]
+    Published-ad counts per make, model, city, year bucket and price bucket,
+    biggest first ({"value", "count"}; models also carry parent_value). With
+    make, only that make's models are listed.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        key = (request.query_params.get("category") or "").strip()
+        if not key:
+            return fail("category is required")
+        category = AdCategory.objects.filter(key=key).only("id").first()
+        if category is None:
+            return fail("Unknown category", status_code=status.HTTP_404_NOT_FOUND)
+
+        make = choice_key(request.query_params.get("make"))
+        return ok("Facets fetched", data=get_cached_facets(category, make))
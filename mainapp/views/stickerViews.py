@@ -1,74 +1,235 @@
-import qrcode
-from django.http import HttpResponse
-from io import BytesIO
+import hashlib
+import os
+import tempfile
+import time
+from itertools import islice, tee
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db.models import Count, Max
+from django.http import FileResponse
+from PIL import Image
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
 from reportlab.lib.utils import ImageReader
-from django.conf import settings
-import os
-from mainapp.models import QRCode
+
+from mainapp.models import QRCode, build_qr_public_url
+from mainapp.helperUtilis.admin_utils import iter_qr_code_values
+from mainapp.helperUtilis.pdf_concat import concat_pdfs
+from mainapp.helperUtilis.qr_matrix import draw_qr_vector, iter_qr_matrices
+
+# Bump when the layout below changes, so cached sheets are re-rendered.
+STICKER_LAYOUT_VERSION = 3
+STICKER_DIR = "qr/stickers"
+
+# A sheet is drawn PAGES_PER_PART pages at a time into temp files that are
+# concatenated at the end: reportlab keeps every page of a canvas until save().
+PAGES_PER_PART = 50
+RENDER_LOCK_TIMEOUT = 15 * 60   # seconds; a crashed render frees the batch after this
+RENDER_LOCK_POLL = 0.5
+
+A4_W, A4_H = A4
+
+# === Sticker SIZE ===
+STICKER_W = 95 * mm
+STICKER_H = 55 * mm
+
+COLS = 2
+SPACING_X = 6 * mm
+SPACING_Y = 8 * mm
+
+MARGIN_X = (A4_W - (COLS * STICKER_W) - (SPACING_X * (COLS - 1))) / 2
+MARGIN_Y = 15 * mm
+
+# === ELEMENT SIZES (UPDATED) ===
+QR_SIZE = 36 * mm
+QR_LEFT_PADDING = 4 * mm
+QR_BOX_SIZE = 10                     # px per module, as qrcode.make()
+
+LOGO_SIZE = 12 * mm                  # ← SMALLER LOGO
+LOGO_RIGHT_PADDING = 8 * mm
+LOGO_TOP_PADDING = 8 * mm            # ← FIXED POSITION
+LOGO_DPI = 300
+
+TEXT_LEFT_SPACE_FROM_QR = 2 * mm
+TEXT_TOP_PADDING_UNDER_LOGO = 8 * mm
+
+PAGE_BREAK_Y = 60 * mm               # a new page starts once a row ends below this
 
 
 def generate_qr_sticker_sheet(request, batch_name):
+    """
+    Sticker sheet PDF for a batch. Rendered once per batch state into
+    storage (qr/stickers/) and streamed from there; re-rendered when the
+    batch gains/loses codes or the layout version changes.
+    """
+    path = _sheet_path(batch_name)
+    if not default_storage.exists(path):
+        path = _render_once(batch_name, path)
 
-    qs = QRCode.objects.filter(batch=batch_name).order_by("code")
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
+    return FileResponse(
+        default_storage.open(path, "rb"),
+        content_type="application/pdf",
+        filename=f"stickers-{batch_name}.pdf",
+    )
 
-    A4_W, A4_H = A4
 
-    # === Sticker SIZE ===
-    STICKER_W = 95 * mm
-    STICKER_H = 55 * mm
+def _sheet_path(batch_name):
+    state = QRCode.objects.filter(batch=batch_name).aggregate(n=Count("id"), last=Max("id"))
+    key = f"{batch_name}:{state['n']}:{state['last']}:{STICKER_LAYOUT_VERSION}:{_vector()}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+    return f"{STICKER_DIR}/{_safe_batch(batch_name)}-{digest}.pdf"
 
-    COLS = 2
-    SPACING_X = 6 * mm
-    SPACING_Y = 8 * mm
 
-    margin_x = (A4_W - (COLS * STICKER_W) - (SPACING_X * (COLS - 1))) / 2
-    margin_y = 15 * mm
+def _safe_batch(batch_name):
+    return "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in batch_name)
 
-    # === ELEMENT SIZES (UPDATED) ===
-    QR_SIZE = 36 * mm
-    QR_LEFT_PADDING = 4 * mm
 
-    LOGO_SIZE = 12 * mm                  # ← SMALLER LOGO
-    LOGO_RIGHT_PADDING = 8 * mm
-    LOGO_TOP_PADDING = 8 * mm            # ← FIXED POSITION
+def _vector():
+    return getattr(settings, "QR_PDF_VECTOR", True)
 
-    TEXT_LEFT_SPACE_FROM_QR = 2 * mm
-    TEXT_TOP_PADDING_UNDER_LOGO = 8 * mm
 
+def _render_once(batch_name, path):
+    """
+    Render under a per-batch lock in the shared cache: requests that arrive
+    while a sheet is being drawn wait for that file instead of drawing (and
+    saving) their own copy.
+    """
+    lock = "sticker-sheet-render:" + hashlib.sha1(batch_name.encode("utf-8")).hexdigest()
+    while not cache.add(lock, os.getpid(), RENDER_LOCK_TIMEOUT):
+        if default_storage.exists(path):
+            return path
+        time.sleep(RENDER_LOCK_POLL)
+    try:
+        if default_storage.exists(path):  # finished just before we got the lock
+            return path
+        return _render_sheet(batch_name, path)
+    finally:
+        cache.delete(lock)
+
+
+def _stickers_per_page():
+    rows, y = 0, A4_H - MARGIN_Y
+    while y >= PAGE_BREAK_Y:
+        rows += 1
+        y -= STICKER_H + SPACING_Y
+    return rows * COLS
+
+
+def _render_sheet(batch_name, path):
+    # codes are read in keyset pages and matrices come from the pool a window
+    # ahead; each part is whole pages, and only one part is in memory at a time
+    rows, for_urls = tee(iter_qr_code_values(QRCode.objects.filter(batch=batch_name)))
+    matrices = iter_qr_matrices(
+        (build_qr_public_url(code) for code, _, _ in for_urls),
+        workers=getattr(settings, "STICKER_SHEET_WORKERS", None),
+    )
+    stickers = zip(rows, matrices)
+    per_part = PAGES_PER_PART * _stickers_per_page()
+
+    parts = []
+    try:
+        while True:
+            chunk = list(islice(stickers, per_part))
+            if not chunk and parts:
+                break
+            part = tempfile.TemporaryFile()
+            parts.append(part)
+            c = canvas.Canvas(part, pagesize=A4)
+            draw_sticker_pages(c, [r for r, _ in chunk], [m for _, m in chunk], vector=_vector())
+            c.save()
+            if len(chunk) < per_part:
+                break
+
+        if len(parts) == 1:
+            sheet = parts[0]
+        else:
+            for part in parts:
+                part.seek(0)
+            sheet = tempfile.TemporaryFile()
+            concat_pdfs(parts, sheet)
+            parts.append(sheet)  # closed with the parts
+        sheet.seek(0)
+        saved = default_storage.save(path, File(sheet, name=os.path.basename(path)))
+    finally:
+        for part in parts:
+            part.close()
+    _prune_sheets(batch_name, keep=saved)
+    return saved
+
+
+def _prune_sheets(batch_name, keep):
+    """Delete the batch's sheets for earlier batch states / layouts."""
+    prefix = f"{_safe_batch(batch_name)}-"
+    try:
+        _, files = default_storage.listdir(STICKER_DIR)
+    except (FileNotFoundError, NotImplementedError):
+        return
+    for name in files:
+        if not (name.startswith(prefix) and name.endswith(".pdf")):
+            continue
+        digest = name[len(prefix):-len(".pdf")]  # "a-b-<digest>" is batch "a-b", not "a"
+        digest = digest.split("_", 1)[0]  # storage renames a clash to "<digest>_AbC1234"
+        path = f"{STICKER_DIR}/{name}"
+        if len(digest) == 12 and "-" not in digest and path != keep:
+            default_storage.delete(path)
+
+
+def _print_image(path, size_pt, dpi=LOGO_DPI):
+    """Downsample an image to what `size_pt` needs at `dpi` (never upscales)."""
+    img = Image.open(path)
+    px = round(size_pt / 72 * dpi)
+    if max(img.size) > px:
+        img = img.resize((px, round(px * img.height / img.width)), Image.LANCZOS)
+    return ImageReader(img)
+
+
+def draw_sticker_pages(c, rows, matrices, vector=True):
+    """
+    Lay out (code, batch, created_at) rows with their QR matrices, 2 columns
+    per A4 page. vector=True draws the modules as rectangles; False embeds a
+    raster image per sticker.
+    """
     # Logo path
     logo_path = os.path.join(settings.BASE_DIR, "assets/logo1.png")
-    logo_img = ImageReader(logo_path)
 
-    x = margin_x
-    y = A4_H - margin_y
+    # drawn once into a form XObject at print resolution; every sticker references it
+    c.beginForm("sticker_logo", lowerx=0, lowery=0, upperx=LOGO_SIZE, uppery=LOGO_SIZE)
+    c.drawImage(_print_image(logo_path, LOGO_SIZE), 0, 0, LOGO_SIZE, LOGO_SIZE)
+    c.endForm()
 
-    for i, q in enumerate(qs):
+    x = MARGIN_X
+    y = A4_H - MARGIN_Y
+
+    for i, ((code, batch, created_at), (size, modules)) in enumerate(zip(rows, matrices)):
 
         # === Border ===
         c.setLineWidth(0.4)
         c.rect(x, y - STICKER_H, STICKER_W, STICKER_H)
 
         # === QR Code ===
-        qr_img = qrcode.make(q.public_url)
-        qr_buf = BytesIO()
-        qr_img.save(qr_buf, format="PNG")
-        qr_buf.seek(0)
-
         qr_x = x + QR_LEFT_PADDING
         qr_y = y - STICKER_H + (STICKER_H - QR_SIZE) / 2
 
-        c.drawImage(ImageReader(qr_buf), qr_x, qr_y, QR_SIZE, QR_SIZE)
+        if vector:
+            draw_qr_vector(c, size, modules, qr_x, qr_y, QR_SIZE)
+        else:
+            qr_img = Image.frombytes("L", (size, size), modules).resize(
+                (size * QR_BOX_SIZE, size * QR_BOX_SIZE), Image.NEAREST
+            )
+            c.drawImage(ImageReader(qr_img), qr_x, qr_y, QR_SIZE, QR_SIZE)
 
         # === Logo (fixed top-right) ===
         logo_x = x + STICKER_W - LOGO_SIZE - LOGO_RIGHT_PADDING
         logo_y = y - LOGO_TOP_PADDING - LOGO_SIZE
 
-        c.drawImage(logo_img, logo_x, logo_y, LOGO_SIZE, LOGO_SIZE)
+        c.saveState()
+        c.translate(logo_x, logo_y)
+        c.doForm("sticker_logo")
+        c.restoreState()
 
         # === Text starts UNDER the logo ===
         text_x = qr_x + QR_SIZE + TEXT_LEFT_SPACE_FROM_QR
@@ -84,21 +245,17 @@ def generate_qr_sticker_sheet(request, batch_name):
         c.drawString(text_x, text_top, "MOTORIA")
 
         c.setFont("Helvetica", 9)
-        c.drawString(text_x, text_top - 15, f"Batch: {q.batch}")
-        c.drawString(text_x, text_top - 30, f"Created: {q.created_at.strftime('%Y-%m-%d')}")
+        c.drawString(text_x, text_top - 15, f"Batch: {batch}")
+        c.drawString(text_x, text_top - 30, f"Created: {created_at.strftime('%Y-%m-%d')}")
 
         # === Move to next sticker ===
         x += STICKER_W + SPACING_X
 
         if (i + 1) % COLS == 0:
-            x = margin_x
+            x = MARGIN_X
             y -= STICKER_H + SPACING_Y
 
-        if y < 60 * mm:
+        if y < PAGE_BREAK_Y:
             c.showPage()
-            x = margin_x
-            y = A4_H - margin_y
-
-    c.save()
-    buffer.seek(0)
-    return HttpResponse(buffer, content_type='application/pdf')
+            x = MARGIN_X
+            y = A4_H - MARGIN_Y